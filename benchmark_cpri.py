@@ -0,0 +1,342 @@
+"""
+장비가동일지 성능 측정 스크립트 (합성 데이터 + 가짜 시트 백엔드)
+
+    python benchmark_cpri.py --rows 100000
+    python benchmark_cpri.py --departments 10 --equipment 200 --companies 20000 --rows 1000000 --label v8
+
+결과는 bench_results/ 아래에 JSON(실행 1회 상세)과 history.csv(실행마다 한 줄씩 누적)로 저장된다.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import equipment_cpri_v8 as app
+
+
+# ==========================================
+# 1. 합성 데이터 생성
+# ==========================================
+COMPANY_WORDS = ["에이비씨", "대한", "한국", "정밀", "소재", "테크", "바이오", "로보틱스", "전자", "화학",
+                 "메탈", "세라믹", "모빌리티", "에너지", "시스템", "산업", "광학", "솔루션"]
+COMPANY_FORMS = ["(주){}", "{}", "㈜{}", "{}(주)", "{} 주식회사"]
+
+
+def _messy_date(d, rng):
+    """사용시작일/사용종료일: 시트에 실제로 섞여 있는 형식들"""
+    r = rng.random()
+    if r < 0.55:
+        return d.strftime("%Y-%m-%d")
+    if r < 0.7:
+        return d.strftime("%Y.%m.%d")
+    if r < 0.8:
+        return d.strftime("%Y/%m/%d")
+    if r < 0.92:
+        return d.strftime("%Y-%m-%d 00:00:00")
+    if r < 0.97:
+        return d.strftime("%Y. %m. %d")
+    return ""
+
+
+def _messy_hours(h, rng):
+    """사용시간: '2', '2.5', ' 2시간', '1,000', '0:30', 빈칸, 잘못된 값"""
+    r = rng.random()
+    if r < 0.5:
+        return f"{h:g}"
+    if r < 0.65:
+        return f" {h:g}시간"
+    if r < 0.75:
+        return f"{int(h)}:{int((h % 1) * 60):02d}"
+    if r < 0.8:
+        return f"{h * 100:,.0f}"
+    if r < 0.95:
+        return str(float(h))
+    return rng.choice(["", "-", "확인중"])
+
+
+def make_biz_num(rng):
+    """체크섬이 맞는 사업자등록번호 10자리"""
+    d = [rng.randint(1, 9)] + [rng.randint(0, 9) for _ in range(8)]
+    total = sum(x * w for x, w in zip(d, app.BIZ_NUM_WEIGHTS)) + (d[8] * 5) // 10
+    return "".join(map(str, d)) + str((10 - total % 10) % 10)
+
+
+def make_companies(n, rng):
+    names = set()
+    while len(names) < n:
+        base = "".join(rng.sample(COMPANY_WORDS, 2)) + (str(rng.randint(1, 999)) if len(names) > 200 else "")
+        names.add(rng.choice(COMPANY_FORMS).format(base))
+    return [(name, make_biz_num(rng)) for name in sorted(names)]
+
+
+def make_dataset(departments, equipment, companies, rows, seed=42, start_year=2023):
+    """
+    가짜 시트 백엔드에 넣을 {시트명: [[행], ...]} 생성
+    - 장비목록 / 사용자관리 / 기업목록 마스터
+    - 장비별 일지 시트 (행 수는 장비마다 치우치게 분배)
+    - 장비별 유지보수 시트
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+
+    dept_names = [f"부서{i + 1:02d}" for i in range(departments)]
+    equip_names = [f"장비{i + 1:04d}" for i in range(equipment)]
+    equip_rows = [["부서명", "장비명", "장비번호", "장비구분"]]
+    for i, eq in enumerate(equip_names):
+        equip_rows.append([dept_names[i % departments], eq, f"E{i + 1:05d}", rng.choice(["분석", "시험", "생산"])])
+
+    comp_list = make_companies(companies, rng)
+    comp_rows = [["기업명", "사업자번호"]] + [list(c) for c in comp_list]
+
+    # 인기 장비에 몰리도록 지프 분포로 행 배분
+    weights = 1.0 / np.arange(1, equipment + 1) ** 0.8
+    per_equip = np_rng.multinomial(rows, weights / weights.sum())
+
+    industries = list(app.INDUSTRY_ITEMS.keys())
+    day0 = date(start_year, 1, 1)
+    span_days = (date.today() - day0).days or 1
+
+    sheets = {
+        "장비목록": equip_rows,
+        "사용자관리": [["아이디", "비밀번호", "이름", "부서"], ["bench", "bench", "벤치", "ALL"]],
+        "기업목록": comp_rows,
+    }
+    for i, eq in enumerate(equip_names):
+        log = [list(app.LOG_COLUMNS)]
+        for _ in range(int(per_equip[i])):
+            d = day0 + timedelta(days=rng.randrange(span_days))
+            hours = rng.choice([0.5, 1, 1.5, 2, 3, 4, 6, 8])
+            industry = rng.choice(industries)
+            item = rng.choice(app.INDUSTRY_ITEMS[industry])
+            comp_name, comp_num = comp_list[rng.randrange(len(comp_list))]
+            log.append([
+                rng.choice(["시험", "분석", "계측", "생산"]), rng.choice(["내부", "내부타부서", "외부", "간접지원"]),
+                comp_name, comp_num, dept_names[i % departments],
+                industry, item, rng.choice(app.ITEM_SUB_ITEMS.get(item, [""])), f"제품{rng.randint(1, 500)}",
+                str(rng.randint(1, 20)), "Y", "·지원개요: 합성 데이터\n· 지원내용: 벤치마크용 " + "가" * rng.randint(10, 300),
+                eq, f"E{i + 1:05d}", "분석",
+                _messy_date(d, rng), _messy_date(d, rng), "N", _messy_hours(hours, rng),
+                str(rng.choice([0, 10000, 50000, 120000])), "",
+            ])
+        sheets[eq] = log
+        maint = [["시작일", "종료일", "시간", "내용"]]
+        for _ in range(rng.randint(0, 12)):
+            d = day0 + timedelta(days=rng.randrange(span_days))
+            maint.append([_messy_date(d, rng), _messy_date(d, rng), _messy_hours(rng.choice([1, 2, 4, 8]), rng), "정기점검"])
+        sheets[f"{eq}_유지보수"] = maint
+    return sheets
+
+
+def make_upload_frame(sheets, n, seed=7):
+    """일괄 업로드 검토용 DataFrame: 업체명 표기 흔들기 + 일부 미등록 업체/장비명"""
+    rng = random.Random(seed)
+    equip_names = [r[1] for r in sheets["장비목록"][1:]]
+    comps = sheets["기업목록"][1:]
+    rows = []
+    for _ in range(n):
+        name, num = comps[rng.randrange(len(comps))]
+        base = app.normalize_comp_name(name)
+        r = rng.random()
+        if r < 0.5:
+            name = rng.choice(COMPANY_FORMS).format(base)
+        elif r < 0.55:
+            name = base + "없는회사"
+        eq = rng.choice(equip_names) if rng.random() > 0.02 else "없는장비"
+        d = date.today() - timedelta(days=rng.randrange(365))
+        rows.append(["시험", "외부", name, num, "부서01", "소재", "금속", "철강소재", "시제품", 1, "Y", "내용",
+                     eq, "", "", d.isoformat(), d.isoformat(), "N", rng.choice([1, 2, 4]), 0, ""])
+    return pd.DataFrame(rows, columns=app.LOG_COLUMNS)
+
+
+# ==========================================
+# 2. 측정
+# ==========================================
+def timeit(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return times, result
+
+
+def summarize(name, times, n_items, extra=None):
+    out = {
+        "name": name,
+        "repeat": len(times),
+        "min_sec": min(times),
+        "median_sec": statistics.median(times),
+        "mean_sec": statistics.fmean(times),
+        "items": n_items,
+        "items_per_sec": (n_items / min(times)) if min(times) > 0 else None,
+    }
+    out.update(extra or {})
+    return out
+
+
+def run_benchmarks(args):
+    t0 = time.perf_counter()
+    sheets = make_dataset(args.departments, args.equipment, args.companies, args.rows, seed=args.seed)
+    gen_sec = time.perf_counter() - t0
+    print(f"[생성] {args.rows:,}행 / 장비 {args.equipment} / 기업 {args.companies} ({gen_sec:.1f}s)")
+
+    client = app.FakeClient(sheets)
+    doc = client.open("장비관리시스템")
+    equip_names = [r[1] for r in sheets["장비목록"][1:]]
+    biggest = max(equip_names, key=lambda eq: len(sheets[eq]))
+    results = []
+
+    # load_log_data: 가장 큰 장비 / 전체 장비
+    times, df_big = timeit(lambda: app.load_log_data(doc.worksheet(biggest)), args.repeat)
+    results.append(summarize("load_log_data.largest", times, len(df_big), {"equipment": biggest}))
+
+    times, _ = timeit(lambda: [app.load_log_data(doc.worksheet(eq)) for eq in equip_names], args.repeat)
+    results.append(summarize("load_log_data.all_equipment", times, args.rows))
+
+    # 열 단위 읽기 (batch_get 으로 필요한 열 범위만): 탭2 목록 / 활용률
+    ws_big = doc.worksheet(biggest)
+    full_bytes = len(json.dumps(ws_big.get_all_values(), ensure_ascii=False).encode("utf-8"))
+    for label, columns in [("list", app.LOG_LIST_COLUMNS), ("utilization", app.UTILIZATION_COLUMNS)]:
+        ranges = app.column_ranges(columns)
+        part_bytes = len(json.dumps(ws_big.batch_get(ranges), ensure_ascii=False).encode("utf-8"))
+        times, df_part = timeit(lambda: app.load_log_columns(ws_big, columns), args.repeat)
+        results.append(summarize(f"load_log_columns.{label}", times, len(df_part),
+                                 {"ranges": ",".join(ranges), "payload_ratio": round(part_bytes / full_bytes, 3)}))
+
+    # 날짜/시간 전처리
+    all_dates = pd.concat([app.load_log_data(doc.worksheet(eq))["사용시작일"] for eq in equip_names], ignore_index=True)
+    all_hours = pd.concat([app.load_log_data(doc.worksheet(eq))["사용시간"] for eq in equip_names], ignore_index=True)
+    times, _ = timeit(lambda: all_dates.apply(app.clean_date_str), args.repeat)
+    results.append(summarize("clean_date_str", times, len(all_dates)))
+    times, _ = timeit(lambda: pd.to_datetime(all_dates.apply(app.clean_date_str), errors="coerce"), args.repeat)
+    results.append(summarize("clean_date_str+to_datetime", times, len(all_dates)))
+    times, _ = timeit(lambda: all_hours.apply(app.parse_hours), args.repeat)
+    results.append(summarize("parse_hours", times, len(all_hours)))
+
+    # 마스터 데이터 맵 (업체명 정규화 포함)
+    dept_map, info_map, comp_db, comp_norm_db = app.get_master_data(client)
+
+    # 업체명 퍼지 매칭 (정규화 + 사전 조회)
+    df_upload = make_upload_frame(sheets, args.upload_rows, seed=args.seed)
+    names = df_upload["사용기관 기업명"].tolist()
+    times, matched = timeit(lambda: sum(1 for n in names if app.normalize_comp_name(n) in comp_norm_db), args.repeat)
+    results.append(summarize("company_match", times, len(names), {"matched": matched}))
+
+    # 일괄 업로드 검토
+    times, (valid, errors, corrected, near_dups) = timeit(
+        lambda: app.validate_upload_rows(df_upload, info_map, comp_norm_db,
+                                         duplicate_lookup=lambda eq: app.get_duplicate_index(doc, eq)), args.repeat)
+    results.append(summarize("validate_upload_rows", times, len(df_upload),
+                             {"valid": len(valid), "errors": len(errors), "auto_corrected": len(corrected),
+                              "near_duplicates": len(near_dups)}))
+
+    # 업로드 파일 읽기: read_excel 전체 로딩 vs read-only 스트리밍 (같은 내용의 xlsx / csv)
+    xlsx = io.BytesIO()
+    df_upload.to_excel(xlsx, index=False)
+    xlsx_bytes = xlsx.getvalue()
+    csv_bytes = df_upload.to_csv(index=False).encode("utf-8-sig")
+    lookup = lambda eq: app.get_duplicate_index(doc, eq)
+    times, _ = timeit(lambda: app.validate_upload_rows(pd.read_excel(io.BytesIO(xlsx_bytes)), info_map, comp_norm_db,
+                                                       duplicate_lookup=lookup), args.repeat)
+    results.append(summarize("upload.read_excel+validate", times, len(df_upload)))
+    times, out = timeit(lambda: app.ingest_upload(io.BytesIO(xlsx_bytes), "upload.xlsx", info_map, comp_norm_db,
+                                                  duplicate_lookup=lookup), args.repeat)
+    results.append(summarize("upload.ingest_xlsx", times, out["total"], {"valid": len(out["valid_rows"])}))
+    times, out = timeit(lambda: app.ingest_upload(io.BytesIO(csv_bytes), "upload.csv", info_map, comp_norm_db,
+                                                  duplicate_lookup=lookup), args.repeat)
+    results.append(summarize("upload.ingest_csv", times, out["total"], {"valid": len(out["valid_rows"])}))
+
+    # 탭3 활용률 계산 (가장 큰 장비, 올해)
+    maint_big = app.parse_maintenance_sheet(doc.worksheet(f"{biggest}_유지보수"))
+    calc_start = date.today().replace(month=1, day=1)
+    calc_end = date.today()
+    times, calc = timeit(lambda: app.compute_utilization(df_big.copy(), maint_big.copy(), calc_start, calc_end),
+                         args.repeat)
+    results.append(summarize("compute_utilization.largest", times, len(df_big),
+                             {"utilization_rate": round(float(calc["utilization_rate"]), 6)}))
+
+    # 탭3 기업별 이용 현황 (전 장비, 올해) - 첫 실행은 변환 포함, 이후는 변환 캐시 재사용
+    equip_names = list(info_map.keys())
+    times, (usage, _) = timeit(lambda: app.company_usage(doc, equip_names, calc_start, calc_end,
+                                                         comp_norm_db=comp_norm_db), args.repeat)
+    results.append(summarize("company_usage", times, len(equip_names), {"companies": len(usage)}))
+
+    # 탭3 장비 사용 달력 (전 장비 × 최근 1년, 주 단위) - 행렬 집계 + 히트맵 칸/타임라인 막대 변환
+    cal_start = date.today() - timedelta(days=364)
+    times, cal = timeit(lambda: app.usage_calendar(doc, equip_names, cal_start, date.today(), "W"), args.repeat)
+    results.append(summarize("usage_calendar.week", times, len(equip_names), {"bins": len(cal["capacity"])}))
+    times, seg = timeit(lambda: (app.calendar_cells(cal), app.calendar_segments(cal)), args.repeat)
+    results.append(summarize("usage_calendar.cells_segments", times, cal["usage"].size, {"segments": len(seg[1])}))
+
+    return {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "params": {k: getattr(args, k) for k in ("departments", "equipment", "companies", "rows", "upload_rows",
+                                                 "repeat", "seed")},
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "generate_sec": gen_sec,
+        "results": results,
+    }
+
+
+def write_results(report, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = report["timestamp"].replace(":", "").replace("-", "")
+    json_path = os.path.join(out_dir, f"bench_{stamp}_{report['label']}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+    csv_path = os.path.join(out_dir, "history.csv")
+    new_file = not os.path.exists(csv_path)
+    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["timestamp", "label", "rows", "name", "items", "min_sec", "median_sec", "items_per_sec"])
+        for r in report["results"]:
+            writer.writerow([report["timestamp"], report["label"], report["params"]["rows"], r["name"], r["items"],
+                             f"{r['min_sec']:.6f}", f"{r['median_sec']:.6f}",
+                             f"{r['items_per_sec']:.1f}" if r["items_per_sec"] else ""])
+    return json_path, csv_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="장비가동일지 핫패스 벤치마크")
+    parser.add_argument("--departments", type=int, default=5)
+    parser.add_argument("--equipment", type=int, default=50)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=50000, help="전체 일지 행 수 (최대 1,000,000)")
+    parser.add_argument("--upload-rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="local", help="결과 파일에 붙일 버전/브랜치 이름")
+    parser.add_argument("--out-dir", default="bench_results")
+    args = parser.parse_args(argv)
+    if args.rows > 1_000_000:
+        parser.error("--rows 는 1,000,000 이하로 지정하세요.")
+
+    report = run_benchmarks(args)
+    for r in report["results"]:
+        print(f"{r['name']:<32} {r['items']:>10,}건  min {r['min_sec'] * 1000:>9.1f} ms  "
+              f"median {r['median_sec'] * 1000:>9.1f} ms")
+    json_path, csv_path = write_results(report, args.out_dir)
+    print(f"[저장] {json_path} / {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,87 @@
+import time
+_SCRIPT_T0 = time.perf_counter()
+
 import streamlit as st
-import gspread
-import pandas as pd
-from google.oauth2.service_account import Credentials
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime, date, timedelta
+import array
+import bisect
+import codecs
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import csv
+import hashlib
+import heapq
+import hmac
+import importlib
+import itertools
+import json
+import logging
 import os
 import io
 import re
+import secrets
+import sys
+import threading
+import uuid
+import weakref
+import zlib
+
+_LOG = logging.getLogger("cpri")
+
+# ==============================
+# ✅ 지연 import (로그인 화면은 pandas/gspread 없이 뜨도록)
+# ==============================
+_IMPORT_TIMES = {}
+
+def _timed_import(name):
+    """모듈을 import 하면서 최초 로딩 시간을 기록"""
+    if name in sys.modules:
+        return sys.modules[name]
+    t0 = time.perf_counter()
+    mod = importlib.import_module(name)
+    _IMPORT_TIMES[name] = time.perf_counter() - t0
+    return mod
+
+class _LazyModule:
+    """첫 속성 접근 시점에 실제 모듈을 불러오는 대리 객체 (pd.DataFrame 등 기존 코드 그대로 사용)"""
+    def __init__(self, name):
+        self._name = name
+        self._mod = None
+
+    def __getattr__(self, attr):
+        if self._mod is None:
+            self._mod = _timed_import(self._name)
+        return getattr(self._mod, attr)
+
+pd = _LazyModule("pandas")
+gspread = _LazyModule("gspread")
+np = _LazyModule("numpy")
+date_parser = _LazyModule("dateutil.parser")
+
+
+def get_setting(key, default):
+    """설정값 조회: secrets.toml [app_settings] → 환경변수 CPRI_<KEY> → 기본값 (기본값 타입으로 변환)"""
+    raw = None
+    try:
+        if "app_settings" in st.secrets and key in st.secrets["app_settings"]:
+            raw = st.secrets["app_settings"][key]
+    except Exception:
+        pass
+    if raw is None:
+        raw = os.environ.get(f"CPRI_{key.upper()}")
+    if raw is None:
+        return default
+    if isinstance(default, bool):
+        return str(raw).strip().lower() in ("1", "true", "y", "yes", "on")
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(raw)
+        except (TypeError, ValueError):
+            return default
+    return raw
 
 # ==============================
 # ✅ [추가] 날짜/시간 전처리 함수 (활용률 0 문제 해결 핵심)
@@ -20,6 +96,28 @@ def clean_date_str(x):
         s = s[:10]
     return s
 
+def _parse_date_loose(x):
+    """parse_dates 에서 'YYYY-MM-DD' 로 못 읽은 값: '2026-1-5', '2026.1.5 09:00', '26/01/05' 등 (연-월-일 순서)"""
+    s = "" if x is None else str(x).strip().replace(".", "-").replace("/", "-")
+    if len(re.findall(r"\d+", s)) < 3:  # 연/월/일이 다 없으면 dateutil 이 오늘 날짜로 채우므로 읽지 않는다
+        return pd.NaT
+    try:
+        return pd.Timestamp(date_parser.parse(s, yearfirst=True, dayfirst=False)).normalize()
+    except (ValueError, OverflowError):
+        return pd.NaT
+
+def parse_dates(values):
+    """
+    날짜 칸 Series → datetime Series (못 읽으면 NaT). 활용률/유지보수 합계/기업별 집계/달력/중복 키/검색이 모두 이 함수로 읽는다.
+    clean_date_str 로 'YYYY-MM-DD' 가 되는 값은 한 번에 변환하고, 나머지만 고유값별로 dateutil 로 읽는다.
+    """
+    values = pd.Series(values, dtype=object)
+    out = pd.to_datetime(_map_unique(values, clean_date_str), format="%Y-%m-%d", errors="coerce")
+    rest = out.isna() & (values.astype(str).str.strip() != "")
+    if rest.any():
+        out[rest] = pd.to_datetime(_map_unique(values[rest], _parse_date_loose))
+    return out
+
 def parse_hours(x):
     """
     '2', '2.5', ' 2시간', '1,000', '0:30' 같은 값들을 float(시간)으로 변환
@@ -51,14 +149,15 @@ def parse_hours(x):
 # ==============================
 # 0. 세션 상태 초기값
 # ==============================
-if "biz_num" not in st.session_state:
-    st.session_state["biz_num"] = ""
-if "selected_industry" not in st.session_state:
-    st.session_state["selected_industry"] = "소재"
-if "selected_item" not in st.session_state:
-    st.session_state["selected_item"] = ""
-if "calc_results" not in st.session_state:
-    st.session_state["calc_results"] = None
+def init_session_state():
+    if "biz_num" not in st.session_state:
+        st.session_state["biz_num"] = ""
+    if "selected_industry" not in st.session_state:
+        st.session_state["selected_industry"] = "소재"
+    if "selected_item" not in st.session_state:
+        st.session_state["selected_item"] = ""
+    if "logged_in" not in st.session_state:
+        st.session_state["logged_in"] = False
 
 
 # ==========================================
@@ -70,37 +169,811 @@ SCOPES = [
 ]
 
 def get_client():
+    client = _open_client()
+    return instrument_client(client) if client is not None else None
+
+def _open_client():
+    try:
+        return authorized_client()
+    except FileNotFoundError:
+        st.error("⚠️ secrets.json 파일을 찾을 수 없습니다.")
+        return None
+    except Exception as e:
+        st.error(f"⚠️ 인증 에러: {e}")
+        return None
+
+@st.cache_resource(show_spinner=False)
+def authorized_client():
+    """
+    인증된 시트 클라이언트 (프로세스당 한 번만 인증).
+    실패는 예외로 올려서 캐시에 남지 않게 한다 - 화면 표시는 호출하는 쪽(_open_client / 백그라운드 로그)에서 한다.
+    """
+    if get_setting("sheets_backend", "gspread") == "fake":
+        return get_fake_client()
+
+    Credentials = _timed_import("google.oauth2.service_account").Credentials
+    try:
+        if hasattr(st, 'secrets') and "gcp_service_account" in st.secrets:
+            key_dict = dict(st.secrets["gcp_service_account"])
+            if "private_key" in key_dict:
+                key_dict["private_key"] = key_dict["private_key"].replace("\\n", "\n")
+            creds = Credentials.from_service_account_info(key_dict, scopes=SCOPES)
+            return gspread.authorize(creds)
+    except:
+        pass
+
+    SECRET_PATH = "secrets.json"
+
+    if os.path.exists(SECRET_PATH):
+        creds = Credentials.from_service_account_file(SECRET_PATH, scopes=SCOPES)
+        return gspread.authorize(creds)
+
+    ABS_PATH = r"E:\AI\equipment\secrets.json"
+    if os.path.exists(ABS_PATH):
+        creds = Credentials.from_service_account_file(ABS_PATH, scopes=SCOPES)
+        return gspread.authorize(creds)
+
+    raise FileNotFoundError(SECRET_PATH)
+
+
+# ==========================================
+# 1-1. 가짜 시트 백엔드 (로컬 개발/테스트용)
+# ==========================================
+# CPRI_SHEETS_BACKEND=fake 로 실행하면 구글 시트 대신 메모리 상의 시트를 사용한다.
+# CPRI_FAKE_SEED=<json 경로> 를 주면 {"시트명": [[행], ...]} 내용으로 채워서 시작한다.
+def _col_to_idx(letters):
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+def _idx_to_col(n):
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+def parse_a1_range(rng):
+    """'A2:U10', 'B:B', 'P2:S', 'A5' → (시작행, 시작열, 끝행, 끝열), 열린 끝은 None (1부터 시작)"""
+    rng = rng.split("!")[-1]
+    parts = rng.split(":")
+    bounds = []
+    for part in parts:
+        m = re.match(r"^([A-Za-z]*)(\d*)$", part.strip())
+        if not m:
+            raise ValueError(f"잘못된 범위: {rng}")
+        col = _col_to_idx(m.group(1)) if m.group(1) else None
+        row = int(m.group(2)) if m.group(2) else None
+        bounds.append((row, col))
+    (r1, c1) = bounds[0]
+    (r2, c2) = bounds[-1] if len(bounds) > 1 else bounds[0]
+    return (r1 or 1), (c1 or 1), r2, c2
+
+def _cell_str(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+def _numericise(v):
     try:
+        return int(v)
+    except ValueError:
         try:
-            if hasattr(st, 'secrets') and "gcp_service_account" in st.secrets:
-                key_dict = dict(st.secrets["gcp_service_account"])
-                if "private_key" in key_dict:
-                    key_dict["private_key"] = key_dict["private_key"].replace("\\n", "\n")
-                creds = Credentials.from_service_account_info(key_dict, scopes=SCOPES)
-                client = gspread.authorize(creds)
-                return client
-        except:
-            pass
+            return float(v)
+        except ValueError:
+            return v
+
+class FakeWorksheet:
+    def __init__(self, doc, title, sheet_id, rows=None):
+        self.spreadsheet = doc
+        self.title = title
+        self.id = sheet_id
+        self._rows = [[_cell_str(v) for v in r] for r in (rows or [])]
+
+    @property
+    def row_count(self):
+        return max(len(self._rows), 1000)
+
+    @property
+    def col_count(self):
+        return max([len(r) for r in self._rows] + [26])
+
+    def _padded(self, rows):
+        width = max([len(r) for r in rows] + [0])
+        return [r + [""] * (width - len(r)) for r in rows]
+
+    def get_all_values(self):
+        with self.spreadsheet._lock:
+            return self._padded([list(r) for r in self._rows])
+
+    def get_all_records(self):
+        rows = self.get_all_values()
+        if not rows:
+            return []
+        header = rows[0]
+        return [{h: _numericise(v) for h, v in zip(header, r)} for r in rows[1:]]
+
+    def row_values(self, row):
+        with self.spreadsheet._lock:
+            if row > len(self._rows):
+                return []
+            r = list(self._rows[row - 1])
+        while r and r[-1] == "":
+            r.pop()
+        return r
+
+    def col_values(self, col):
+        with self.spreadsheet._lock:
+            vals = [r[col - 1] if len(r) >= col else "" for r in self._rows]
+        while vals and vals[-1] == "":
+            vals.pop()
+        return vals
+
+    def get(self, range_name):
+        r1, c1, r2, c2 = parse_a1_range(range_name)
+        with self.spreadsheet._lock:
+            r2 = len(self._rows) if r2 is None else min(r2, len(self._rows))
+            out = []
+            for r in self._rows[r1 - 1:r2]:
+                end = len(r) if c2 is None else c2
+                out.append(list(r[c1 - 1:end]))
+        while out and not any(out[-1]):
+            out.pop()
+        return out
+
+    def batch_get(self, ranges):
+        return [self.get(r) for r in ranges]
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values, **kwargs):
+        with self.spreadsheet._lock:
+            for v in values:
+                self._rows.append([_cell_str(x) for x in v])
+            self.spreadsheet._touch()
+
+    def update(self, range_name=None, values=None, **kwargs):
+        r1, c1, _, _ = parse_a1_range(range_name)
+        with self.spreadsheet._lock:
+            for i, vals in enumerate(values or []):
+                ridx = r1 - 1 + i
+                while len(self._rows) <= ridx:
+                    self._rows.append([])
+                row = self._rows[ridx]
+                need = c1 - 1 + len(vals)
+                if len(row) < need:
+                    row.extend([""] * (need - len(row)))
+                for j, v in enumerate(vals):
+                    row[c1 - 1 + j] = _cell_str(v)
+            self.spreadsheet._touch()
+
+    def delete_rows(self, start_index, end_index=None):
+        end_index = start_index if end_index is None else end_index
+        with self.spreadsheet._lock:
+            del self._rows[start_index - 1:end_index]
+            self.spreadsheet._touch()
+
+    def update_title(self, title):
+        with self.spreadsheet._lock:
+            self.spreadsheet._sheets[title] = self.spreadsheet._sheets.pop(self.title)
+            self.title = title
+            self.spreadsheet._touch()
+
+class FakeSpreadsheet:
+    """gspread.Spreadsheet 중 이 앱이 쓰는 부분만 흉내 낸 메모리 시트. 쓰기마다 리비전이 1씩 오른다."""
+    def __init__(self, title, sheets=None):
+        self.title = title
+        self.id = f"fake-{title}"
+        self._lock = threading.RLock()
+        self._sheets = {}
+        self._next_id = 0
+        self.revision = 1
+        for name, rows in (sheets or {}).items():
+            ws = self.add_worksheet(name)
+            ws._rows = [[_cell_str(v) for v in r] for r in rows]
+
+    def _touch(self):
+        self.revision += 1
+
+    def bump_revision(self):
+        """외부(다른 사용자)에서 수정된 것처럼 리비전만 올림 - 테스트용"""
+        with self._lock:
+            self._touch()
+
+    def get_lastUpdateTime(self):
+        return f"fake-rev-{self.revision}"
+
+    def worksheet(self, title):
+        with self._lock:
+            if title not in self._sheets:
+                raise gspread.exceptions.WorksheetNotFound(title)
+            return self._sheets[title]
+
+    def worksheets(self):
+        with self._lock:
+            return list(self._sheets.values())
+
+    def add_worksheet(self, title, rows=100, cols=26, **kwargs):
+        with self._lock:
+            if title in self._sheets:
+                raise ValueError(f"이미 있는 시트입니다: {title}")
+            self._next_id += 1
+            ws = FakeWorksheet(self, title, self._next_id)
+            self._sheets[title] = ws
+            self._touch()
+            return ws
+
+    def del_worksheet(self, worksheet):
+        with self._lock:
+            self._sheets.pop(worksheet.title, None)
+            self._touch()
+
+    def fetch_sheet_metadata(self, params=None):
+        with self._lock:
+            return {"sheets": [{"properties": {"title": ws.title, "sheetId": ws.id, "index": i,
+                                               "gridProperties": {"rowCount": ws.row_count,
+                                                                  "columnCount": ws.col_count}}}
+                               for i, ws in enumerate(self._sheets.values())]}
+
+class FakeClient:
+    def __init__(self, sheets=None):
+        self._docs = {"장비관리시스템": FakeSpreadsheet("장비관리시스템", sheets)}
+
+    def open(self, title):
+        if title not in self._docs:
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self._docs[title]
+
+@st.cache_resource(show_spinner=False)
+def get_fake_client():
+    sheets = {
+        "장비목록": [["부서명", "장비명", "장비번호", "장비구분"]],
+        "사용자관리": [["아이디", "비밀번호", "이름", "부서"]],
+        "기업목록": [["기업명", "사업자번호"]],
+    }
+    seed_path = get_setting("fake_seed", "")
+    if seed_path and os.path.exists(seed_path):
+        with open(seed_path, encoding="utf-8") as f:
+            sheets.update(json.load(f))
+    return FakeClient(sheets)
 
-        SECRET_PATH = "secrets.json"
 
-        if os.path.exists(SECRET_PATH):
-            creds = Credentials.from_service_account_file(SECRET_PATH, scopes=SCOPES)
-            client = gspread.authorize(creds)
-            return client
-        else:
-            ABS_PATH = r"E:\AI\equipment\secrets.json"
-            if os.path.exists(ABS_PATH):
-                creds = Credentials.from_service_account_file(ABS_PATH, scopes=SCOPES)
-                client = gspread.authorize(creds)
-                return client
+# ==========================================
+# 1-2. 시트 API 계측 (호출 수 / 지연 / 바이트)
+# ==========================================
+SHEETS_READ_CALLS = {
+    "open", "worksheet", "worksheets", "get_all_values", "get_all_records", "row_values", "col_values",
+    "get", "batch_get", "acell", "get_lastUpdateTime", "fetch_sheet_metadata",
+}
+SHEETS_WRITE_CALLS = {
+    "append_row", "append_rows", "update", "batch_update", "delete_rows", "add_worksheet",
+    "del_worksheet", "update_title", "clear",
+}
 
-            st.error("⚠️ secrets.json 파일을 찾을 수 없습니다.")
-            return None
+_SHEETS_TAG = contextvars.ContextVar("sheets_tag", default=None)
 
-    except Exception as e:
-        st.error(f"⚠️ 인증 에러: {e}")
-        return None
+def set_sheets_tag(tag):
+    """이후 시트 호출에 화면 위치 태그(예: 'tab2')를 붙인다. 실제 태그는 '<태그>:<호출 함수명>'"""
+    _SHEETS_TAG.set(tag)
+
+def _payload_bytes(obj):
+    """
+    응답/요청 크기 추정치 = 셀 글자 수 합 (직렬화하지 않는다 - 통계용이라 정확한 바이트 수보다 비용이 중요).
+    문자열이 아닌 셀은 8로 친다.
+    """
+    if isinstance(obj, str):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(_payload_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        total = 0
+        for item in obj:
+            if isinstance(item, list):
+                try:
+                    total += sum(map(len, item))  # get_all_values 한 행 (전부 문자열)
+                    continue
+                except TypeError:
+                    pass
+            total += _payload_bytes(item)
+        return total
+    return 0 if obj is None else 8
+
+class SheetsMetrics:
+    """시트 호출 집계 (메서드별 / 태그별 + 최근 호출 목록)"""
+    def __init__(self, max_spans=200):
+        self._lock = threading.Lock()
+        self.started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.by_method = {}
+        self.by_tag = {}
+        self.spans = collections.deque(maxlen=max_spans)
+
+    def record(self, span):
+        with self._lock:
+            for table, key in ((self.by_method, span["method"]), (self.by_tag, span["tag"])):
+                agg = table.setdefault(key, {"calls": 0, "errors": 0, "sec": 0.0, "max_sec": 0.0, "bytes": 0})
+                agg["calls"] += 1
+                agg["errors"] += 1 if span["error"] else 0
+                agg["sec"] += span["sec"]
+                agg["max_sec"] = max(agg["max_sec"], span["sec"])
+                agg["bytes"] += span["bytes"]
+            self.spans.append(span)
+
+    def totals(self):
+        with self._lock:
+            return {
+                "calls": sum(a["calls"] for a in self.by_method.values()),
+                "sec": sum(a["sec"] for a in self.by_method.values()),
+                "bytes": sum(a["bytes"] for a in self.by_method.values()),
+            }
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "by_method": {k: dict(v) for k, v in self.by_method.items()},
+                "by_tag": {k: dict(v) for k, v in self.by_tag.items()},
+                "spans": list(self.spans),
+            }
+
+    def to_prometheus(self, scope):
+        def esc(v):
+            return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = []
+        metrics = [
+            ("cpri_sheets_calls_total", "counter", "Google Sheets API 호출 수", "calls"),
+            ("cpri_sheets_errors_total", "counter", "Google Sheets API 오류 수", "errors"),
+            ("cpri_sheets_latency_seconds_sum", "counter", "Google Sheets API 지연 합계(초)", "sec"),
+            ("cpri_sheets_latency_seconds_max", "gauge", "Google Sheets API 최대 지연(초)", "max_sec"),
+            ("cpri_sheets_bytes_total", "counter", "Google Sheets API 주고받은 바이트(추정)", "bytes"),
+        ]
+        data = self.to_dict()
+        for name, mtype, help_text, field in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {mtype}")
+            for method, agg in sorted(data["by_method"].items()):
+                kind = "write" if method in SHEETS_WRITE_CALLS else "read"
+                lines.append(f'{name}{{scope="{esc(scope)}",method="{esc(method)}",kind="{kind}"}} {agg[field]}')
+        lines.append("# HELP cpri_sheets_tag_calls_total 호출 위치(태그)별 Google Sheets API 호출 수")
+        lines.append("# TYPE cpri_sheets_tag_calls_total counter")
+        for tag, agg in sorted(data["by_tag"].items()):
+            lines.append(f'cpri_sheets_tag_calls_total{{scope="{esc(scope)}",tag="{esc(tag)}"}} {agg["calls"]}')
+        return "\n".join(lines) + "\n"
+
+@st.cache_resource(show_spinner=False)
+def get_process_sheets_metrics():
+    return SheetsMetrics(max_spans=500)
+
+def begin_rerun_metrics():
+    """스크립트 실행(rerun)마다 호출 - 직전 실행 집계는 _sheets_last_rerun 으로 보관"""
+    if "_sheets_session" not in st.session_state:
+        st.session_state["_sheets_session"] = SheetsMetrics()
+    st.session_state["_sheets_last_rerun"] = st.session_state.get("_sheets_rerun")
+    st.session_state["_sheets_rerun"] = SheetsMetrics()
+    set_sheets_tag(None)
+
+def _record_sheets_span(span):
+    get_process_sheets_metrics().record(span)
+    # 백그라운드 스레드(사용자 인덱스 갱신 등)는 세션이 없으므로 프로세스 집계에만 남긴다
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return
+    for key in ("_sheets_session", "_sheets_rerun"):
+        metrics = st.session_state.get(key)
+        if metrics is not None:
+            metrics.record(span)
+
+class InstrumentedSheets:
+    """gspread Client/Spreadsheet/Worksheet 를 감싸 호출마다 시간·바이트·태그를 기록하는 대리 객체"""
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in SHEETS_READ_CALLS and name not in SHEETS_WRITE_CALLS:
+            return attr
+
+        def call(*args, **kwargs):
+            caller = sys._getframe(1).f_code.co_name
+            tag = f"{_SHEETS_TAG.get()}:{caller}" if _SHEETS_TAG.get() else caller
+            t0 = time.perf_counter()
+            error = None
+            result = None
+            try:
+                throttle_sheets_call(name)
+                for attempt in range(3):
+                    try:
+                        result = attr(*args, **kwargs)
+                        break
+                    except Exception as e:
+                        # 할당량 초과(429)는 잠시 쉬었다가 다시 시도
+                        if attempt == 2 or not _is_quota_error(e):
+                            raise
+                        time.sleep(2 ** (attempt + 1))
+                        throttle_sheets_call(name)
+                return _instrument_result(result)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                sec = time.perf_counter() - t0
+                if name in SHEETS_WRITE_CALLS:
+                    nbytes = _payload_bytes(kwargs.get("values", args[-1] if args else None))
+                else:
+                    nbytes = _payload_bytes(result)
+                _record_sheets_span({
+                    "at": datetime.now().strftime("%H:%M:%S"),
+                    "method": name,
+                    "target": getattr(self._target, "title", ""),
+                    "tag": tag,
+                    "sec": round(sec, 4),
+                    "bytes": nbytes,
+                    "error": error,
+                })
+        return call
+
+def _instrument_result(result):
+    if isinstance(result, list) and result and hasattr(result[0], "get_all_values"):
+        return [InstrumentedSheets(ws) for ws in result]
+    if hasattr(result, "get_all_values") or hasattr(result, "worksheet"):
+        return InstrumentedSheets(result)
+    return result
+
+def instrument_client(client):
+    return InstrumentedSheets(client)
+
+def show_sheets_metrics_panel():
+    """관리자용 사이드바 패널: 직전 실행 / 세션 / 프로세스 단위 시트 호출 통계"""
+    with st.sidebar.expander("📡 시트 API 호출 통계", expanded=False):
+        scope = st.radio("범위", ["직전 실행", "세션", "프로세스"], horizontal=True, key="sheets_metrics_scope")
+        metrics = {
+            "직전 실행": st.session_state.get("_sheets_last_rerun"),
+            "세션": st.session_state.get("_sheets_session"),
+            "프로세스": get_process_sheets_metrics(),
+        }[scope]
+        if metrics is None:
+            st.caption("아직 기록이 없습니다.")
+            return
+
+        limiter = get_rate_limiter().status()
+        st.caption(f"속도 제한 - 읽기 토큰 {limiter['read']['tokens']} (대기 {limiter['read']['queued']}) / "
+                   f"쓰기 토큰 {limiter['write']['tokens']} (대기 {limiter['write']['queued']})")
+        rc = get_revision_cache()
+        flight = rc.flight_stats()
+        st.caption(f"캐시 - 적중 {rc.stats['hit']} / 재조회 {rc.stats['miss']} / 리비전 확인 {rc.stats['probe']} / "
+                   f"동시 요청 공유 {flight['shared']} (우선 실행 {flight['bypass']} / 대기 초과 {flight['timeout']})")
+        reg = get_worksheet_registry()
+        st.caption(f"시트 목록 - 로컬 조회 {reg.stats['hit']} / 없음 {reg.stats['miss']} / 목록 갱신 {reg.stats['refresh']}")
+        bg = get_background_refresher()
+        st.caption(f"백그라운드 갱신 - 주기 {bg.stats['cycles']}회 (마지막 {bg.stats['last_cycle'] or '-'}) / "
+                   f"갱신 {bg.stats['refreshed']} / 이전 값 제공 {rc.stats['stale']} / 오류 {bg.stats['errors']}")
+        rs = get_results_cache()
+        st.caption(f"활용률 결과 캐시 - 메모리 {rs.stats['memory']} / 디스크 {rs.stats['disk']} / 계산 {rs.stats['miss']}")
+        pf = get_prefetcher()
+        st.caption(f"프리패치 - 요청 {pf.stats['submitted']} / 완료 {pf.stats['done']} / 실패 {pf.stats['failed']}")
+        tot = metrics.totals()
+        st.write(f"호출 **{tot['calls']}건** / 지연 합계 **{tot['sec']:.2f}s** / 약 **{tot['bytes'] / 1024:,.1f} KB**")
+        data = metrics.to_dict()
+        if data["by_method"]:
+            st.dataframe(pd.DataFrame.from_dict(data["by_method"], orient="index").sort_values("sec", ascending=False),
+                         use_container_width=True)
+            st.dataframe(pd.DataFrame.from_dict(data["by_tag"], orient="index").sort_values("sec", ascending=False),
+                         use_container_width=True)
+
+        scope_label = {"직전 실행": "rerun", "세션": "session", "프로세스": "process"}[scope]
+        st.download_button("JSON 내보내기", json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+                           f"sheets_metrics_{scope_label}.json", "application/json", key="sheets_metrics_json")
+        st.download_button("Prometheus 내보내기", metrics.to_prometheus(scope_label).encode("utf-8"),
+                           f"sheets_metrics_{scope_label}.prom", "text/plain", key="sheets_metrics_prom")
+
+
+# ==========================================
+# 1-3. 시트 API 속도 제한 (토큰 버킷, 읽기/쓰기 분리 + 우선순위)
+# ==========================================
+# 구글 시트 기본 할당량(사용자당 분당 읽기 60 / 쓰기 60)을 넘지 않도록 프로세스 안의 모든 호출이
+# 같은 버킷을 나눠 쓴다. CPRI_RATE_LIMIT_DB=<sqlite 경로> 를 주면 여러 프로세스가 버킷을 공유한다.
+SHEETS_PRIORITIES = {"interactive": 0, "bulk": 1, "background": 2}
+SHEETS_CALL_COST = {"open": 2}
+
+_SHEETS_PRIORITY = contextvars.ContextVar("sheets_priority", default=None)
+
+@contextlib.contextmanager
+def sheets_priority(priority):
+    """with sheets_priority("bulk"): ... 안의 시트 호출 우선순위 지정 (interactive/bulk/background)"""
+    token = _SHEETS_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _SHEETS_PRIORITY.reset(token)
+
+class SheetsRateLimitTimeout(Exception):
+    pass
+
+class MemoryBucketStore:
+    """limits: {종류: (최대 토큰, 초당 충전량)}, clock: 현재 시각 함수 (테스트에서 바꿔 끼운다)"""
+    def __init__(self, limits, clock=time.monotonic):
+        self._clock = clock
+        now = clock()
+        self._limits = limits
+        self._state = {kind: [float(cap), now] for kind, (cap, _) in limits.items()}
+
+    def try_take(self, kind, cost):
+        """토큰을 가져가면 0, 모자라면 다시 시도할 때까지 기다릴 초를 반환"""
+        cap, rate = self._limits[kind]
+        tokens, updated = self._state[kind]
+        now = self._clock()
+        tokens = min(cap, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            self._state[kind] = [tokens - cost, now]
+            return 0.0
+        self._state[kind] = [tokens, now]
+        return (cost - tokens) / rate
+
+    def tokens(self, kind):
+        cap, rate = self._limits[kind]
+        tokens, updated = self._state[kind]
+        return min(cap, tokens + (self._clock() - updated) * rate)
+
+class SqliteBucketStore:
+    """여러 워커 프로세스가 같은 파일로 버킷을 공유 (우선순위는 프로세스 안에서만 적용)"""
+    def __init__(self, limits, path, clock=time.time):
+        import sqlite3
+        self._clock = clock
+        self._limits = limits
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sheets_buckets (kind TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        for kind, (cap, _) in limits.items():
+            self._conn.execute("INSERT OR IGNORE INTO sheets_buckets VALUES (?, ?, ?)", (kind, float(cap), clock()))
+
+    def try_take(self, kind, cost):
+        cap, rate = self._limits[kind]
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated = self._conn.execute(
+                "SELECT tokens, updated FROM sheets_buckets WHERE kind = ?", (kind,)).fetchone()
+            now = self._clock()
+            tokens = min(cap, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._conn.execute("UPDATE sheets_buckets SET tokens = ?, updated = ? WHERE kind = ?", (tokens, now, kind))
+            self._conn.execute("COMMIT")
+            return wait
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def tokens(self, kind):
+        cap, rate = self._limits[kind]
+        tokens, updated = self._conn.execute(
+            "SELECT tokens, updated FROM sheets_buckets WHERE kind = ?", (kind,)).fetchone()
+        return min(cap, tokens + max(0.0, self._clock() - updated) * rate)
+
+class SheetsRateLimiter:
+    """
+    읽기/쓰기 토큰 버킷 앞에 우선순위 대기열을 둔다.
+    대기열 맨 앞(우선순위 → 도착 순)만 토큰을 가져갈 수 있으므로 화면 저장이 백그라운드 갱신/일괄 작업보다 먼저 나간다.
+    """
+    def __init__(self, store, timeout_sec):
+        self._store = store
+        self._timeout = timeout_sec
+        self._cond = threading.Condition()
+        self._queues = {"read": [], "write": []}
+        self._seq = itertools.count()
+        self.waited = {"read": 0, "write": 0}
+
+    def acquire(self, kind, priority="interactive", cost=1, on_wait=None):
+        ticket = (SHEETS_PRIORITIES.get(priority, 0), next(self._seq))
+        queue = self._queues[kind]
+        deadline = time.monotonic() + self._timeout
+        last_position = None
+        with self._cond:
+            heapq.heappush(queue, ticket)
+            try:
+                while True:
+                    wait = 0.5
+                    if queue[0] == ticket:
+                        wait = self._store.try_take(kind, cost)
+                        if wait == 0:
+                            heapq.heappop(queue)
+                            return
+                    if last_position is None:
+                        self.waited[kind] += 1
+                    position = sorted(queue).index(ticket) + 1
+                    if on_wait is not None and position != last_position:
+                        on_wait(kind, position, wait)
+                    last_position = position
+                    if time.monotonic() > deadline:
+                        raise SheetsRateLimitTimeout(f"시트 요청 대기 시간 초과 ({self._timeout:.0f}초)")
+                    self._cond.wait(min(max(wait, 0.05), 0.5))
+            except BaseException:
+                if ticket in queue:
+                    queue.remove(ticket)
+                    heapq.heapify(queue)
+                raise
+            finally:
+                self._cond.notify_all()
+
+    def status(self):
+        with self._cond:
+            return {kind: {"queued": len(q), "tokens": round(self._store.tokens(kind), 1)}
+                    for kind, q in self._queues.items()}
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    limits = {
+        "read": (get_setting("sheets_read_per_min", 60), get_setting("sheets_read_per_min", 60) / 60.0),
+        "write": (get_setting("sheets_write_per_min", 60), get_setting("sheets_write_per_min", 60) / 60.0),
+    }
+    db_path = get_setting("rate_limit_db", "")
+    store = SqliteBucketStore(limits, db_path) if db_path else MemoryBucketStore(limits)
+    return SheetsRateLimiter(store, timeout_sec=get_setting("sheets_wait_timeout_sec", 120.0))
+
+def _queue_feedback():
+    """스크립트 스레드에서 기다릴 때만 화면에 대기열 위치를 보여주는 콜백 (placeholder, 콜백) 반환"""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None, None
+    holder = []
+
+    def on_wait(kind, position, eta):
+        if not holder:
+            holder.append(st.empty())
+        label = "읽기" if kind == "read" else "쓰기"
+        holder[0].info(f"⏳ 구글 시트 {label} 요청이 많아 대기 중입니다... 대기열 {position}번째 (약 {max(eta, 1):.0f}초)")
+    return holder, on_wait
+
+def current_sheets_priority():
+    """지정된 우선순위, 없으면 스크립트 스레드는 interactive / 그 밖의 스레드는 background"""
+    priority = _SHEETS_PRIORITY.get()
+    if priority is None:
+        priority = "interactive" if get_script_run_ctx(suppress_warning=True) is not None else "background"
+    return priority
+
+def throttle_sheets_call(name):
+    if not get_setting("sheets_rate_limit", True):
+        return
+    kind = "write" if name in SHEETS_WRITE_CALLS else "read"
+    priority = current_sheets_priority()
+    holder, on_wait = _queue_feedback()
+    try:
+        get_rate_limiter().acquire(kind, priority, SHEETS_CALL_COST.get(name, 1), on_wait)
+    finally:
+        if holder:
+            holder[0].empty()
+
+def _is_quota_error(e):
+    return getattr(e, "code", None) == 429 or "429" in str(e)[:200]
+
+
+# ==========================================
+# 1-4. 세션별 메모리 예산 (결과 프레임 LRU 캐시)
+# ==========================================
+def approx_bytes(value):
+    """DataFrame/Series 는 memory_usage(deep), 배열은 nbytes, 컨테이너는 안쪽 합계로 대략 계산"""
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_bytes(k) + approx_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(approx_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+class SessionFrameCache:
+    """
+    세션 하나가 들고 있는 계산 결과(활용률 표, 전 장비 예측, 탭2 목록 등). 크기 합이 budget 을 넘으면
+    가장 오래 안 쓴 것부터 버린다 (버려진 결과는 화면에서 다시 계산하면 된다). 방금 넣은 항목은 남긴다.
+    pinned=True 로 넣은 항목(수정 폼 기준값처럼 다시 만들 수 없는 상태)은 크기만 세고 버리지 않는다.
+    """
+    def __init__(self, budget_bytes):
+        self.budget = budget_bytes
+        self.user = ""
+        self._lock = threading.Lock()
+        self._items = collections.OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.last_used = time.time()
+
+    def put(self, key, value, pinned=False):
+        size = approx_bytes(value)
+        with self._lock:
+            if key in self._items:
+                self.bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size, pinned)
+            self.bytes += size
+            if self.bytes > self.budget:
+                for old_key in [k for k, item in self._items.items() if not item[2] and k != key]:
+                    self.bytes -= self._items.pop(old_key)[1]
+                    self.evictions += 1
+                    if self.bytes <= self.budget:
+                        break
+            self.last_used = time.time()
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            self.last_used = time.time()
+            return item[0]
+
+    def pop(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self.bytes -= item[1]
+            return item[0] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def summary(self):
+        with self._lock:
+            return {"user": self.user, "entries": len(self._items), "bytes": self.bytes, "budget": self.budget,
+                    "evictions": self.evictions, "last_used": self.last_used,
+                    "keys": {k: item[1] for k, item in self._items.items()}}
+
+@st.cache_resource(show_spinner=False)
+def get_session_registry():
+    """세션 id → SessionFrameCache 약한 참조 (세션이 사라지면 자동으로 빠진다). 관리자 화면 집계용"""
+    return {"lock": threading.Lock(), "sessions": weakref.WeakValueDictionary()}
+
+def session_frames():
+    cache = st.session_state.get("_frame_cache")
+    if cache is None:
+        cache = SessionFrameCache(int(get_setting("session_memory_mb", 64.0) * 1024 * 1024))
+        st.session_state["_frame_cache"] = cache
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is not None:
+            registry = get_session_registry()
+            with registry["lock"]:
+                registry["sessions"][ctx.session_id] = cache
+    cache.user = st.session_state.get("user_id", "")
+    return cache
+
+def release_session_frames():
+    """로그아웃 시 이 세션이 들고 있던 결과를 모두 놓는다"""
+    cache = st.session_state.pop("_frame_cache", None)
+    if cache is not None:
+        cache.clear()
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is not None:
+        registry = get_session_registry()
+        with registry["lock"]:
+            registry["sessions"].pop(ctx.session_id, None)
+
+def show_session_memory_panel():
+    """관리자용: 세션별 결과 캐시 사용량"""
+    with st.sidebar.expander("🧠 세션 메모리", expanded=False):
+        registry = get_session_registry()
+        with registry["lock"]:
+            sessions = list(registry["sessions"].items())
+        me = getattr(get_script_run_ctx(suppress_warning=True), "session_id", None)
+        rows = []
+        for sid, cache in sessions:
+            s = cache.summary()
+            rows.append({"세션": sid[:8] + (" (나)" if sid == me else ""), "사용자": s["user"], "항목": s["entries"],
+                         "MB": round(s["bytes"] / 1048576, 2), "예산 MB": round(s["budget"] / 1048576, 1),
+                         "밀려남": s["evictions"],
+                         "마지막 사용": datetime.fromtimestamp(s["last_used"]).strftime("%H:%M:%S")})
+        if not rows:
+            st.caption("결과를 들고 있는 세션이 없습니다.")
+            return
+        st.write(f"세션 {len(rows)}개 / 합계 **{sum(r['MB'] for r in rows):,.2f} MB**")
+        st.dataframe(rows, hide_index=True, use_container_width=True)
 
 
 # ==========================================
@@ -158,10 +1031,9 @@ def normalize_comp_name(name):
 # ==========================================
 def get_master_data(client):
     try:
-        doc = client.open("장비관리시스템")
+        doc = open_spreadsheet(client)
 
-        sheet_equip = doc.worksheet("장비목록")
-        equip_records = sheet_equip.get_all_records()
+        equip_records = read_sheet_cached(doc, "장비목록", get_sheet_records, allow_stale=True)
 
         dept_map = {}
         info_map = {}
@@ -178,16 +1050,11 @@ def get_master_data(client):
             dept_map[dept].append(eq_name)
             info_map[eq_name] = {"no": eq_no, "type": eq_type}
 
-        sheet_user = doc.worksheet("사용자관리")
-        user_records = sheet_user.get_all_records()
-        user_db = {str(row['아이디']): row for row in user_records if row.get('아이디')}
-
         comp_db = {}
         comp_norm_db = {}
 
         try:
-            sheet_comp = doc.worksheet("기업목록")
-            all_rows = sheet_comp.get_all_values()
+            all_rows = read_sheet_cached(doc, "기업목록", get_sheet_values, allow_stale=True)
             for row in all_rows[1:]:
                 if len(row) >= 2:
                     c_name = str(row[0]).strip()
@@ -199,18 +1066,20 @@ def get_master_data(client):
         except:
             pass
 
-        return dept_map, info_map, user_db, comp_db, comp_norm_db
+        return dept_map, info_map, comp_db, comp_norm_db
 
     except Exception as e:
         st.error(f"데이터 로딩 에러: {e}")
-        return {}, {}, {}, {}, {}
+        return {}, {}, {}, {}
+
+LOG_COLUMNS = ["사용목적", "활용유형", "사용기관 기업명", "사용기관 사업자등록번호", "내부부서명",
+               "업종", "품목", "세부품목", "제품명", "시료수/시험수",
+               "세부지원공개여부", "세부지원내용", "장비명", "장비번호", "장비구분",
+               "사용시작일", "사용종료일", "휴무일자포함", "사용시간", "사용료", "사용목적기타"]
 
 def load_log_data(sheet):
     rows = sheet.get_all_values()
-    cols = ["사용목적", "활용유형", "사용기관 기업명", "사용기관 사업자등록번호", "내부부서명",
-            "업종", "품목", "세부품목", "제품명", "시료수/시험수",
-            "세부지원공개여부", "세부지원내용", "장비명", "장비번호", "장비구분",
-            "사용시작일", "사용종료일", "휴무일자포함", "사용시간", "사용료", "사용목적기타"]
+    cols = LOG_COLUMNS
     if len(rows) <= 1:
         return pd.DataFrame(columns=cols)
 
@@ -226,21 +1095,2560 @@ def load_log_data(sheet):
     df.insert(0, "행번호", range(2, 2 + len(df)))
     return df
 
+# 열 단위 읽기: 화면마다 필요한 열 범위만 batch_get 으로 받는다 (세부지원내용처럼 긴 글은 필요할 때만)
+LOG_LIST_COLUMNS = [c for c in LOG_COLUMNS if c != "세부지원내용"]  # 탭2 목록 / 중복 검사
+UTILIZATION_COLUMNS = ["활용유형", "사용시작일", "사용종료일", "사용시간"]  # 활용률 / 연말 예측
+
+LONG_TEXT_COLUMNS = {"세부지원내용"}  # 범위를 합칠 때 사이에 끼워 받지 않을 긴 글 열
+
+def column_ranges(columns, max_gap=1):
+    """
+    LOG_COLUMNS 중 columns 가 있는 시트 열 범위 (머리글 제외).
+    max_gap 열 이하로 떨어진 열은 (사이에 긴 글 열이 없으면) 한 범위로 합친다: UTILIZATION_COLUMNS → ['B2:B', 'P2:S']
+    """
+    spans = []
+    for i in sorted(LOG_COLUMNS.index(c) + 1 for c in set(columns)):
+        gap = LOG_COLUMNS[spans[-1][1]:i - 1] if spans else []
+        if spans and len(gap) <= max_gap and not LONG_TEXT_COLUMNS.intersection(gap):
+            spans[-1][1] = i
+        else:
+            spans.append([i, i])
+    return [f"{_idx_to_col(a)}2:{_idx_to_col(b)}" for a, b in spans]
+
+def load_log_columns(sheet, columns):
+    """필요한 열 범위만 받아 행번호 + columns(LOG_COLUMNS 순서) 프레임을 만든다. 행번호는 load_log_data 와 같다"""
+    ranges = column_ranges(columns)
+    blocks = sheet.batch_get(ranges)
+    n = max((len(block) for block in blocks), default=0)
+    data = {}
+    for rng, block in zip(ranges, blocks):
+        _, c1, _, c2 = parse_a1_range(rng)
+        width = c2 - c1 + 1
+        rows = [list(r[:width]) + [""] * (width - len(r)) for r in block] + [[""] * width] * (n - len(block))
+        for j, values in enumerate(zip(*rows) if rows else [()] * width):
+            data[LOG_COLUMNS[c1 - 1 + j]] = list(values)
+    wanted = [c for c in LOG_COLUMNS if c in columns]
+    df = pd.DataFrame({c: data[c] for c in wanted}, columns=wanted)
+    df.insert(0, "행번호", range(2, 2 + len(df)))
+    return df
+
+_LOG_COLUMN_LOADERS = {}
+
+def log_column_loader(columns):
+    """columns 전용 로더. 리비전 캐시 키가 로더 이름이므로 열 조합마다 이름을 따로 붙인다"""
+    key = tuple(c for c in LOG_COLUMNS if c in columns)
+    loader = _LOG_COLUMN_LOADERS.get(key)
+    if loader is None:
+        def loader(sheet):
+            return load_log_columns(sheet, key)
+        loader.__name__ = f"load_log_columns[{','.join(column_ranges(key))}]"
+        _LOG_COLUMN_LOADERS[key] = loader
+    return loader
+
+load_log_list = log_column_loader(LOG_LIST_COLUMNS)  # 세부지원내용을 뺀 일지 (탭2 목록 / 중복 검사)
+
+MAINTENANCE_COLUMNS = ["시작일", "종료일", "시간", "내용"]
+MAINTENANCE_SHEET = "유지보수기록"
+MAINTENANCE_SHEET_COLUMNS = ["장비명"] + MAINTENANCE_COLUMNS
+
+def parse_maintenance_sheet(sheet):
+    """(구) 장비별 '{장비명}_유지보수' 시트"""
+    rows = sheet.get_all_values()
+    if len(rows) <= 1:
+        return pd.DataFrame(columns=MAINTENANCE_COLUMNS)
+    return pd.DataFrame([(r + [""] * 4)[:4] for r in rows[1:]], columns=MAINTENANCE_COLUMNS)
+
+def parse_maintenance_table(sheet):
+    """
+    통합 '유지보수기록' 시트 → 장비명/시작일 순으로 정렬한 DataFrame + {장비명: (시작, 끝)} 위치 인덱스.
+    날짜/시간은 여기서 한 번만 파싱해 _date/_hours 로 붙여 둔다 (리비전 캐시에 그대로 보관).
+    """
+    rows = sheet.get_all_values()
+    body = [(r + [""] * 5)[:5] for r in rows[1:]]
+    df = pd.DataFrame(body, columns=MAINTENANCE_SHEET_COLUMNS)
+    df["_date"] = parse_dates(df["시작일"])
+    df["_hours"] = df["시간"].map(parse_hours).astype(float)
+    df = df.sort_values(["장비명", "_date"], kind="stable").reset_index(drop=True)
+
+    slices = {}
+    if len(df):
+        names = df["장비명"].to_numpy(dtype=object)
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+        ends = np.r_[starts[1:], len(names)]
+        slices = {names[s]: (int(s), int(e)) for s, e in zip(starts, ends)}
+    return {"df": df, "slices": slices}
+
+def load_maintenance_table(doc):
+    try:
+        return read_sheet_cached(doc, MAINTENANCE_SHEET, parse_maintenance_table)
+    except gspread.exceptions.WorksheetNotFound:
+        return {"df": pd.DataFrame(columns=MAINTENANCE_SHEET_COLUMNS + ["_date", "_hours"]), "slices": {}}
+
 def load_maintenance_data(client, equip_name):
+    """장비 한 대의 유지보수 기록: 통합 시트(인덱스 조회) + 아직 이관 안 된 구 장비별 시트"""
     try:
-        doc = client.open("장비관리시스템")
-        sheet_name = f"{equip_name}_유지보수"
+        doc = open_spreadsheet(client)
+        table = load_maintenance_table(doc)
+        s, e = table["slices"].get(equip_name, (0, 0))
+        parts = [table["df"].iloc[s:e][MAINTENANCE_COLUMNS]]
         try:
-            sheet = doc.worksheet(sheet_name)
-            rows = sheet.get_all_values()
-            if len(rows) <= 1:
-                return pd.DataFrame(columns=["시작일", "종료일", "시간", "내용"])
-            df = pd.DataFrame(rows[1:], columns=["시작일", "종료일", "시간", "내용"])
-            return df
-        except:
-            return pd.DataFrame(columns=["시작일", "종료일", "시간", "내용"])
+            parts.append(read_sheet_cached(doc, f"{equip_name}_유지보수", parse_maintenance_sheet))
+        except Exception:
+            pass
+        return pd.concat(parts, ignore_index=True)
     except Exception:
-        return pd.DataFrame(columns=["시작일", "종료일", "시간", "내용"])
+        return pd.DataFrame(columns=MAINTENANCE_COLUMNS)
+
+def maintenance_totals(doc, calc_start, calc_end, equip_names=None):
+    """
+    기간 내 장비별 유지보수 시간 합계 - 통합 시트 한 번 읽기로 전 장비 계산.
+    아직 이관 안 된 구 '{장비명}_유지보수' 시트가 있는 장비는 그 시트도 더한다 (load_maintenance_data 와 같은 범위)
+    """
+    wanted = None if equip_names is None else set(equip_names)
+    parts = [load_maintenance_table(doc)["df"][["장비명", "_date", "_hours"]]]
+    for title in get_worksheet_registry().titles(doc):
+        equip = title[:-len("_유지보수")]
+        if not title.endswith("_유지보수") or (wanted is not None and equip not in wanted):
+            continue
+        try:
+            legacy = read_sheet_cached(doc, title, parse_maintenance_sheet)
+        except gspread.exceptions.WorksheetNotFound:
+            continue
+        parts.append(pd.DataFrame({"장비명": equip, "_date": parse_dates(legacy["시작일"]),
+                                   "_hours": legacy["시간"].map(parse_hours).astype(float)}))
+    df = pd.concat(parts, ignore_index=True)
+    mask = (df["_date"] >= pd.Timestamp(calc_start)) & (df["_date"] <= pd.Timestamp(calc_end))
+    if wanted is not None:
+        mask &= df["장비명"].isin(wanted)
+    totals = df.loc[mask].groupby("장비명")["_hours"].agg(["sum", "count"])
+    return totals.rename(columns={"sum": "유지보수시간", "count": "건수"})
+
+def append_maintenance(doc, equip_name, row):
+    """통합 시트에 유지보수 1건 추가 (시트가 없으면 만든다)"""
+    try:
+        m_sheet = get_worksheet(doc, MAINTENANCE_SHEET)
+    except gspread.exceptions.WorksheetNotFound:
+        m_sheet = add_worksheet(doc, MAINTENANCE_SHEET, cols=len(MAINTENANCE_SHEET_COLUMNS))
+        m_sheet.append_row(MAINTENANCE_SHEET_COLUMNS)
+    m_sheet.append_row([equip_name] + list(row))
+    invalidate_sheet(doc, MAINTENANCE_SHEET)
+
+def _maintenance_key(equip, row):
+    """이관 중복 판단 키 (장비명, 시작일, 종료일, 내용)"""
+    start, end, _, content = (list(row) + [""] * 4)[:4]
+    return (str(equip).strip(), str(start).strip(), str(end).strip(), str(content).strip())
+
+def migrate_legacy_maintenance(doc, equip_names):
+    """
+    구 '{장비명}_유지보수' 시트를 통합 시트로 옮긴다.
+    옮긴 시트는 지우지 않고 '{장비명}_유지보수(이관됨)' 으로 이름만 바꿔 두 번 합산되지 않게 한다.
+    이름 바꾸기 전에 멈췄다가 다시 실행해도 같은 행이 두 번 들어가지 않도록, 통합 시트에 이미 있는
+    (장비명, 시작일, 종료일, 내용) 행은 건너뛴다 (같은 행이 여러 개면 개수만큼만).
+    반환: {장비명: 옮긴 행 수}
+    """
+    moved = {}
+    registry = get_worksheet_registry()
+    titles = {t: registry.worksheet(doc, t) for t in registry.titles(doc)}
+    existing = None
+    for equip in equip_names:
+        legacy = titles.get(f"{equip}_유지보수")
+        if legacy is None:
+            continue
+        rows = [r for r in parse_maintenance_sheet(legacy)[MAINTENANCE_COLUMNS].values.tolist() if any(r)]
+        if rows:
+            if MAINTENANCE_SHEET not in titles:
+                titles[MAINTENANCE_SHEET] = add_worksheet(doc, MAINTENANCE_SHEET, cols=len(MAINTENANCE_SHEET_COLUMNS))
+                titles[MAINTENANCE_SHEET].append_row(MAINTENANCE_SHEET_COLUMNS)
+            if existing is None:
+                existing = collections.Counter(_maintenance_key(r[0] if r else "", r[1:])
+                                               for r in titles[MAINTENANCE_SHEET].get_all_values()[1:])
+            new_rows = []
+            for r in rows:
+                key = _maintenance_key(equip, r)
+                if existing[key] > 0:
+                    existing[key] -= 1
+                else:
+                    new_rows.append([equip] + r)
+            rows = new_rows
+            if rows:
+                titles[MAINTENANCE_SHEET].append_rows(rows)
+        legacy.update_title(f"{equip}_유지보수(이관됨)")
+        moved[equip] = len(rows)
+    registry.forget(doc)
+    invalidate_sheet(doc)
+    return moved
+
+
+# ==========================================
+# 3-1. 리비전 기반 캐시 (바뀌지 않은 시트는 다시 받지 않음)
+# ==========================================
+class RevisionCache:
+    """
+    (스프레드시트, 시트, 로더) → (리비전, 결과) 캐시.
+    읽기 전에 "바뀌었나?"만 값싸게 확인하고, 리비전이 그대로면 저장된 결과를 재사용한다.
+    - 리비전: Drive modifiedTime (스프레드시트 단위, probe_interval 동안은 재확인 생략)
+    - Drive 조회 불가 시: 시트의 행 수 + 마지막 행 체크섬
+    - max_age 가 지나면 리비전이 같아도 다시 받는다 (중간 행 수정 대비)
+    """
+    def __init__(self, probe_interval_sec, max_age_sec, flight_wait_sec=30.0):
+        self._probe_interval = probe_interval_sec
+        self._max_age = max_age_sec
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._doc_revisions = {}
+        self._flight = SingleFlight(flight_wait_sec)
+        self._tokens = itertools.count(1)
+        self.stats = {"hit": 0, "miss": 0, "probe": 0, "stale": 0}
+
+    def doc_revision(self, doc):
+        now = time.time()
+        cached = self._doc_revisions.get(doc.id)
+        if cached and now - cached[1] < self._probe_interval:
+            return cached[0]
+
+        def probe():
+            self.stats["probe"] += 1
+            try:
+                rev = str(doc.get_lastUpdateTime())
+            except Exception:
+                rev = None
+            self._doc_revisions[doc.id] = (rev, time.time())
+            return rev
+        return self._flight.do(("revision", doc.id), probe)
+
+    def sheet_revision(self, doc, get_ws):
+        rev = self.doc_revision(doc)
+        if rev is not None:
+            return rev
+        ws = get_ws()
+        n = len(ws.col_values(1))
+        last = ws.row_values(n) if n else []
+        return f"rows-{n}-{zlib.crc32(json.dumps(last, ensure_ascii=False).encode('utf-8'))}"
+
+    def get(self, key, revision_fn, fetch_fn, stale_ok_sec=0, on_stale=None):
+        """
+        리비전이 그대로면 저장된 값. stale_ok_sec 를 주면, 리비전이 바뀌었어도 그 시간 안에 받은 값은
+        바로 돌려주고 on_stale() 로 새로 받기를 맡긴다 (stale-while-revalidate)
+        """
+        rev = revision_fn()
+        entry = self._entries.get(key)
+        if entry and entry["revision"] == rev and time.time() - entry["fetched_at"] < self._max_age:
+            self.stats["hit"] += 1
+            return entry["value"]
+        if entry and on_stale is not None and time.time() - entry["fetched_at"] < stale_ok_sec:
+            self.stats["stale"] += 1
+            on_stale()
+            return entry["value"]
+
+        def fetch():
+            self.stats["miss"] += 1
+            value = fetch_fn()
+            with self._lock:
+                self._entries[key] = {"revision": rev, "value": value, "fetched_at": time.time(),
+                                      "token": next(self._tokens)}
+            return value
+        # 같은 시트/범위/리비전을 동시에 요청한 세션들은 한 번의 호출 결과를 함께 받는다
+        return self._flight.do((key, rev), fetch)
+
+    def peek(self, key):
+        """리비전 확인 없이 마지막으로 받아 둔 값 (없으면 None)"""
+        entry = self._entries.get(key)
+        return entry["value"] if entry else None
+
+    def load_token(self, key):
+        """저장된 값이 새로 받아질 때마다 바뀌는 번호 (없으면 None) - 그 값으로 만든 파생 구조의 버전으로 쓴다"""
+        entry = self._entries.get(key)
+        return entry["token"] if entry else None
+
+    def flight_stats(self):
+        return dict(self._flight.stats)
+
+    def invalidate(self, doc_id, sheet_name=None):
+        """이 앱에서 쓰기를 한 직후 호출 - 다음 읽기는 리비전 확인 없이 새로 받는다"""
+        with self._lock:
+            self._doc_revisions.pop(doc_id, None)
+            for key in [k for k in self._entries if k[0] == doc_id and (sheet_name is None or k[1] == sheet_name)]:
+                del self._entries[key]
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청은 먼저 온 요청 하나만 실행하고, 나머지는 그 결과(같은 객체)를 기다려 받는다.
+    - 진행 중인 요청보다 우선순위가 높은 요청(예: 화면 읽기 ↔ 백그라운드 프리패치)은 기다리지 않고 직접 실행하고,
+      이후 들어오는 요청은 그쪽에 합류한다 (우선순위 역전 방지)
+    - 기다리는 쪽은 wait_sec 까지만 기다리고, 넘으면 직접 실행한다
+    """
+    def __init__(self, wait_sec=30.0):
+        self._wait = wait_sec
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"leader": 0, "shared": 0, "bypass": 0, "timeout": 0}
+
+    def do(self, key, fn):
+        rank = SHEETS_PRIORITIES.get(current_sheets_priority(), 0)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None or rank < call["rank"]
+            if leader:
+                if call is not None:
+                    self.stats["bypass"] += 1
+                call = {"done": threading.Event(), "value": None, "error": None, "rank": rank}
+                self._calls[key] = call
+        if not leader:
+            self.stats["shared"] += 1
+            if call["done"].wait(self._wait):
+                if call["error"] is not None:
+                    raise call["error"]
+                return call["value"]
+            self.stats["timeout"] += 1
+            return fn()
+
+        self.stats["leader"] += 1
+        try:
+            call["value"] = fn()
+            return call["value"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call["done"].set()
+
+@st.cache_resource(show_spinner=False)
+def get_revision_cache():
+    return RevisionCache(
+        probe_interval_sec=get_setting("revision_probe_sec", 2.0),
+        max_age_sec=get_setting("revision_max_age_sec", 300.0),
+        flight_wait_sec=get_setting("singleflight_wait_sec", 30.0),
+    )
+
+class WorksheetRegistry:
+    """
+    스프레드시트 핸들 + 시트 이름 → 워크시트 핸들 표.
+    doc.worksheet(name) 은 호출마다 메타데이터를 받아 오므로, worksheets() 한 번으로 전체 목록을 받아 두고
+    이름은 로컬에서 찾는다. 목록에 없는 이름을 찾을 때만(문서 리비전이 바뀐 경우) 다시 받는다.
+    """
+    def __init__(self, revision_cache, max_docs=8):
+        self._revisions = revision_cache
+        self._lock = threading.Lock()
+        self._docs = collections.OrderedDict()
+        self._tables = {}
+        self.max_docs = max_docs
+        self.stats = {"hit": 0, "miss": 0, "refresh": 0}
+
+    @staticmethod
+    def _account(client):
+        # 계측 래퍼는 실행마다 새로 만들어지므로 안쪽 클라이언트의 서비스 계정으로 찾는다
+        inner = getattr(client, "_target", client)
+        email = getattr(getattr(inner, "auth", None), "service_account_email", None)
+        return email or inner
+
+    def open(self, client, title):
+        key = (self._account(client), title)
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is not None:
+                self._docs.move_to_end(key)
+                return doc
+        doc = client.open(title)
+        with self._lock:
+            self._docs[key] = doc
+            self._docs.move_to_end(key)
+            while len(self._docs) > self.max_docs:
+                _, old = self._docs.popitem(last=False)
+                if all(d.id != old.id for d in self._docs.values()):
+                    self._tables.pop(old.id, None)
+        return doc
+
+    def refresh(self, doc):
+        self.stats["refresh"] += 1
+        rev = self._revisions.doc_revision(doc)
+        table = {"revision": rev, "sheets": {ws.title: ws for ws in doc.worksheets()}}
+        with self._lock:
+            self._tables[doc.id] = table
+        return table
+
+    def _table(self, doc):
+        table = self._tables.get(doc.id)
+        return table if table is not None else self.refresh(doc)
+
+    def worksheet(self, doc, title):
+        table = self._table(doc)
+        ws = table["sheets"].get(title)
+        if ws is not None:
+            self.stats["hit"] += 1
+            return ws
+        self.stats["miss"] += 1
+        # 같은 리비전에서 이미 없던 이름이면 다시 물어볼 필요가 없다
+        rev = self._revisions.doc_revision(doc)
+        if rev is None or rev != table["revision"]:
+            ws = self.refresh(doc)["sheets"].get(title)
+            if ws is not None:
+                return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def titles(self, doc):
+        return list(self._table(doc)["sheets"])
+
+    def add_worksheet(self, doc, title, rows, cols):
+        ws = doc.add_worksheet(title=title, rows=rows, cols=cols)
+        self.refresh(doc)
+        return ws
+
+    def forget(self, doc):
+        with self._lock:
+            self._tables.pop(doc.id, None)
+
+@st.cache_resource(show_spinner=False)
+def get_worksheet_registry():
+    return WorksheetRegistry(get_revision_cache(), max_docs=get_setting("worksheet_registry_docs", 8))
+
+def open_spreadsheet(client, title="장비관리시스템"):
+    return get_worksheet_registry().open(client, title)
+
+def get_worksheet(doc, title):
+    return get_worksheet_registry().worksheet(doc, title)
+
+def add_worksheet(doc, title, rows=1000, cols=26):
+    return get_worksheet_registry().add_worksheet(doc, title, rows, cols)
+
+def get_sheet_values(sheet):
+    return sheet.get_all_values()
+
+def get_sheet_records(sheet):
+    return sheet.get_all_records()
+
+def read_sheet_cached(doc, sheet_name, loader, allow_stale=False):
+    """
+    loader(worksheet) 결과를 리비전 캐시로 재사용. 반환값은 여러 세션이 공유하므로 수정하지 말 것
+    allow_stale=True: 시트가 바뀌었어도 stale_max_sec 안에 받은 값은 바로 쓰고, 새로 받기는 백그라운드로 넘긴다
+    """
+    cache = get_revision_cache()
+    ws_holder = []
+
+    def get_ws():
+        if not ws_holder:
+            ws_holder.append(get_worksheet(doc, sheet_name))
+        return ws_holder[0]
+
+    stale = {}
+    if allow_stale:
+        stale = {"stale_ok_sec": get_setting("stale_max_sec", 900.0),
+                 "on_stale": lambda: get_background_refresher().kick(doc, sheet_name, loader)}
+    return cache.get(
+        (doc.id, sheet_name, loader.__name__),
+        lambda: cache.sheet_revision(doc, get_ws),
+        lambda: loader(get_ws()),
+        **stale,
+    )
+
+def load_log_frame(doc, equip_name, columns=None):
+    """
+    장비 일지 (리비전 캐시 경유). 호출하는 쪽에서 컬럼을 바꿔도 되도록 복사본을 준다.
+    columns 를 주면 그 열만 받는다 (행번호 + columns)
+    """
+    loader = load_log_data if columns is None else log_column_loader(columns)
+    return read_sheet_cached(doc, equip_name, loader).copy()
+
+def invalidate_sheet(doc, sheet_name=None):
+    get_revision_cache().invalidate(doc.id, sheet_name)
+
+
+# ==========================================
+# 3-2. 일괄 업로드 검토 / 활용률 계산
+# ==========================================
+# 업로드 검증 규칙: 규칙마다 "위반 행 마스크"를 한 번에 계산하고, 위반 행에만 사유 문자열을 만든다.
+USAGE_TYPES = ["내부", "내부타부서", "외부", "간접지원"]
+INDUSTRY_ITEM_PAIRS = {f"{ind}|{item}" for ind, items in INDUSTRY_ITEMS.items() for item in items}
+ITEM_SUB_ITEM_PAIRS = {f"{item}|{sub}" for item, subs in ITEM_SUB_ITEMS.items() for sub in subs}
+BIZ_NUM_WEIGHTS = [1, 3, 7, 1, 3, 7, 1, 3, 5]
+
+class UploadRule:
+    """check(f, ctx) → 위반 행 bool Series. message 의 {컬럼명}은 위반 행의 값으로 채워진다"""
+    def __init__(self, name, check, message):
+        self.name = name
+        self.check = check
+        self.message = message
+        self._parts = re.split(r"\{([^}]+)\}", message)  # 짝수 칸: 고정 문자열, 홀수 칸: 컬럼명
+
+    def render(self, rows):
+        out = pd.Series(self._parts[0], index=rows.index, dtype=object)
+        for i, part in enumerate(self._parts[1:], start=1):
+            out = out + (rows[part].astype(str) if i % 2 else part)
+        return out
+
+def biz_num_invalid(nums):
+    """사업자등록번호 체크섬 검사 (빈 값은 통과). 숫자 10자리가 아니거나 검증번호가 틀리면 True"""
+    digits = nums.str.replace(r"[^0-9]", "", regex=True)
+    bad = (nums != "") & (digits.str.len() != 10)
+    ten = digits[(nums != "") & ~bad]
+    if len(ten):
+        d = (np.frombuffer("".join(ten.tolist()).encode("ascii"), dtype=np.uint8) - 48).reshape(-1, 10).astype(np.int64)
+        total = d[:, :9] @ np.array(BIZ_NUM_WEIGHTS) + (d[:, 8] * 5) // 10
+        bad.loc[ten.index] = ((10 - total % 10) % 10) != d[:, 9]
+    return bad
+
+UPLOAD_RULES = [
+    UploadRule("장비명", lambda f, ctx: ~f["장비명"].isin(ctx["equip_names"]),
+               "등록되지 않은 장비명: {장비명}"),
+    UploadRule("업체명", lambda f, ctx: (f["사용기관 기업명"] != "") & ~f["_matched"],
+               "미등록 업체 (정확한 이름 확인 필요): {사용기관 기업명}"),
+    UploadRule("사용시작일", lambda f, ctx: f["_start"].isna(),
+               "사용시작일 형식 오류: {사용시작일}"),
+    UploadRule("사용종료일", lambda f, ctx: (f["사용종료일"] != "") & f["_end"].isna(),
+               "사용종료일 형식 오류: {사용종료일}"),
+    UploadRule("기간", lambda f, ctx: f["_end"].notna() & f["_start"].notna() & (f["_end"] < f["_start"]),
+               "종료일이 시작일보다 빠름: {사용시작일}~{사용종료일}"),
+    UploadRule("사용시간", lambda f, ctx: f["_hours"] <= 0,
+               "사용시간 오류: {사용시간}"),
+    UploadRule("사용시간 초과", lambda f, ctx: f["_hours"] > f["_days"].fillna(1) * 24,
+               "사용시간이 기간(일수×24시간)을 초과: {사용시간}"),
+    UploadRule("활용유형", lambda f, ctx: ~f["활용유형"].isin(USAGE_TYPES),
+               "활용유형 값 오류: {활용유형}"),
+    UploadRule("업종", lambda f, ctx: (f["업종"] != "") & ~f["업종"].isin(list(INDUSTRY_ITEMS.keys())),
+               "업종 값 오류: {업종}"),
+    UploadRule("품목", lambda f, ctx: f["업종"].isin(list(INDUSTRY_ITEMS.keys()))
+               & ~(f["업종"] + "|" + f["품목"]).isin(INDUSTRY_ITEM_PAIRS),
+               "업종({업종})에 없는 품목: {품목}"),
+    UploadRule("세부품목", lambda f, ctx: (f["업종"] + "|" + f["품목"]).isin(INDUSTRY_ITEM_PAIRS)
+               & ~(f["품목"] + "|" + f["세부품목"]).isin(ITEM_SUB_ITEM_PAIRS),
+               "품목({품목})에 없는 세부품목: {세부품목}"),
+    UploadRule("사업자등록번호", lambda f, ctx: biz_num_invalid(f["_biz_num"]),
+               "사업자등록번호 오류(체크섬): {_biz_num}"),
+    UploadRule("중복", lambda f, ctx: f["_dup"] == "exact",
+               "중복 등록: {_dup_at}과 동일"),
+]
+
+def _map_unique(series, fn):
+    """같은 값이 반복되는 컬럼은 고유값에만 fn 을 적용"""
+    uniq = series.unique()
+    return series.map(dict(zip(uniq, (fn(v) for v in uniq))))
+
+def duplicate_keys(company, start, end, hours, product):
+    """
+    중복 검사 키. 정확 중복 = (정규화 업체명, 시작일, 종료일, 사용시간, 제품명), 유사 중복 = (업체명, 시작일, 종료일).
+    start/end 는 datetime Series, hours 는 float Series. 일지 시트와 업로드 양쪽에서 같은 함수로 만든다.
+    """
+    comp = _map_unique(company.astype(str), normalize_comp_name).tolist()
+    s = start.dt.strftime("%Y-%m-%d").fillna("").tolist()
+    e = end.dt.strftime("%Y-%m-%d").fillna("").tolist()
+    h = hours.round(2).tolist()
+    p = product.astype(str).str.strip().tolist()
+    near = list(zip(comp, s, e))
+    exact = [k + (hh, pp) for k, hh, pp in zip(near, h, p)]
+    return exact, near
+
+def log_duplicate_keys(frame):
+    """일지 프레임(사용기관 기업명/사용시작일/사용종료일/사용시간/제품명) → duplicate_keys"""
+    start = parse_dates(frame["사용시작일"])
+    end = parse_dates(frame["사용종료일"])
+    hours = _map_unique(frame["사용시간"], parse_hours).astype(float)
+    return duplicate_keys(frame["사용기관 기업명"], start, end, hours, frame["제품명"])
+
+def duplicate_location(at):
+    """lookup 이 준 위치 → 안내 문구 (시트 행번호 또는 보관분 표시)"""
+    return f"{at}행" if isinstance(at, int) else str(at)
+
+class LogDuplicateIndex:
+    """
+    장비 일지 한 시트의 중복 검사 키 → 행번호 해시 인덱스.
+    시트 리비전이 바뀌면 처음부터 다시 색인한다 (중간 행 수정/삭제 후 추가는 행 수·마지막 행으로 알 수 없다).
+    이 앱이 뒤에 붙인 행(note_append)만큼만 늘어난 경우에만 새 행을 이어서 색인한다.
+    보관된 행은 시트에 없으므로 보관분 키(update_archive)를 따로 두고, 시트에 없을 때 찾아본다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.exact = {}
+        self.near = {}
+        self._n = 0
+        self._tail = None
+        self._frame = None
+        self._revision = None
+        self._appended = 0
+        self.archive_exact = {}
+        self.archive_near = {}
+        self._archive_version = None
+
+    def note_append(self, count):
+        """이 앱이 시트 끝에 count 행을 붙였다 - 다음 갱신에서 그만큼 늘어났으면 이어서 색인"""
+        with self._lock:
+            self._appended += count
+
+    def update(self, frame, revision):
+        with self._lock:
+            if frame is self._frame and revision == self._revision:
+                return
+            n = len(frame)
+            tail = frame.iloc[self._n - 1][LOG_LIST_COLUMNS].tolist() if 0 < self._n <= n else None
+            unchanged = revision == self._revision and n == self._n
+            appended = self._appended > 0 and n == self._n + self._appended
+            if not (unchanged or appended) or (self._n and tail != self._tail):
+                self.exact, self.near, self._n = {}, {}, 0
+            new = frame.iloc[self._n:]
+            if len(new):
+                exact, near = log_duplicate_keys(new)
+                for row_no, ek, nk in zip(new["행번호"].tolist(), exact, near):
+                    self.exact.setdefault(ek, row_no)
+                    self.near.setdefault(nk, row_no)
+            self._n = n
+            self._tail = frame.iloc[n - 1][LOG_LIST_COLUMNS].tolist() if n else None
+            self._frame = frame
+            self._revision = revision
+            self._appended = 0
+
+    def update_archive(self, version, load):
+        """보관분 버전(파티션 체크섬 목록)이 바뀌었을 때만 load() 로 보관 행을 읽어 키를 다시 만든다"""
+        with self._lock:
+            if version == self._archive_version:
+                return
+            self.archive_exact, self.archive_near = {}, {}
+            archived = load() if version else None
+            if archived is not None and len(archived):
+                months = parse_dates(archived["사용시작일"]).dt.strftime("%Y-%m").fillna("").tolist()
+                exact, near = log_duplicate_keys(archived)
+                for month, ek, nk in zip(months, exact, near):
+                    self.archive_exact.setdefault(ek, f"보관분 {month}")
+                    self.archive_near.setdefault(nk, f"보관분 {month}")
+            self._archive_version = version
+
+    def lookup(self, exact_key, near_key):
+        """('exact' | 'near' | '', 기존 행번호 또는 '보관분 YYYY-MM')"""
+        if exact_key in self.exact:
+            return "exact", self.exact[exact_key]
+        if exact_key in self.archive_exact:
+            return "exact", self.archive_exact[exact_key]
+        if near_key in self.near:
+            return "near", self.near[near_key]
+        if near_key in self.archive_near:
+            return "near", self.archive_near[near_key]
+        return "", None
+
+@st.cache_resource(show_spinner=False)
+def _duplicate_indexes():
+    return {}
+
+def get_duplicate_index(doc, equip_name):
+    """장비 일지의 중복 인덱스 (리비전 캐시로 받은 일지 + 보관분, 필요한 만큼만 갱신)"""
+    indexes = _duplicate_indexes()
+    index = indexes.setdefault((doc.id, equip_name), LogDuplicateIndex())
+    revision = sheet_data_revision(doc, equip_name)
+    index.update(read_sheet_cached(doc, equip_name, load_log_list), revision)
+    version = archive_version(equip_name)
+    index.update_archive(version, lambda: archived_log_snapshot(equip_name, version))
+    return index
+
+def note_log_append(doc, equip_name, count):
+    """일지 시트 끝에 행을 붙인 직후 호출 - 중복 인덱스/통합 검색 색인이 다시 만들지 않고 새 행만 색인하게 한다"""
+    index = _duplicate_indexes().get((doc.id, equip_name))
+    if index is not None:
+        index.note_append(count)
+    note_search_append(doc, equip_name, count)
+
+def forget_duplicate_index(doc, equip_name):
+    """행 수정/삭제 후 - 뒤에 추가된 경우가 아니므로 다음 조회 때 새로 색인"""
+    _duplicate_indexes().pop((doc.id, equip_name), None)
+
+def check_duplicate_entry(doc, equip_name, company, start, end, hours, product):
+    """단건 입력 폼용: ('exact' | 'near' | '', 기존 행번호)"""
+    exact, near = duplicate_keys(pd.Series([company]), parse_dates([start]), parse_dates([end]),
+                                 pd.Series([float(hours)]), pd.Series([product]))
+    return get_duplicate_index(doc, equip_name).lookup(exact[0], near[0])
+
+def mark_duplicates(f, duplicate_lookup=None, seen=None, sheet=""):
+    """
+    업로드 행마다 _dup('exact'/'near'/'') 와 _dup_at(겹치는 위치) 를 붙인다.
+    같은 파일 안의 반복 행과, duplicate_lookup(장비명) 이 주는 기존 일지 인덱스를 모두 본다.
+    seen: 나눠 읽는 경우 앞 조각에서 본 키 (조각 사이 중복도 잡도록 호출하는 쪽에서 같은 dict 를 넘긴다)
+    """
+    exact, near = duplicate_keys(f["_company"], f["_start"], f["_end"], f["_hours"], f["제품명"])
+    dup = [""] * len(f)
+    dup_at = [""] * len(f)
+    seen = {} if seen is None else seen
+    indexes = {}
+    for i, (equip, row_no, ek, nk) in enumerate(zip(f["장비명"].tolist(), (f.index + 2).tolist(), exact, near)):
+        if duplicate_lookup is not None:
+            if equip not in indexes:
+                try:
+                    indexes[equip] = duplicate_lookup(equip)
+                except Exception:
+                    indexes[equip] = None
+            if indexes[equip] is not None:
+                kind, at = indexes[equip].lookup(ek, nk)
+                if kind:
+                    dup[i], dup_at[i] = kind, f"기존 일지 {duplicate_location(at)}"
+                if kind == "exact":
+                    continue
+        key = (equip,) + ek
+        if key in seen:
+            dup[i], dup_at[i] = "exact", f"업로드 파일 {seen[key]}"
+        else:
+            seen[key] = f"{sheet} {row_no}행" if sheet else f"{row_no}행"
+    f["_dup"] = dup
+    f["_dup_at"] = dup_at
+    return f
+
+def prepare_upload_frame(df_upload, comp_norm_db):
+    """업로드 원본 → 문자열 정리 + 규칙에서 쓰는 파생 컬럼(_로 시작) 추가"""
+    f = pd.DataFrame(index=df_upload.index)
+    for col in LOG_COLUMNS:
+        if col in df_upload.columns:
+            s = df_upload[col]
+            f[col] = s.where(s.notna(), "").astype(str).str.strip()
+        else:
+            f[col] = ""
+    # 엑셀이 숫자로 읽은 사업자번호(1234567891.0) 정리
+    f["사용기관 사업자등록번호"] = f["사용기관 사업자등록번호"].str.replace(r"\.0$", "", regex=True)
+
+    norm = _map_unique(f["사용기관 기업명"], normalize_comp_name)
+    f["_matched"] = norm.isin(comp_norm_db.keys())
+    f["_company"] = f["사용기관 기업명"].where(~f["_matched"], norm.map(lambda n: comp_norm_db.get(n, {}).get("real_name")))
+    f["_biz_num"] = f["사용기관 사업자등록번호"].where(~f["_matched"], norm.map(lambda n: comp_norm_db.get(n, {}).get("biz_num")))
+
+    f["_start"] = parse_dates(f["사용시작일"])
+    f["_end"] = parse_dates(f["사용종료일"])
+    f["_days"] = (f["_end"].fillna(f["_start"]) - f["_start"]).dt.days + 1
+    f["_hours"] = _map_unique(f["사용시간"], parse_hours).astype(float)
+    return f
+
+def validate_upload_rows(df_upload, equip_info_db, comp_norm_db, rules=None, duplicate_lookup=None,
+                         seen=None, sheet=""):
+    """
+    일괄 업로드 검토: UPLOAD_RULES 를 컬럼 단위로 한 번씩 평가 + 업체명 자동 보정 + 중복 검사
+    duplicate_lookup(장비명) → LogDuplicateIndex (없으면 파일 안의 중복만 본다)
+    seen/sheet: 파일을 조각으로 나눠 검토할 때 조각 사이 중복 추적용 dict / 결과에 붙일 시트 이름
+    반환: (저장할 행 리스트, 오류 목록, 자동 보정 목록, 유사 중복 목록)
+    """
+    rules = UPLOAD_RULES if rules is None else rules
+    f = mark_duplicates(prepare_upload_frame(df_upload, comp_norm_db), duplicate_lookup, seen, sheet)
+    ctx = {"equip_names": list(equip_info_db.keys()), "comp_norm_db": comp_norm_db}
+
+    reasons = pd.Series("", index=f.index, dtype=object)
+    kinds = [[] for _ in range(len(f))]  # 행마다 걸린 규칙 이름 목록 (사유별 집계는 이 목록으로)
+    for rule in rules:
+        mask = rule.check(f, ctx).fillna(False).astype(bool)
+        if not mask.any():
+            continue
+        msg = rule.render(f.loc[mask])
+        prev = reasons.loc[mask]
+        reasons.loc[mask] = prev.where(prev == "", prev + ", ") + msg
+        for i in np.flatnonzero(mask.to_numpy()):
+            kinds[i].append(rule.name)
+
+    row_no = (f.index + 2).tolist()
+    f["_sheet"] = sheet
+
+    def records(mask, columns):
+        """mask 행만 골라 {표시명: 값} 목록으로 (to_dict 보다 빠르게 컬럼 단위로 꺼낸다)"""
+        if sheet:
+            columns = [("시트", "_sheet")] + columns
+        idx = np.flatnonzero(mask.to_numpy())
+        cols = {label: [row_no[i] for i in idx] if src is None else f[src].to_numpy(dtype=object)[idx].tolist()
+                for label, src in columns}
+        return [dict(zip(cols, vals)) for vals in zip(*cols.values())]
+
+    corrected = f["_matched"] & ((f["사용기관 기업명"] != f["_company"]) | (f["사용기관 사업자등록번호"] != f["_biz_num"]))
+    auto_corrected = records(corrected, [("행 번호", None), ("원본 기업명", "사용기관 기업명"), ("보정 기업명", "_company"),
+                                         ("원본 사업자번호", "사용기관 사업자등록번호"), ("보정 사업자번호", "_biz_num")])
+
+    failed = reasons != ""
+    f["_reasons"] = reasons
+    f["_kinds"] = pd.Series(kinds, index=f.index, dtype=object)
+    error_logs = records(failed, [("행 번호", None), ("기업명", "사용기관 기업명"), ("장비명", "장비명"), ("오류 유형", "_kinds"),
+                                  ("오류 내용", "_reasons")])
+
+    save_cols = [{"사용기관 기업명": "_company", "사용기관 사업자등록번호": "_biz_num"}.get(c, c) for c in LOG_COLUMNS]
+    ok = np.flatnonzero(~failed.to_numpy())
+    valid_rows = [list(r) for r in zip(*(f[c].to_numpy(dtype=object)[ok].tolist() for c in save_cols))]
+
+    near_dups = records((f["_dup"] == "near") & ~failed, [("행 번호", None), ("기업명", "_company"), ("장비명", "장비명"),
+                                                         ("사용시작일", "사용시작일"), ("겹치는 기록", "_dup_at")])
+
+    return valid_rows, error_logs, auto_corrected, near_dups
+
+
+def compute_utilization(df, maintenance_df, calc_start, calc_end):
+    """
+    활용률 계산 (A)~(H). df/maintenance_df 는 시트 원본(문자열) 그대로 받아 여기서 전처리한다.
+    선택 기간에 사용 데이터가 없으면 empty_sample 에 최근 20건(원본/파싱 값)을 담아 돌려준다.
+    """
+    # [A] 가동가능시간 계산
+    date_range = pd.date_range(start=calc_start, end=calc_end)
+    workdays = date_range[date_range.dayofweek < 5]
+    annual_available_hours = len(workdays) * 8.0
+
+    # [D, E] 사용 데이터
+    internal_hours = 0.0
+    external_hours = 0.0
+    empty_sample = None
+
+    if not df.empty:
+        # ✅ [핵심] 날짜/시간 전처리로 0 문제 해결
+        df['사용시작일_raw'] = df['사용시작일']
+        df['사용시작일'] = parse_dates(df['사용시작일'])
+
+        df['사용시간_raw'] = df['사용시간']
+        df['사용시간'] = df['사용시간'].apply(parse_hours)
+
+        df['활용유형'] = df['활용유형'].astype(str).str.strip()
+
+        mask = (df['사용시작일'].dt.date >= calc_start) & (df['사용시작일'].dt.date <= calc_end)
+        period_df = df.loc[mask].copy()
+
+        if period_df.empty:
+            empty_sample = df[['사용시작일_raw', '사용시작일', '사용시간_raw', '사용시간', '활용유형']].tail(20)
+
+        internal_hours = period_df[period_df['활용유형'].str.contains('내부', na=False)]['사용시간'].sum()
+        external_hours = period_df[period_df['활용유형'].str.contains('외부', na=False)]['사용시간'].sum()
+
+    # [C] 유지보수 시간
+    maintenance_hours = 0.0
+
+    if not maintenance_df.empty:
+        maintenance_df['시작일_raw'] = maintenance_df['시작일']
+        maintenance_df['시작일'] = parse_dates(maintenance_df['시작일'])
+
+        maintenance_df['시간_raw'] = maintenance_df['시간']
+        maintenance_df['시간'] = maintenance_df['시간'].apply(parse_hours)
+
+        m_mask = (maintenance_df['시작일'].dt.date >= calc_start) & (maintenance_df['시작일'].dt.date <= calc_end)
+        period_m_df = maintenance_df.loc[m_mask].copy()
+
+        maintenance_hours = period_m_df['시간'].sum()
+
+    # [계산 로직]
+    actual_available_hours = annual_available_hours - maintenance_hours
+    actual_usage_hours = external_hours + internal_hours
+
+    if actual_available_hours > 0:
+        utilization_rate = (actual_usage_hours / actual_available_hours)
+        external_rate = (external_hours / actual_available_hours)
+    else:
+        utilization_rate = 0.0
+        external_rate = 0.0
+
+    return {
+        "annual_available": annual_available_hours,
+        "maintenance": maintenance_hours,
+        "external": external_hours,
+        "internal": internal_hours,
+        "actual_available": actual_available_hours,
+        "actual_usage": actual_usage_hours,
+        "utilization_rate": utilization_rate,
+        "external_rate": external_rate,
+        "workdays_count": len(workdays),
+        "empty_sample": empty_sample,
+    }
+
+
+@st.cache_data(show_spinner=False)
+def build_template_excel(template_cols):
+    """업로드 양식(빈칸) 엑셀 바이트 - xlsxwriter는 최초 1회만 로딩"""
+    df_template = pd.DataFrame(columns=list(template_cols))
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df_template.to_excel(writer, index=False, sheet_name='Sheet1')
+    return output.getvalue()
+
+UPLOAD_REQUIRED_COLUMNS = ["사용기관 기업명", "사용기관 사업자등록번호", "장비명"]
+
+class UploadReader:
+    """
+    업로드 파일(xlsx 여러 시트 / csv)을 chunk_rows 행씩 DataFrame 으로 읽는다.
+    xlsx 는 openpyxl read-only 모드로 한 행씩 흘려 읽고, LOG_COLUMNS 에 있는 컬럼만 남긴다.
+    DataFrame 인덱스 = 엑셀 행 번호 - 2 (검토 결과의 '행 번호'가 원본 파일과 맞도록). 빈 행은 건너뛴다.
+    """
+    def __init__(self, file, name, chunk_rows=2000, on_progress=None):
+        self.file = file
+        self.name = name
+        self.chunk_rows = chunk_rows
+        self.on_progress = on_progress or (lambda fraction, text: None)
+        self.sheet_count = 1
+        self.sheets = []
+        self.skipped = []
+        self.rows = 0
+
+    def chunks(self):
+        """(시트 이름, DataFrame) 을 차례로 낸다. 필수 컬럼이 없는 시트는 skipped 에 (시트, 누락 컬럼) 으로 남긴다"""
+        if self.name.lower().endswith(".csv"):
+            yield from self._csv_chunks()
+        else:
+            yield from self._xlsx_chunks()
+        self.on_progress(1.0, f"읽기 완료: {self.rows:,}행")
+
+    def _sheet_chunks(self, sheet, rows, first_row, progress):
+        """rows: 헤더 다음 행부터의 값 튜플 이터레이터, first_row: 그 첫 행의 파일 내 행 번호"""
+        header = None
+        for header_row in rows:
+            first_row += 1
+            if any(v not in (None, "") for v in header_row):
+                header = [str(v).strip() if v is not None else "" for v in header_row]
+                break
+        if header is None:
+            return
+        missing = [c for c in UPLOAD_REQUIRED_COLUMNS if c not in header]
+        if missing:
+            self.skipped.append((sheet, missing))
+            return
+        self.sheets.append(sheet)
+        cols = [c for c in LOG_COLUMNS if c in header]
+        pos = [header.index(c) for c in cols]
+
+        buf, idx = [], []
+        for row_no, values in enumerate(rows, start=first_row + 1):
+            picked = [values[p] if p < len(values) else None for p in pos]
+            if all(v in (None, "") for v in picked):
+                continue
+            buf.append(picked)
+            idx.append(row_no - 2)
+            if len(buf) >= self.chunk_rows:
+                self.rows += len(buf)
+                progress(row_no)
+                yield sheet, pd.DataFrame(buf, columns=cols, index=idx)
+                buf, idx = [], []
+        if buf:
+            self.rows += len(buf)
+            yield sheet, pd.DataFrame(buf, columns=cols, index=idx)
+
+    def _xlsx_chunks(self):
+        openpyxl = _timed_import("openpyxl")
+        wb = openpyxl.load_workbook(self.file, read_only=True, data_only=True)
+        try:
+            n = self.sheet_count = len(wb.worksheets)
+            for i, ws in enumerate(wb.worksheets):
+                total = ws.max_row or 0
+
+                def progress(row_no, i=i, ws=ws, total=total):
+                    part = min(row_no / total, 1.0) if total else 0.5
+                    self.on_progress((i + part) / n, f"'{ws.title}' 시트 읽는 중... {row_no:,}/{total:,}행")
+                yield from self._sheet_chunks(ws.title, ws.iter_rows(values_only=True), 0, progress)
+        finally:
+            wb.close()
+
+    def _csv_encoding(self, block=1 << 20):
+        """파일 전체가 utf-8 로 읽히면 utf-8-sig, 중간에 UnicodeDecodeError 가 나면 cp949 (블록 단위로 훑어 메모리는 일정)"""
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.file.seek(0)
+        try:
+            while True:
+                data = self.file.read(block)
+                decoder.decode(data, final=not data)
+                if not data:
+                    return "utf-8-sig"
+        except UnicodeDecodeError:
+            return "cp949"
+        finally:
+            self.file.seek(0)
+
+    def _csv_chunks(self):
+        # 업로드 파일을 문자열로 통째로 풀지 않고 TextIOWrapper 로 흘려 읽는다 (조각마다 그만큼만 메모리에 둔다)
+        encoding = self._csv_encoding()
+        size = max(self.file.seek(0, io.SEEK_END), 1)
+        self.file.seek(0)
+        stream = io.TextIOWrapper(self.file, encoding=encoding, newline="")
+
+        def progress(row_no):
+            self.on_progress(min(self.file.tell() / size, 1.0), f"CSV 읽는 중... {row_no:,}행")
+        try:
+            yield from self._sheet_chunks("CSV", csv.reader(stream), 0, progress)
+        finally:
+            stream.detach()  # 업로드 파일 객체는 닫지 않는다
+
+def ingest_upload(file, name, equip_info_db, comp_norm_db, duplicate_lookup=None, chunk_rows=2000, on_progress=None):
+    """
+    업로드 파일을 조각 단위로 읽으면서 바로 검토한다 (전체를 한 번에 DataFrame 으로 만들지 않음).
+    반환: {"total", "sheets", "skipped", "valid_rows", "error_logs", "auto_corrected", "near_dups", "error_rows"}
+    error_rows: 오류 행의 원본 값 + 행 번호/오류 유형/오류 내용 (주석 달린 보고서 엑셀용 DataFrame)
+    """
+    reader = UploadReader(file, name, chunk_rows, on_progress)
+    seen = {}
+    out = {"valid_rows": [], "error_logs": [], "auto_corrected": [], "near_dups": []}
+    error_rows = []
+    for sheet, chunk in reader.chunks():
+        valid, errors, corrected, near = validate_upload_rows(
+            chunk, equip_info_db, comp_norm_db, duplicate_lookup=duplicate_lookup, seen=seen,
+            sheet=sheet if reader.sheet_count > 1 else "")
+        out["valid_rows"] += valid
+        out["error_logs"] += errors
+        out["auto_corrected"] += corrected
+        out["near_dups"] += near
+        if errors:
+            raw = chunk.loc[[e["행 번호"] - 2 for e in errors]].reset_index(drop=True)
+            raw.insert(0, "행 번호", [e["행 번호"] for e in errors])
+            raw.insert(0, "시트", sheet)
+            raw["오류 유형"] = [", ".join(e["오류 유형"]) for e in errors]
+            raw["오류 내용"] = [e["오류 내용"] for e in errors]
+            error_rows.append(raw)
+    out["error_rows"] = pd.concat(error_rows, ignore_index=True) if error_rows else pd.DataFrame()
+    out.update(total=reader.rows, sheets=reader.sheets, skipped=reader.skipped)
+    return out
+
+
+# ==========================================
+# 3-3. 로그인용 사용자 인덱스 (솔트 해시, 백그라운드 갱신)
+# ==========================================
+def hash_password(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", str(password).strip().encode("utf-8"), salt, iterations)
+
+class UserIndex:
+    """
+    사용자관리 시트만 읽어 {아이디: 이름/부서/솔트/해시} 인덱스를 만든다.
+    평문 비밀번호는 인덱스 생성 중에만 쓰고 보관하지 않는다.
+    시트는 다른 읽기와 같이 리비전 캐시(read_sheet_cached)로 읽으므로, 바뀌지 않았으면 다시 받지도 다시 만들지도 않는다.
+    (아이디, 비밀번호)가 그대로인 행은 이전 솔트/해시를 다시 쓰므로, 갱신 비용은 바뀐 계정 수만큼만 든다.
+    """
+    def __init__(self, doc, refresh_sec, iterations, miss_refresh_sec=30):
+        self._doc = doc
+        self._refresh_sec = refresh_sec
+        self._iterations = iterations
+        self._miss_refresh_sec = miss_refresh_sec
+        self._lock = threading.Lock()
+        self._miss_lock = threading.Lock()
+        self._miss_at = 0.0
+        # 바뀐 행을 알아보기 위한 지문 키 (프로세스 메모리에만 있음 → 지문만으로는 비밀번호를 맞춰 볼 수 없다)
+        self._fingerprint_key = secrets.token_bytes(32)
+        self._users = {}
+        self._records = None
+        self.loaded_at = 0.0
+        self.last_error = None
+        self.stats = {"hashed": 0, "reused": 0, "miss_refresh": 0}
+        self._thread = None
+
+    def _fingerprint(self, uid, password):
+        return hmac.new(self._fingerprint_key, f"{uid}\0{str(password).strip()}".encode("utf-8"), "sha256").digest()
+
+    def refresh(self):
+        with self._lock:
+            records = read_sheet_cached(self._doc, "사용자관리", get_sheet_records)
+            if records is self._records:
+                # 리비전이 그대로라 캐시에서 같은 목록을 받았다 - 다시 만들 것이 없다
+                self.loaded_at = time.time()
+                return
+            previous = self._users
+            users = {}
+            for row in records:
+                uid = str(row.get("아이디", "")).strip()
+                if not uid:
+                    continue
+                fingerprint = self._fingerprint(uid, row.get("비밀번호", ""))
+                old = previous.get(uid)
+                if old is not None and hmac.compare_digest(old["fingerprint"], fingerprint):
+                    salt, digest = old["salt"], old["hash"]
+                    self.stats["reused"] += 1
+                else:
+                    salt = secrets.token_bytes(16)
+                    digest = hash_password(row.get("비밀번호", ""), salt, self._iterations)
+                    self.stats["hashed"] += 1
+                users[uid] = {
+                    "아이디": uid,
+                    "이름": row.get("이름", ""),
+                    "부서": row.get("부서", ""),
+                    "salt": salt,
+                    "hash": digest,
+                    "fingerprint": fingerprint,
+                }
+            self._users = users  # 참조 교체 → 읽는 쪽은 항상 완성된 인덱스만 본다
+            self._records = records
+            self.loaded_at = time.time()
+            self.last_error = None
+
+    def _claim_miss_refresh(self):
+        now = time.time()
+        with self._miss_lock:
+            if now - max(self._miss_at, self.loaded_at) < self._miss_refresh_sec:
+                return False
+            self._miss_at = now
+            self.stats["miss_refresh"] += 1
+            return True
+
+    def _loop(self):
+        set_sheets_tag("refresh")
+        while True:
+            time.sleep(self._refresh_sec)
+            try:
+                with sheets_priority("background"):
+                    self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="user-index-refresh", daemon=True)
+            self._thread.start()
+
+    def authenticate(self, username, password):
+        """(사용자 정보, 사유) 반환. 사유: 'ok' / 'no_user' / 'bad_password'"""
+        uid = str(username).strip()
+        user = self._users.get(uid)
+        if user is None and self._claim_miss_refresh():
+            # 방금 추가된 계정일 수 있으므로 즉시 갱신 (모르는 아이디를 연달아 넣어도 miss_refresh_sec 에 한 번만)
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+            user = self._users.get(uid)
+        if user is None:
+            return None, "no_user"
+        digest = hash_password(password, user["salt"], self._iterations)
+        if not hmac.compare_digest(digest, user["hash"]):
+            return None, "bad_password"
+        return {"아이디": uid, "이름": user["이름"], "부서": user["부서"]}, "ok"
+
+@st.cache_resource(show_spinner=False)
+def get_user_index(_client):
+    index = UserIndex(
+        open_spreadsheet(_client),
+        refresh_sec=get_setting("auth_refresh_sec", 300),
+        iterations=get_setting("auth_hash_iterations", 20000),
+    )
+    index.refresh()
+    index.start()
+    return index
+
+
+# ==========================================
+# 3-4. 기업명 자동완성 인덱스 (접두어 + 초성)
+# ==========================================
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+
+def to_choseong(text):
+    """'대한정밀' → 'ㄷㅎㅈㅁ' (한글 음절만 초성으로, 나머지 글자는 그대로)"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        out.append(CHOSEONG[code // 588] if 0 <= code < 11172 else ch)
+    return "".join(out)
+
+def _search_key(name):
+    return normalize_comp_name(name).lower()
+
+class CompanySearchIndex:
+    """
+    기업목록 검색용 정렬 키 목록 (정규화 이름 / 초성).
+    접두어는 이분 탐색으로 찾고, 후보가 모자랄 때만 부분 일치로 채운다.
+    초성이 섞인 검색어('대ㅎ')는 초성 키로 찾은 뒤, 완성된 글자로 친 자리는 그 글자가 같은 것만 남긴다.
+    """
+    def __init__(self, comp_db):
+        self._comp_db = comp_db
+        names = list(comp_db.keys())
+        self._key = {n: _search_key(n) for n in names}
+        self._by_name = sorted((self._key[n], n) for n in names)
+        self._by_cho = sorted((to_choseong(self._key[n]), n) for n in names)
+        self._name_keys = [k for k, _ in self._by_name]
+        self._cho_keys = [k for k, _ in self._by_cho]
+
+    @staticmethod
+    def _prefix(keys, pairs, q, limit, seen, out, match=None):
+        i = bisect.bisect_left(keys, q)
+        while i < len(keys) and len(out) < limit and keys[i].startswith(q):
+            name = pairs[i][1]
+            if name not in seen and (match is None or match(name)):
+                seen.add(name)
+                out.append(name)
+            i += 1
+
+    def search(self, query, limit=20):
+        """[(기업명, 사업자번호), ...] 최대 limit 개"""
+        q = _search_key(query or "")
+        if not q:
+            return []
+        out, seen = [], set()
+        if any("ㄱ" <= ch <= "ㅎ" for ch in q):
+            def match(name):
+                return all(qc == kc or qc in CHOSEONG for qc, kc in zip(q, self._key[name]))
+            self._prefix(self._cho_keys, self._by_cho, to_choseong(q), limit, seen, out, match)
+        else:
+            self._prefix(self._name_keys, self._by_name, q, limit, seen, out)
+            if len(out) < limit:
+                for key, name in self._by_name:
+                    if q in key and name not in seen:
+                        seen.add(name)
+                        out.append(name)
+                        if len(out) >= limit:
+                            break
+        return [(name, self._comp_db.get(name, "")) for name in out]
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_company_index(version, _comp_db):
+    """기업목록 버전이 바뀔 때만 다시 만든다"""
+    return CompanySearchIndex(_comp_db)
+
+def company_index_for(doc, comp_db):
+    """버전 = 리비전 캐시가 기업목록을 새로 받을 때마다 바뀌는 번호 (실행마다 목록 전체를 해시하지 않는다)"""
+    token = get_revision_cache().load_token((doc.id, "기업목록", get_sheet_values.__name__))
+    if token is None:
+        token = hash(tuple(comp_db.items()))
+    return get_company_index((doc.id, token), comp_db)
+
+
+# ==========================================
+# 3-5. 오래된 일지 보관 (월별 Parquet 아카이브)
+# ==========================================
+# 기준일 이전 행을 시트에서 빼서 {보관폴더}/{장비}/YYYY-MM/part-*.parquet 로 옮긴다.
+# 장비별 manifest.json 에 파티션별 행 수 / sha256 / 날짜 범위를, audit.jsonl 에 작업 이력을 남긴다.
+_ARCHIVE_LOCK = threading.Lock()
+
+def archive_root():
+    return get_setting("archive_dir", "cpri_archive")
+
+def _archive_dir(equip_name):
+    return os.path.join(archive_root(), re.sub(r'[\\/:*?"<>|]', "_", equip_name))
+
+def load_archive_manifest(equip_name):
+    path = os.path.join(_archive_dir(equip_name), "manifest.json")
+    if not os.path.exists(path):
+        return {"partitions": {}}
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp, path)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def read_archive_partition(path, sha256):
+    """파티션 파일 읽기 (체크섬이 manifest 와 다르면 오류). 같은 파일·체크섬이면 캐시에서"""
+    with open(path, "rb") as fp:
+        data = fp.read()
+    if hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f"보관 파일 체크섬 불일치: {path}")
+    return pd.read_parquet(io.BytesIO(data))
+
+def load_archived_logs(equip_name, start=None, end=None, columns=None):
+    """
+    보관된 일지. start/end(date) 를 주면 그 기간과 겹치는 월 파티션만 읽는다. 행번호는 0 (시트에 없는 행)
+    columns: 남길 열 (None 이면 전부)
+    """
+    columns = LOG_COLUMNS if columns is None else [c for c in LOG_COLUMNS if c in columns]
+    manifest = load_archive_manifest(equip_name)
+    lo = (start.year, start.month) if start else None
+    hi = (end.year, end.month) if end else None
+    frames = []
+    for rel, part in sorted(manifest["partitions"].items()):
+        ym = (part["year"], part["month"])
+        if (lo and ym < lo) or (hi and ym > hi):
+            continue
+        frames.append(read_archive_partition(os.path.join(_archive_dir(equip_name), rel), part["sha256"]))
+    if not frames:
+        return pd.DataFrame(columns=["행번호"] + columns)
+    df = pd.concat([f[columns] for f in frames], ignore_index=True)
+    df.insert(0, "행번호", 0)
+    return df
+
+def archive_version(equip_name):
+    """보관분 버전 - 파티션 체크섬 목록 (보관할 때마다 바뀐다, 보관분이 없으면 빈 tuple)"""
+    return tuple(sorted(p["sha256"] for p in load_archive_manifest(equip_name)["partitions"].values()))
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def archived_log_snapshot(equip_name, version):
+    """
+    보관분 전체 (version 별로 한 번만 읽어 여러 세션이 같은 객체를 쓴다 - 수정하지 말 것).
+    중복 인덱스/통합 검색처럼 보관된 행까지 찾아야 하는 곳에서 쓴다
+    """
+    return load_archived_logs(equip_name)
+
+def load_log_history(doc, equip_name, start=None, end=None, columns=None):
+    """보관분(기간에 걸리는 파티션만) + 시트 현재 행. 활용률 계산처럼 읽기만 하는 곳에서 쓴다"""
+    live = load_log_frame(doc, equip_name, columns)
+    archived = load_archived_logs(equip_name, start, end, columns)
+    if archived.empty:
+        return live
+    return pd.concat([archived, live], ignore_index=True)
+
+@contextlib.contextmanager
+def _archive_file_lock(equip_name):
+    """
+    프로세스 사이 잠금: 장비 보관 폴더에 .lock 파일을 만들어 둔다 (_ARCHIVE_LOCK 는 한 프로세스 안에서만 막는다).
+    archive_lock_stale_sec 보다 오래된 잠금 파일은 죽은 작업이 남긴 것으로 보고 치운다.
+    """
+    path = os.path.join(_archive_dir(equip_name), ".lock")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            age = 0.0
+        if age < get_setting("archive_lock_stale_sec", 1800):
+            raise RuntimeError("다른 곳에서 이 장비의 보관 작업이 진행 중입니다. 잠시 후 다시 시도해주세요.")
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    try:
+        os.write(fd, f"{os.getpid()} {datetime.now():%Y-%m-%d %H:%M:%S}".encode("utf-8"))
+        os.close(fd)
+        yield
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+def _write_partitions(base, manifest, frame, files):
+    """frame(_date 포함)을 월별 part 파일로 쓰고 다시 읽어 검증한 뒤 manifest 에 올린다. 쓴 파일은 files 에 추가"""
+    for (y, m), part in frame.groupby([frame["_date"].dt.year, frame["_date"].dt.month]):
+        # 같은 초에 여러 번 보관해도 겹치지 않도록 파일 이름마다 uuid 를 붙인다
+        rel = f"{int(y):04d}-{int(m):02d}/part-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:12]}.parquet"
+        buf = io.BytesIO()
+        part[LOG_COLUMNS].to_parquet(buf, index=False)
+        data = buf.getvalue()
+        sha = hashlib.sha256(data).hexdigest()
+        _write_atomic(os.path.join(base, rel), data)
+        files.append({"path": rel, "rows": len(part), "sha256": sha})
+        if len(read_archive_partition(os.path.join(base, rel), sha)) != len(part):
+            raise ValueError(f"보관 파일 검증 실패: {rel}")
+        manifest["partitions"][rel] = {
+            "year": int(y), "month": int(m), "rows": len(part), "sha256": sha,
+            "min": str(part["_date"].min().date()), "max": str(part["_date"].max().date()),
+        }
+
+def _remove_partition_files(base, files):
+    for f in files:
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(base, f["path"]))
+
+def archive_log_rows(doc, equip_name, cutoff, user=""):
+    """
+    사용시작일이 cutoff(date) 이전인 행을 보관 파일로 옮기고 시트에서 지운다.
+    파일을 쓰고 다시 읽어 검증한 뒤에만 지우며, 그 사이 시트가 바뀌었으면 쓴 파일을 되돌리고 중단한다.
+    행은 묶음마다 지우기 직전에 다시 읽어 보관한 값과 같을 때만 지우고, 도중에 멈추면 지운 행만 보관분에 남긴다.
+    반환: {"rows": 옮긴 행 수, "files": [{path, rows, sha256}]}
+    """
+    with _ARCHIVE_LOCK, _archive_file_lock(equip_name):
+        invalidate_sheet(doc, equip_name)
+        revision = get_revision_cache().doc_revision(doc)
+        if revision is None:
+            # 수정 시각을 모르면 그 사이 변경을 알아챌 수 없으므로 진행하지 않는다
+            raise RuntimeError("시트 수정 시각을 확인할 수 없어 보관을 중단합니다. 잠시 후 다시 시도해주세요.")
+        live = read_sheet_cached(doc, equip_name, load_log_data)
+        dates = parse_dates(live["사용시작일"])
+        mask = dates < pd.Timestamp(cutoff)
+        # 빈 DataFrame 에 Series 를 붙이면 그 Series 의 인덱스를 가져오므로 날짜도 같은 마스크로 자른다
+        old = live.loc[mask].assign(_date=dates[mask])
+        if old.empty:
+            return {"rows": 0, "files": []}
+
+        base = _archive_dir(equip_name)
+        manifest_path = os.path.join(base, "manifest.json")
+        manifest = load_archive_manifest(equip_name)
+        before = json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")
+        files = []
+        try:
+            _write_partitions(base, manifest, old, files)
+            invalidate_sheet(doc, equip_name)
+            if get_revision_cache().doc_revision(doc) != revision:
+                raise RuntimeError("보관 중에 시트가 수정되었습니다. 다시 시도해주세요.")
+            _write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+        except Exception:
+            _remove_partition_files(base, files)
+            _write_atomic(manifest_path, before)
+            raise
+
+        # 연속된 행 묶음 단위로, 아래쪽부터 지워야 위쪽 행번호가 밀리지 않는다
+        row_nums = sorted(old["행번호"].tolist())
+        runs = []
+        for n in row_nums:
+            if runs and n == runs[-1][1] + 1:
+                runs[-1][1] = n
+            else:
+                runs.append([n, n])
+        archived = {n: row_version(v) for n, v in zip(old["행번호"], old[LOG_COLUMNS].values.tolist())}
+        entry = {"at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "user": user, "equip": equip_name,
+                 "cutoff": str(cutoff), "rows": len(old), "files": files}
+        ws = get_worksheet(doc, equip_name)
+        deleted = []
+        try:
+            for first, last in reversed(runs):
+                # 리비전 확인 뒤에도 행이 추가/수정/삭제될 수 있으므로 지우기 직전에 그 범위를 다시 읽어 맞춰 본다
+                current = ws.get(f"A{first}:U{last}")
+                current += [[]] * (last - first + 1 - len(current))
+                if any(row_version(v) != archived[n] for n, v in zip(range(first, last + 1), current)):
+                    raise RuntimeError(f"보관 중에 {first}~{last}행이 바뀌어 그 위쪽 행은 지우지 않았습니다.")
+                ws.delete_rows(first, last)
+                deleted.extend(range(first, last + 1))
+        except Exception as e:
+            entry["error"] = f"시트 행 삭제 중단: {e}"
+            # 지우지 못한 행은 시트에 그대로 있으므로 보관분에서 빼서 양쪽에 같은 행이 남지 않게 한다
+            try:
+                manifest = json.loads(before)
+                kept = []
+                _write_partitions(base, manifest, old[old["행번호"].isin(deleted)], kept)
+                _write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+                _remove_partition_files(base, files)
+                entry["rows"], entry["files"] = len(deleted), kept
+            except Exception as cleanup:
+                entry["error"] += f" / 보관분 정리 실패(시트와 보관분에 같은 행이 있을 수 있음): {cleanup}"
+            raise
+        finally:
+            invalidate_sheet(doc, equip_name)
+            forget_duplicate_index(doc, equip_name)
+            forget_search_sheet(doc, equip_name)
+            _append_archive_audit(entry)
+        return entry
+
+def _append_archive_audit(entry):
+    os.makedirs(archive_root(), exist_ok=True)
+    with open(os.path.join(archive_root(), "audit.jsonl"), "a", encoding="utf-8") as fp:
+        fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def read_archive_audit(limit=20):
+    path = os.path.join(archive_root(), "audit.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fp:
+        lines = fp.readlines()[-limit:]
+    return [json.loads(line) for line in reversed(lines)]
+
+
+# ==========================================
+# 3-6. 장비 선택 시 미리 받기 (백그라운드 프리패치)
+# ==========================================
+class TabPrefetcher:
+    """
+    사이드바에서 장비를 고르면 탭2/탭3 이 쓸 시트(일지, 유지보수)를 스레드 풀에서 미리 받아 리비전 캐시에 넣는다.
+    같은 시트를 화면에서 바로 읽으면 SingleFlight 로 진행 중인 요청에 합류하므로 두 번 받지 않는다.
+    """
+    def __init__(self, workers):
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpri-prefetch")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.stats = {"submitted": 0, "done": 0, "failed": 0}
+
+    def submit(self, doc, equip_name):
+        key = (doc.id, equip_name)
+        with self._lock:
+            fut = self._pending.get(key)
+            if fut is not None and not fut.done():
+                return fut
+            self.stats["submitted"] += 1
+            fut = self._pool.submit(self._run, doc, equip_name)
+            self._pending[key] = fut
+            return fut
+
+    def _run(self, doc, equip_name):
+        set_sheets_tag("prefetch")
+        try:
+            with sheets_priority("background"):
+                get_duplicate_index(doc, equip_name)
+                load_maintenance_table(doc)
+                try:
+                    read_sheet_cached(doc, f"{equip_name}_유지보수", parse_maintenance_sheet)
+                except gspread.exceptions.WorksheetNotFound:
+                    pass
+            self.stats["done"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    def pending(self, doc, equip_name):
+        """아직 받는 중이면 Future, 아니면 None"""
+        fut = self._pending.get((doc.id, equip_name))
+        return fut if fut is not None and not fut.done() else None
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher():
+    return TabPrefetcher(get_setting("prefetch_workers", 2))
+
+def prefetch_equipment(doc, equip_name):
+    """장비 선택이 바뀐 실행에서만 프리패치를 건다 (매 실행마다 걸면 탭2가 계속 '받는 중' 상태가 된다)"""
+    if st.session_state.get("_prefetched_equip") == equip_name:
+        return
+    st.session_state["_prefetched_equip"] = equip_name
+    get_background_refresher().note_use(equip_name)
+    get_prefetcher().submit(doc, equip_name)
+
+def log_frame_prefetched(doc, equip_name):
+    """
+    (일지 DataFrame, 최신 여부). 프리패치가 진행 중이고 이전에 받아 둔 값이 있으면 기다리지 않고 그 값을 준다.
+    처음 보는 장비라 캐시에 아무것도 없을 때만 진행 중인 요청을 기다린다.
+    리비전 캐시의 공유 프레임을 그대로 주므로 읽기만 한다 (세션마다 복사본을 두지 않게).
+    """
+    if get_prefetcher().pending(doc, equip_name) is not None:
+        stale = get_revision_cache().peek((doc.id, equip_name, load_log_list.__name__))
+        if stale is not None:
+            return stale, False
+    return read_sheet_cached(doc, equip_name, load_log_list), True
+
+@st.fragment(run_every=1.0)
+def prefetch_watcher(doc, equip_name):
+    """이전 값으로 그린 화면: 프리패치가 끝나면 전체를 다시 그려 최신 값으로 바꾼다"""
+    if get_prefetcher().pending(doc, equip_name) is None:
+        st.rerun()
+    st.caption("⏳ 최신 데이터를 받는 중입니다. 잠시 전에 받아 둔 데이터를 표시합니다 (수정/삭제는 받은 뒤 가능).")
+
+
+# ==========================================
+# 3-7. 백그라운드 갱신 (웜 스타트 + 주기 갱신, stale-while-revalidate)
+# ==========================================
+# 첫 로그인 후 기준 정보와 자주 쓰는 장비 일지를 미리 받고, 이후 주기적으로 갱신한다.
+# 로그인 화면은 가볍게 떠야 하므로 인증(gspread/google-auth 로딩)과 첫 읽기는 모두 갱신 스레드 안에서 한다.
+# allow_stale 로 읽는 곳은 갱신이 도는 동안 마지막으로 받은 값을 그대로 쓴다.
+WARM_SHEET_LOADERS = {
+    "장비목록": get_sheet_records,
+    "기업목록": get_sheet_values,
+    MAINTENANCE_SHEET: parse_maintenance_table,
+}
+
+class BackgroundRefresher:
+    def __init__(self, interval_sec, warm_sheets, warm_equipment, top_n, state_path):
+        self.interval_sec = interval_sec
+        self.warm_sheets = warm_sheets
+        self.warm_equipment = warm_equipment
+        self.top_n = top_n
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._usage = collections.Counter(self._load_usage())
+        self._usage_dirty = False
+        self._kicked = set()
+        self._kick_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="cpri-revalidate")
+        self._make_client = None
+        self._client = None
+        self._thread = None
+        self.stats = {"cycles": 0, "refreshed": 0, "kicked": 0, "errors": 0, "last_cycle": None, "last_error": None}
+
+    def _load_usage(self):
+        """이전 실행에서 많이 본 장비 (재배포 후 첫 사용자도 데워진 캐시를 쓰도록 파일에 남겨 둔다)"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as fp:
+                return json.load(fp).get("usage", {})
+        except Exception:
+            return {}
+
+    def _save_usage(self):
+        if not self.state_path or not self._usage_dirty:
+            return
+        with self._lock:
+            data = json.dumps({"usage": dict(self._usage)}, ensure_ascii=False).encode("utf-8")
+            self._usage_dirty = False
+        _write_atomic(os.path.abspath(self.state_path), data)
+
+    def note_use(self, equip_name):
+        with self._lock:
+            self._usage[equip_name] += 1
+            self._usage_dirty = True
+
+    def targets(self):
+        """[(시트 이름, 로더)] - 기준 정보 시트 + 지정 장비 + 많이 본 장비 top_n"""
+        with self._lock:
+            top = [name for name, _ in self._usage.most_common(self.top_n)]
+        equips = list(dict.fromkeys(self.warm_equipment + top))
+        return ([(name, WARM_SHEET_LOADERS.get(name, get_sheet_values)) for name in self.warm_sheets]
+                + [(name, load_log_list) for name in equips])
+
+    def refresh_all(self, doc):
+        for sheet_name, loader in self.targets():
+            try:
+                read_sheet_cached(doc, sheet_name, loader)
+                self.stats["refreshed"] += 1
+            except gspread.exceptions.WorksheetNotFound:
+                pass
+            except Exception as e:
+                self._error(f"{sheet_name}: {e}")
+
+    def _error(self, message):
+        # 스크립트 스레드가 아니므로 화면(st.*) 대신 통계와 로그로만 남긴다
+        self.stats["errors"] += 1
+        self.stats["last_error"] = message
+        _LOG.warning("백그라운드 갱신 오류 - %s", message)
+
+    def kick(self, doc, sheet_name, loader):
+        """오래된 값을 돌려준 직후 호출 - 같은 시트는 한 번만 큐에 넣는다"""
+        key = (doc.id, sheet_name, loader.__name__)
+        with self._lock:
+            if key in self._kicked:
+                return
+            self._kicked.add(key)
+        self.stats["kicked"] += 1
+
+        def run():
+            set_sheets_tag("revalidate")
+            try:
+                with sheets_priority("background"):
+                    read_sheet_cached(doc, sheet_name, loader)
+            except Exception as e:
+                self._error(f"{sheet_name}: {e}")
+            finally:
+                with self._lock:
+                    self._kicked.discard(key)
+        self._kick_pool.submit(run)
+
+    def _loop(self):
+        set_sheets_tag("refresh")
+        while True:
+            try:
+                if self._client is None:
+                    self._client = self._make_client()  # 실패하면 다음 주기에 다시 시도
+                with sheets_priority("background"):
+                    self.refresh_all(open_spreadsheet(self._client))
+                self._save_usage()
+            except Exception as e:
+                self._error(str(e))
+            self.stats["cycles"] += 1
+            self.stats["last_cycle"] = datetime.now().strftime("%H:%M:%S")
+            time.sleep(self.interval_sec)
+
+    def start(self, make_client):
+        """make_client: 스레드 안에서 처음 한 번 부르는 클라이언트 생성 함수 (프로세스 공유 클라이언트를 돌려준다)"""
+        with self._lock:
+            self._make_client = make_client
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="cpri-refresher", daemon=True)
+                self._thread.start()
+        return self
+
+def _setting_list(key, default=""):
+    return [s.strip() for s in get_setting(key, default).split(",") if s.strip()]
+
+@st.cache_resource(show_spinner=False)
+def get_background_refresher():
+    return BackgroundRefresher(
+        interval_sec=get_setting("refresh_interval_sec", 120.0),
+        warm_sheets=_setting_list("warm_sheets", f"장비목록,기업목록,{MAINTENANCE_SHEET}"),
+        warm_equipment=_setting_list("warm_equipment"),
+        top_n=get_setting("warm_top_equipment", 5),
+        state_path=get_setting("warm_state_file", ".cpri_warm.json"),
+    )
+
+def start_background_refresher():
+    """로그인 후 main_app 에서 매 실행 호출 (프로세스당 한 번만 스레드를 띄운다). 인증은 스레드 안에서 한다"""
+    if not get_setting("background_refresh", True):
+        return
+    get_background_refresher().start(lambda: instrument_client(authorized_client()))
+
+
+# ==========================================
+# 3-8. 연말 가동률 예측 (전 장비 한 번에, NumPy)
+# ==========================================
+def workday_calendar(year, today):
+    """(연간 평일 수, 오늘까지 지난 평일 수, 남은 평일 수) - 활용률 계산과 같이 토/일만 제외"""
+    jan1 = np.datetime64(f"{year}-01-01")
+    next_jan1 = np.datetime64(f"{year + 1}-01-01")
+    cut = min(max(np.datetime64(today) + 1, jan1), next_jan1)
+    total = int(np.busday_count(jan1, next_jan1))
+    elapsed = int(np.busday_count(jan1, cut))
+    return total, elapsed, total - elapsed
+
+def bin_fleet_hours(doc, equip_names, edges):
+    """
+    장비 × 구간 실제이용시간(내부+외부)과 유지보수시간 행렬 (n × b).
+    edges: 구간 경계 datetime64[D] b+1 개 (마지막 경계는 포함하지 않음). 시간은 시작일이 속한 구간에 넣는다.
+    모든 장비의 행을 이어 붙인 뒤 (장비, 구간) 칸 번호로 np.bincount 한 번에 합산한다.
+    유지보수는 통합 시트를 한 번만 읽어 전 장비를 함께 나누고, 아직 이관 안 된 구 시트가 있는 장비만 따로 읽는다.
+    """
+    edges = np.asarray(edges, dtype="datetime64[D]")
+    n, b = len(equip_names), len(edges) - 1
+    if b < 1 or edges[-1] <= edges[0]:
+        return np.zeros((n, max(b, 1))), np.zeros((n, max(b, 1)))
+    start, end = edges[0].astype(date), (edges[-1] - 1).astype(date)
+    usage_cells, usage_hours, maint_cells, maint_hours = [], [], [], []
+    legacy = {t for t in get_worksheet_registry().titles(doc) if t.endswith("_유지보수")}
+
+    def cells(i, days):
+        """(칸 번호, 기간 안 여부)"""
+        idx = np.searchsorted(edges, days.to_numpy(dtype="datetime64[D]"), side="right") - 1
+        return i * b + idx, days.notna().to_numpy() & (idx >= 0) & (idx < b)
+
+    for i, equip in enumerate(equip_names):
+        try:
+            log = load_log_history(doc, equip, start, end, UTILIZATION_COLUMNS)
+        except Exception:
+            log = None
+        if log is not None and len(log):
+            kind = log["활용유형"].astype(str).str.strip()
+            counted = kind.str.contains("내부", na=False) | kind.str.contains("외부", na=False)
+            day = parse_dates(log["사용시작일"])
+            cell, ok = cells(i, day)
+            ok &= counted.to_numpy()
+            usage_cells.append(cell[ok])
+            usage_hours.append(_map_unique(log["사용시간"], parse_hours).astype(float).to_numpy()[ok])
+        if f"{equip}_유지보수" in legacy:
+            try:
+                maint = read_sheet_cached(doc, f"{equip}_유지보수", parse_maintenance_sheet)
+            except gspread.exceptions.WorksheetNotFound:
+                continue
+            day = parse_dates(maint["시작일"])
+            cell, ok = cells(i, day)
+            maint_cells.append(cell[ok])
+            maint_hours.append(maint["시간"].map(parse_hours).astype(float).to_numpy()[ok])
+
+    table = load_maintenance_table(doc)["df"]
+    if len(table):
+        pos = table["장비명"].map({e: i for i, e in enumerate(equip_names)})
+        known = pos.notna().to_numpy()
+        cell, ok = cells(pos.fillna(0).to_numpy(dtype=int), table["_date"])
+        ok &= known
+        maint_cells.append(cell[ok])
+        maint_hours.append(table["_hours"].to_numpy(dtype=float)[ok])
+
+    def total(c, w):
+        if not c:
+            return np.zeros((n, b))
+        return np.bincount(np.concatenate(c), weights=np.concatenate(w), minlength=n * b).reshape(n, b)
+    return total(usage_cells, usage_hours), total(maint_cells, maint_hours)
+
+def collect_fleet_usage(doc, equip_names, year, today):
+    """장비별 올해(오늘까지) 실제이용시간(내부+외부)과 유지보수시간 - 올해 전체를 구간 하나로 본 bin_fleet_hours"""
+    start, end = date(year, 1, 1), min(today, date(year, 12, 31))
+    usage, maint = bin_fleet_hours(doc, equip_names, [start, end + timedelta(days=1)])
+    return usage[:, 0], maint[:, 0]
+
+def forecast_year_end(usage_ytd, maint_ytd, targets, total_wd, elapsed_wd, remaining_wd, hours_per_day=8.0):
+    """
+    장비 n대 × 목표 가동률 t개를 배열 연산 한 번으로.
+    - 실제이용가능시간(B) = 연간 평일×8 − 올해 유지보수시간
+    - 예상 연말 이용시간 = 올해 이용시간 + 평일당 이용 속도 × 남은 평일
+    - 필요시간(n×t) = 목표×B − 올해 이용시간, 부족분(n×t) = 목표×B − 예상 연말 이용시간
+    """
+    usage = np.asarray(usage_ytd, dtype=float)
+    maint = np.asarray(maint_ytd, dtype=float)
+    rates = np.asarray(targets, dtype=float) / 100.0
+
+    available = np.maximum(total_wd * hours_per_day - maint, 0.0)
+    run_rate = usage / elapsed_wd if elapsed_wd else np.zeros_like(usage)
+    projected = usage + run_rate * remaining_wd
+    with np.errstate(divide="ignore", invalid="ignore"):
+        projected_rate = np.where(available > 0, projected / available, 0.0)
+
+    goal = available[:, None] * rates[None, :]
+    needed = goal - usage[:, None]
+    shortfall = goal - projected[:, None]
+    per_day = needed / remaining_wd if remaining_wd else np.where(needed > 0, np.inf, 0.0)
+    return {
+        "available": available, "usage": usage, "run_rate": run_rate, "projected": projected,
+        "projected_rate": projected_rate, "needed": needed, "shortfall": shortfall,
+        "needed_per_day": np.maximum(per_day, 0.0),
+    }
+
+def fleet_forecast_table(equip_names, fc, targets, rank_target):
+    """예측 결과 → 표 (rank_target 기준 부족분이 큰 순)"""
+    j = list(targets).index(rank_target)
+    table = pd.DataFrame({
+        "장비명": equip_names,
+        "실제이용가능시간(B)": fc["available"].round(1),
+        "올해 이용시간": fc["usage"].round(1),
+        "평일당 이용(h)": fc["run_rate"].round(2),
+        "예상 연말 이용시간": fc["projected"].round(1),
+        "예상 연말 가동률(%)": (fc["projected_rate"] * 100).round(2),
+    })
+    for k, t in enumerate(targets):
+        table[f"{t:g}% 필요시간"] = np.maximum(fc["needed"][:, k], 0.0).round(1)
+        table[f"{t:g}% 부족분"] = np.maximum(fc["shortfall"][:, k], 0.0).round(1)
+    table[f"{rank_target:g}% 평일당 필요(h)"] = fc["needed_per_day"][:, j].round(2)
+    return table.iloc[np.argsort(-fc["shortfall"][:, j], kind="stable")].reset_index(drop=True)
+
+
+# ==========================================
+# 3-9. 탭2 수정/삭제 충돌 검사 (행 단위 낙관적 동시성)
+# ==========================================
+# 시트에는 조건부 쓰기가 없으므로, 쓰기 직전에 그 행 하나(A:U)만 다시 읽어 화면에 불러왔던 값과 비교한다.
+# 행 번호는 위쪽 행이 삭제/보관되면 밀리므로, 값이 다르면 "같은 기록이 수정된 것"인지 "다른 기록이 그 자리에 온 것"인지 가린다.
+RECORD_KEY_COLUMNS = ["사용기관 기업명", "사용시작일", "사용종료일"]
+
+class RowConflict(Exception):
+    def __init__(self, row_num, base, current, moved_to=None):
+        super().__init__(f"{row_num}번 행이 불러온 뒤에 바뀌었습니다.")
+        self.row_num = row_num
+        self.base = base
+        self.current = current
+        self.moved_to = moved_to  # 불러온 값이 그대로 다른 행 번호에 있으면 그 번호
+
+def log_row_values(values):
+    """시트 한 행 → LOG_COLUMNS 길이의 문자열 리스트"""
+    return [str(v) for v in (list(values) + [""] * len(LOG_COLUMNS))[:len(LOG_COLUMNS)]]
+
+def row_version(values):
+    """행 내용 해시 (불러온 값과 지금 시트 값이 같은지 비교용)"""
+    return hashlib.sha1(json.dumps(log_row_values(values), ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def read_log_row(sheet, row_num):
+    """그 행만 다시 읽는다. 행이 없어졌으면 None"""
+    values = sheet.row_values(row_num)
+    return log_row_values(values) if any(str(v).strip() for v in values) else None
+
+def record_key(values):
+    """기록 식별 키 (기업명, 시작일, 종료일) - 행 번호가 같은 기록을 가리키는지 확인용"""
+    row = dict(zip(LOG_COLUMNS, log_row_values(values)))
+    return tuple(row[c].strip() for c in RECORD_KEY_COLUMNS)
+
+def same_record(base, current):
+    return current is not None and record_key(base) == record_key(current)
+
+def find_log_row(sheet, base):
+    """base 와 내용이 똑같은 행 번호 (없으면 None). 충돌이 났을 때만 시트 전체를 한 번 읽는다"""
+    target = row_version(base)
+    for row_num, values in enumerate(sheet.get_all_values()[1:], start=2):
+        if row_version(values) == target:
+            return row_num
+    return None
+
+def listed_row_version(values):
+    """목록 열(LOG_LIST_COLUMNS)만 본 행 해시 - 세부지원내용이 없는 목록 프레임의 행과 시트 행을 비교할 때"""
+    row = dict(zip(LOG_COLUMNS, log_row_values(values)))
+    return row_version([row[c] if c in LOG_LIST_COLUMNS else "" for c in LOG_COLUMNS])
+
+def resolve_listed_row(sheet, row_num, listed):
+    """
+    목록에서 고른 행 → (지금 시트의 행 번호, 그 행 값). 목록은 프리패치 중에 보여준 이전 프레임일 수 있으므로
+    고른 번호의 행이 목록 값과 같으면 그대로 쓰고, 다르면 같은 값인 행을 시트 전체에서 찾는다. 없으면 (None, None)
+    """
+    target = listed_row_version(listed)
+    current = read_log_row(sheet, row_num)
+    if current is not None and listed_row_version(current) == target:
+        return row_num, current
+    for num, values in enumerate(sheet.get_all_values()[1:], start=2):
+        if listed_row_version(values) == target:
+            return num, log_row_values(values)
+    return None, None
+
+def _check_row(sheet, row_num, base):
+    current = read_log_row(sheet, row_num)
+    if current is None or row_version(current) != row_version(base):
+        raise RowConflict(row_num, log_row_values(base), current, find_log_row(sheet, base))
+    return current
+
+def conditional_update_row(sheet, row_num, base, new_values):
+    """base(불러온 값)와 시트의 현재 행이 같을 때만 A:U 를 덮어쓴다. 다르면 RowConflict"""
+    _check_row(sheet, row_num, base)
+    sheet.update(range_name=f"A{row_num}:U{row_num}", values=[list(new_values)])
+
+def conditional_delete_row(sheet, row_num, base):
+    _check_row(sheet, row_num, base)
+    sheet.delete_rows(int(row_num))
+
+def _same_cell(col, a, b):
+    if col == "사용시간":
+        return parse_hours(a) == parse_hours(b)
+    return str(a).strip() == str(b).strip()
+
+def merge_row(base, mine, theirs):
+    """
+    3-way 병합: 내가 바꾼 칸은 내 값, 나만 안 바꾼 칸은 시트 값.
+    둘 다 다르게 바꾼 칸은 내 값을 쓰고 conflicts 로 알려준다. 반환: (병합 행, 충돌 컬럼 목록)
+    theirs 가 base 와 다른 기록(행 밀림)이면 ValueError - 남의 기록에 내 수정을 섞지 않는다.
+    """
+    if not same_record(base, theirs):
+        raise ValueError("병합 대상 행이 불러온 기록과 다른 기록입니다.")
+    merged, conflicts = [], []
+    for col, b, m, t in zip(LOG_COLUMNS, base, mine, theirs):
+        if _same_cell(col, m, b):
+            merged.append(t)
+        else:
+            merged.append(m)
+            if not _same_cell(col, t, b) and not _same_cell(col, t, m):
+                conflicts.append(col)
+    return merged, conflicts
+
+
+# ==========================================
+# 3-10. 활용률 결과 공유 캐시 (메모리 LRU + SQLite)
+# ==========================================
+# 같은 장비·기간·달력·데이터 버전의 활용률은 누가 계산해도 같으므로 세션 사이에서 재사용한다.
+# 데이터 버전 = 일지/유지보수 시트 리비전 + 기간에 걸리는 보관 파티션 체크섬 → 시트가 바뀌면 키가 달라진다.
+CALENDAR_PROFILE = "mon-fri-8h"  # compute_utilization 의 가동가능시간 기준 (평일 × 8시간)
+
+class ResultsCache:
+    """
+    결과 공유 캐시. 메모리 LRU 는 (값, 만료 시각) 을, SQLite 는 저장 시각을 함께 두어 max_age_sec 이 지나면 버린다.
+    persist=False 로 넣은 값(대체 리비전 키)은 짧은 수명(volatile_sec)으로 메모리에만 둔다.
+    """
+    def __init__(self, max_entries, db_path="", max_disk_entries=1000, max_age_sec=7 * 86400, volatile_sec=300,
+                 clock=time.time):
+        self._max = max_entries
+        self._clock = clock
+        self._max_disk = max_disk_entries
+        self._max_age = max_age_sec
+        self._volatile = volatile_sec
+        self._lock = threading.Lock()
+        self._items = collections.OrderedDict()
+        self._conn = None
+        self.stats = {"memory": 0, "disk": 0, "miss": 0}
+        if db_path:
+            import sqlite3
+            self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results "
+                               "(key TEXT PRIMARY KEY, value TEXT, used_at REAL, created_at REAL DEFAULT 0)")
+            cols = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            if "created_at" not in cols:
+                # 이전 형식 파일: 저장 시각을 모르는 값은 만료된 것으로 본다
+                self._conn.execute("ALTER TABLE results ADD COLUMN created_at REAL DEFAULT 0")
+
+    def _remember(self, key, value, expires_at):
+        self._items[key] = (value, expires_at)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max:
+            self._items.popitem(last=False)
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[1] > now:
+                self._items.move_to_end(key)
+                self.stats["memory"] += 1
+                return item[0]
+            self._items.pop(key, None)
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, created_at FROM results WHERE key = ? AND created_at > ?",
+                                         (key, now - self._max_age)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1] + self._max_age)
+                    self.stats["disk"] += 1
+                    return value
+            self.stats["miss"] += 1
+            return None
+
+    def put(self, key, value, persist=True):
+        """value 는 JSON 으로 바꿀 수 있는 dict. persist=False 면 메모리에만 짧게 둔다"""
+        now = self._clock()
+        with self._lock:
+            self._remember(key, value, now + (self._max_age if persist else self._volatile))
+            if self._conn is not None and persist:
+                self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                   (key, json.dumps(value, ensure_ascii=False), now, now))
+                self._conn.execute("DELETE FROM results WHERE created_at <= ?", (now - self._max_age,))
+                self._conn.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used_at DESC "
+                                   "LIMIT -1 OFFSET ?)", (self._max_disk,))
+        return value
+
+@st.cache_resource(show_spinner=False)
+def get_results_cache():
+    return ResultsCache(
+        max_entries=get_setting("results_cache_entries", 256),
+        db_path=get_setting("results_cache_db", ".cpri_results.sqlite"),
+        max_disk_entries=get_setting("results_cache_disk_entries", 1000),
+        max_age_sec=get_setting("results_cache_max_age_sec", 7 * 86400),
+        volatile_sec=get_setting("results_cache_volatile_sec", 300),
+    )
+
+def sheet_data_revision(doc, sheet_name):
+    """read_sheet_cached 가 쓰는 것과 같은 리비전 (시트가 없으면 'missing')"""
+    try:
+        return get_revision_cache().sheet_revision(doc, lambda: get_worksheet(doc, sheet_name))
+    except gspread.exceptions.WorksheetNotFound:
+        return "missing"
+
+def utilization_cache_key(doc, equip_name, calc_start, calc_end):
+    """
+    (키, 오래 둬도 되는지). 문서 수정 시각을 못 받아 행 수+마지막 행 체크섬(rows-…)으로 대신한 리비전은
+    중간 행 수정을 못 알아채므로, 그런 키의 결과는 디스크에 남기지 않는다.
+    """
+    manifest = load_archive_manifest(equip_name)
+    lo, hi = (calc_start.year, calc_start.month), (calc_end.year, calc_end.month)
+    archived = sorted(p["sha256"] for p in manifest["partitions"].values() if lo <= (p["year"], p["month"]) <= hi)
+    revisions = [
+        sheet_data_revision(doc, equip_name),
+        sheet_data_revision(doc, MAINTENANCE_SHEET),
+        sheet_data_revision(doc, f"{equip_name}_유지보수"),
+    ]
+    version = hashlib.sha1(json.dumps(revisions + [archived]).encode("utf-8")).hexdigest()[:16]
+    durable = not any(str(r).startswith("rows-") for r in revisions)
+    return f"util|{doc.id}|{equip_name}|{calc_start}|{calc_end}|{CALENDAR_PROFILE}|{version}", durable
+
+def cached_utilization(doc, client, equip_name, calc_start, calc_end):
+    """(compute_utilization 결과, 공유 캐시에서 가져왔는지). empty_sample 은 캐시에 JSON 으로 들어간다"""
+    cache = get_results_cache()
+    key, durable = utilization_cache_key(doc, equip_name, calc_start, calc_end)
+    stored = cache.get(key)
+    if stored is None:
+        df = load_log_history(doc, equip_name, calc_start, calc_end, UTILIZATION_COLUMNS)
+        calc = compute_utilization(df, load_maintenance_data(client, equip_name), calc_start, calc_end)
+        stored = {k: float(v) for k, v in calc.items() if k not in ("empty_sample", "workdays_count")}
+        stored["workdays_count"] = int(calc["workdays_count"])
+        sample = calc["empty_sample"]
+        stored["empty_sample"] = None if sample is None else sample.to_json(orient="split", date_format="iso",
+                                                                            force_ascii=False)
+        stored["computed_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cache.put(key, stored, persist=durable)
+        hit = False
+    else:
+        hit = True
+    calc = dict(stored)
+    if calc["empty_sample"] is not None:
+        calc["empty_sample"] = pd.read_json(io.StringIO(calc["empty_sample"]), orient="split")
+    return calc, hit
+
+
+# ==========================================
+# 3-11. 업로드 검토 보고서 (사유별 집계 + 페이지 나눔 + 주석 엑셀)
+# ==========================================
+# 오류/보정이 수만 건이어도 화면에는 사유별 요약과 한 페이지 분량만 보낸다. 전체 내역은 엑셀 보고서로 받는다.
+def _values(value):
+    """목록 칸(오류 유형처럼 한 행에 여러 값)은 그대로, 단일 값은 한 개짜리 목록으로"""
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+def summarize_reasons(records, field, sample=5):
+    """field 값별 건수 + 예시 행 번호 표 (건수 많은 순). 목록 칸은 값마다 한 번씩 센다"""
+    if not records:
+        return pd.DataFrame(columns=[field, "건수", "예시 행 번호"])
+    rows = [f"{r['시트']}!{r['행 번호']}" if r.get("시트") else str(r["행 번호"]) for r in records]
+    f = pd.DataFrame({field: [_values(r[field]) for r in records], "행": rows}).explode(field)
+    g = f.groupby(field, sort=False)["행"]
+    out = pd.DataFrame({"건수": g.size(), "예시 행 번호": g.agg(lambda s: ", ".join(s.head(sample)))})
+    return out.sort_values("건수", ascending=False, kind="stable").reset_index()
+
+def correction_pairs(auto_corrected):
+    """자동 보정 내역을 '원본 → 보정' 한 칸으로 (같은 보정끼리 묶어 세기 위해)"""
+    return [{**r, "보정": f"{r['원본 기업명']} → {r['보정 기업명']}"} for r in auto_corrected]
+
+def show_paged_records(records, key, filter_field=None, options=(), page_size=None):
+    """
+    records 중 한 페이지만 화면으로 보낸다 (건수와 상관없이 그리는 비용이 일정).
+    filter_field 가 있으면 options 중 고른 값이 들어 있는(목록 칸이면 목록에 있는) 행만 보여준다.
+    """
+    page_size = page_size or get_setting("report_page_size", 50)
+    rows, choice = records, "전체"
+    if filter_field and len(options) > 1:
+        choice = st.selectbox("유형", ["전체"] + list(options), key=f"{key}_kind")
+        if choice != "전체":
+            rows = [r for r in records if choice in _values(r[filter_field])]
+    pages = max(1, -(-len(rows) // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"페이지 (1~{pages:,})", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"{key}_page_{choice}")
+    start = (page - 1) * page_size
+    page_rows = [{k: ", ".join(map(str, v)) if isinstance(v, (list, tuple)) else v for k, v in r.items()}
+                 for r in rows[start:start + page_size]]
+    st.dataframe(pd.DataFrame(page_rows), hide_index=True, use_container_width=True)
+    st.caption(f"{start + 1:,}~{min(start + page_size, len(rows)):,} / {len(rows):,}건")
+
+def build_upload_report(checked):
+    """
+    검토 결과 전체를 엑셀로: 요약 / 오류(원본 값 + 오류 유형·내용, 원래 행 번호) / 자동보정 / 유사중복.
+    오류 시트의 주석 칸은 빨간 글씨로 표시하고, 머리글 고정 + 자동 필터를 걸어 둔다.
+    """
+    errors = checked.get("error_rows", pd.DataFrame())
+    if not errors.empty and not errors["시트"].astype(bool).any():
+        errors = errors.drop(columns=["시트"])
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        book = writer.book
+        note = book.add_format({"font_color": "#C00000", "bg_color": "#FDE9E7"})
+        title = book.add_format({"bold": True})
+
+        row = 0
+        sheet = None
+        for label, records, field in [
+            ("오류 유형별", checked["error_logs"], "오류 유형"),
+            ("자동 보정별", correction_pairs(checked["auto_corrected"]), "보정"),
+            ("유사 중복 장비별", checked["near_dups"], "장비명"),
+        ]:
+            table = summarize_reasons(records, field)
+            table.to_excel(writer, sheet_name="요약", startrow=row + 1, index=False)
+            sheet = writer.sheets["요약"]
+            sheet.write(row, 0, f"{label} ({len(records):,}건)", title)
+            row += len(table) + 3
+        sheet.set_column(0, 0, 40)
+        sheet.set_column(2, 2, 40)
+
+        if not errors.empty:
+            errors.to_excel(writer, sheet_name="오류", index=False)
+            ws = writer.sheets["오류"]
+            n_cols = len(errors.columns)
+            ws.set_column(n_cols - 2, n_cols - 2, 20, note)
+            ws.set_column(n_cols - 1, n_cols - 1, 60, note)
+            ws.freeze_panes(1, 0)
+            ws.autofilter(0, 0, len(errors), n_cols - 1)
+        for name, records in [("자동보정", checked["auto_corrected"]), ("유사중복", checked["near_dups"])]:
+            if records:
+                pd.DataFrame(records).to_excel(writer, sheet_name=name, index=False)
+                writer.sheets[name].freeze_panes(1, 0)
+    return output.getvalue()
+
+
+# ==========================================
+# 3-12. 전체 장비 일지 통합 검색 (글자 n-gram 역색인)
+# ==========================================
+# 기업명/제품명/세부지원내용/사용목적기타를 2글자씩 쪼개 (gram → 일지 행 목록) 역색인을 만든다.
+# 한글은 띄어쓰기·조사가 들쭉날쭉해서 단어 대신 글자 n-gram 으로 찾고, 후보는 부분 문자열 비교로 한 번 더 거른다.
+SEARCH_FIELDS = ["사용기관 기업명", "제품명", "세부지원내용", "사용목적기타"]
+SEARCH_RESULT_COLUMNS = ["장비명", "행번호", "사용시작일"] + SEARCH_FIELDS
+_GRAM_END = "\x03"  # 필드 끝 표시 - 마지막 글자도 gram 의 첫 글자가 되게 해서 한 글자 검색을 지원
+_NO_DAY = -(2 ** 31)
+
+def search_text(value):
+    """검색용 정규화: 공백 제거 + 소문자"""
+    return re.sub(r"\s+", "", str(value)).lower()
+
+def text_grams(text):
+    text += _GRAM_END
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def epoch_days(values):
+    """날짜 칸 Series → 1970-01-01 기준 일수 배열 (못 읽은 날짜는 _NO_DAY)"""
+    days = parse_dates(values)
+    out = days.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    out[days.isna().to_numpy()] = _NO_DAY
+    return out
+
+def _same_search_text(old, new):
+    """두 일지 프레임의 검색 칸(+행번호/사용시작일)이 모두 같은지"""
+    cols = [c for c in SEARCH_FIELDS + ["행번호", "사용시작일"] if c in old.columns]
+    return cols == [c for c in SEARCH_FIELDS + ["행번호", "사용시작일"] if c in new.columns] and old[cols].equals(new[cols])
+
+class LogSearchIndex:
+    """
+    전 장비 일지 역색인. 문서 = 일지 한 행, 문서 id 는 색인한 순서대로 늘어나므로 포스팅 목록은 항상 정렬돼 있다.
+    시트를 새로 받아 오면(리비전 변경) 그 장비의 옛 문서를 지우고 다시 색인한다 - 중간 행 수정/삭제는
+    행 수·마지막 행으로 알 수 없다. 예외는 둘뿐이다:
+    - 이 앱이 뒤에 붙인 행(note_append)만큼만 늘어난 경우 → 새 행만 이어서 색인
+    - 다른 시트가 바뀌어 리비전만 올랐고 검색 칸 내용은 그대로인 경우 → 색인 유지
+    장비마다 시트 일지와 보관분(source=(장비, "보관"))을 따로 색인하고, 결과에서는 같은 장비로 묶는다.
+    지운 문서는 alive 만 끄고, 전체의 절반을 넘으면 포스팅을 새로 만든다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}
+        self.equips = []
+        self._equip_no = {}
+        self.sources = []
+        self._source_no = {}
+        self.doc_equip = array.array("i")
+        self.doc_src = array.array("i")
+        self.doc_pos = array.array("i")
+        self.doc_day = array.array("i")
+        self.alive = bytearray()
+        self.dead = 0
+        self._sheets = {}
+
+    def update(self, equip, frame, source=None):
+        """source: 같은 장비의 다른 출처(보관분 등)를 따로 색인할 때의 키 (기본은 장비 이름 = 시트 일지)"""
+        source = equip if source is None else source
+        with self._lock:
+            state = self._sheets.get(source)
+            if state is not None and frame is state["frame"]:
+                return
+            n = len(frame)
+            start = 0
+            if state is not None:
+                m, old = state["n"], state["frame"]
+                tail = frame.iloc[m - 1][LOG_COLUMNS].tolist() if 0 < m <= n else None
+                appended = state["appended"] > 0 and n == m + state["appended"] and (not m or tail == state["tail"])
+                unchanged = old is not None and n == m and _same_search_text(old, frame)
+                if old is not None and (appended or unchanged):
+                    start = m
+                else:
+                    self._drop(source)
+            self._add(source, equip, frame, start)
+            if self.dead > max(len(self.alive) // 2, 10000):
+                self._compact()
+
+    def note_append(self, equip, count):
+        """이 앱이 그 장비 시트 끝에 count 행을 붙였다 - 다음 갱신에서 그만큼 늘어났으면 이어서 색인"""
+        with self._lock:
+            if equip in self._sheets:
+                self._sheets[equip]["appended"] += count
+
+    def forget(self, equip):
+        """행 수정/삭제 후 - 뒤에 추가된 경우가 아니므로 다음 갱신 때 그 장비를 다시 색인"""
+        with self._lock:
+            if equip in self._sheets:
+                self._sheets[equip]["frame"] = None
+
+    def _drop(self, source):
+        ids = self._sheets.pop(source)["ids"]
+        for doc_id in ids:
+            self.alive[doc_id] = 0
+        self.dead += len(ids)
+
+    def _compact(self):
+        frames = {source: (state["equip"], state["frame"]) for source, state in self._sheets.items()
+                  if state["frame"] is not None}
+        self._reset()
+        for source, (equip, frame) in frames.items():
+            self._add(source, equip, frame, 0)
+
+    def _add(self, source, equip, frame, start):
+        if equip not in self._equip_no:
+            self._equip_no[equip] = len(self.equips)
+            self.equips.append(equip)
+        if source not in self._source_no:
+            self._source_no[source] = len(self.sources)
+            self.sources.append(source)
+        state = self._sheets.setdefault(source, {"ids": array.array("i"), "equip": equip})
+        new = frame.iloc[start:]
+        if len(new):
+            no = self._equip_no[equip]
+            first = len(self.alive)
+            days = epoch_days(new["사용시작일"])
+            columns = [new[c].to_numpy(dtype=object) for c in SEARCH_FIELDS if c in new.columns]
+            grams_of = {}
+            postings = self.postings
+            for i, values in enumerate(zip(*columns)):
+                doc_id = first + i
+                grams = set()
+                for v in values:
+                    g = grams_of.get(v)
+                    if g is None:
+                        g = grams_of[v] = text_grams(search_text(v)) if v not in (None, "") else set()
+                    grams |= g
+                for g in grams:
+                    posting = postings.get(g)
+                    if posting is None:
+                        posting = postings[g] = array.array("i")
+                    posting.append(doc_id)
+            ids = range(first, first + len(new))
+            self.doc_equip.extend([no] * len(new))
+            self.doc_src.extend([self._source_no[source]] * len(new))
+            self.doc_pos.extend(range(start, start + len(new)))
+            self.doc_day.extend(days.tolist())
+            self.alive.extend(b"\x01" * len(new))
+            state["ids"].extend(ids)
+        state.update(n=len(frame), frame=frame, appended=0,
+                     tail=frame.iloc[len(frame) - 1][LOG_COLUMNS].tolist() if len(frame) else None,
+                     columns={c: frame[c].to_numpy(dtype=object) for c in SEARCH_FIELDS + ["행번호", "사용시작일"]
+                              if c in frame.columns})
+
+    def _candidates(self, q):
+        if len(q) == 1:
+            lists = [np.frombuffer(p, dtype=np.int32) for g, p in self.postings.items() if g[0] == q and len(p)]
+            return np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int32)
+        lists = []
+        for g in {q[i:i + 2] for i in range(len(q) - 1)}:
+            posting = self.postings.get(g)
+            if not posting:
+                return np.empty(0, dtype=np.int32)
+            lists.append(posting)
+        lists.sort(key=len)
+        ids = np.frombuffer(lists[0], dtype=np.int32).copy()
+        for posting in lists[1:]:
+            ids = np.intersect1d(ids, np.frombuffer(posting, dtype=np.int32), assume_unique=True)
+            if not len(ids):
+                break
+        return ids
+
+    def search(self, query, start=None, end=None, equips=None, limit=1000):
+        """
+        반환: {"total", "by_equip": {장비: 건수}, "rows": 결과 DataFrame (사용시작일 최근 순, 최대 limit 행)}
+        start/end: 사용시작일 범위 (date), equips: 찾을 장비 이름 목록 (None 이면 전체)
+        """
+        q = search_text(query or "")
+        empty = {"total": 0, "by_equip": {}, "rows": pd.DataFrame(columns=SEARCH_RESULT_COLUMNS)}
+        if not q:
+            return empty
+        with self._lock:
+            ids = self._candidates(q)
+            ids = ids[np.frombuffer(self.alive, dtype=np.uint8)[ids].astype(bool)]
+            day = np.frombuffer(self.doc_day, dtype=np.int32)[ids]
+            keep = np.ones(len(ids), dtype=bool)
+            if start is not None:
+                keep &= day >= np.datetime64(start, "D").astype(np.int64)
+            if end is not None:
+                keep &= (day <= np.datetime64(end, "D").astype(np.int64)) & (day != _NO_DAY)
+            if equips is not None:
+                allowed = [self._equip_no[e] for e in equips if e in self._equip_no]
+                keep &= np.isin(np.frombuffer(self.doc_equip, dtype=np.int32)[ids], allowed)
+            ids, day = ids[keep], day[keep]
+            equip_of = np.frombuffer(self.doc_equip, dtype=np.int32)[ids]
+            src_of = np.frombuffer(self.doc_src, dtype=np.int32)[ids]
+            pos_of = np.frombuffer(self.doc_pos, dtype=np.int32)[ids]
+            if len(q) > 2:
+                # gram 이 모두 들어 있어도 붙어 있지 않을 수 있으므로 필드 안의 부분 문자열인지 확인
+                normalized = {}
+                ok = np.zeros(len(ids), dtype=bool)
+                for i, (src, p) in enumerate(zip(src_of.tolist(), pos_of.tolist())):
+                    cols = self._sheets[self.sources[src]]["columns"]
+                    for c in SEARCH_FIELDS:
+                        if c in cols:
+                            v = cols[c][p]
+                            t = normalized.get(v)
+                            if t is None:
+                                t = normalized[v] = search_text(v)
+                            if q in t:
+                                ok[i] = True
+                                break
+                day, equip_of, src_of, pos_of = day[ok], equip_of[ok], src_of[ok], pos_of[ok]
+            if not len(day):
+                return empty
+            counts = np.bincount(equip_of, minlength=len(self.equips))
+            by_equip = {self.equips[e]: int(counts[e]) for e in np.flatnonzero(counts)}
+            order = np.argsort(-day.astype(np.int64), kind="stable")[:limit]
+            rows = []
+            for e, src, p in zip(equip_of[order].tolist(), src_of[order].tolist(), pos_of[order].tolist()):
+                cols = self._sheets[self.sources[src]]["columns"]
+                rows.append([self.equips[e]] + [cols[c][p] if c in cols else "" for c in SEARCH_RESULT_COLUMNS[1:]])
+        by_equip = dict(sorted(by_equip.items(), key=lambda kv: -kv[1]))
+        return {"total": int(counts.sum()), "by_equip": by_equip,
+                "rows": pd.DataFrame(rows, columns=SEARCH_RESULT_COLUMNS)}
+
+    def summary(self):
+        with self._lock:
+            return {"sheets": len(self._sheets), "docs": len(self.alive) - self.dead, "grams": len(self.postings)}
+
+@st.cache_resource(show_spinner=False)
+def _log_search_indexes():
+    return {}
+
+def get_log_search_index(doc, equip_names):
+    """
+    equip_names 일지를 모두 색인에 반영 (리비전이 바뀐 시트만 다시 읽어 다시 색인, 앱이 붙인 행은 이어서 색인).
+    보관분은 파티션이 바뀌었을 때만 다시 색인한다 (결과의 행번호 0 = 보관된 행)
+    """
+    index = _log_search_indexes().setdefault(doc.id, LogSearchIndex())
+    for equip in equip_names:
+        version = archive_version(equip)
+        if version:
+            index.update(equip, archived_log_snapshot(equip, version), source=(equip, "보관"))
+        elif (equip, "보관") in index.sources:
+            index.update(equip, load_archived_logs(equip), source=(equip, "보관"))
+        try:
+            frame = read_sheet_cached(doc, equip, load_log_data, allow_stale=True)
+        except gspread.exceptions.WorksheetNotFound:
+            continue
+        index.update(equip, frame)
+    return index
+
+def note_search_append(doc, equip_name, count):
+    index = _log_search_indexes().get(doc.id)
+    if index is not None:
+        index.note_append(equip_name, count)
+
+def forget_search_sheet(doc, equip_name):
+    index = _log_search_indexes().get(doc.id)
+    if index is not None:
+        index.forget(equip_name)
+
+
+# ==========================================
+# 3-13. 기업별 이용 현황 (전 장비 일지를 한 번에 집계)
+# ==========================================
+# 일지 원본(문자열)에서 날짜/시간/사용료/시료수/정규화 업체명을 뽑은 표를 원본 프레임마다 한 번만 만들어 두고,
+# 집계할 때는 이 표들을 이어 붙여 groupby 한 번으로 기업별 합계를 낸다.
+def parse_amount(x):
+    """'50,000', '₩50,000원', '3개' 같은 값에서 첫 숫자를 float 로 (없으면 0)"""
+    s = "" if x is None else str(x).replace(",", "")
+    m = re.search(r"[-+]?\d*\.?\d+", s)
+    return float(m.group()) if m else 0.0
+
+COMPANY_USAGE_COLUMNS = ["활용유형", "사용기관 기업명", "사용기관 사업자등록번호", "시료수/시험수", "사용시작일", "사용시간", "사용료"]
+
+def parse_log_numbers(frame):
+    """일지 프레임 → 집계용 숫자/키 컬럼 (같은 값이 반복되는 컬럼은 고유값만 변환)"""
+    company = frame["사용기관 기업명"].astype(str).str.strip()
+    return pd.DataFrame({
+        "_day": parse_dates(frame["사용시작일"]),
+        "_kind": frame["활용유형"].astype(str).str.strip(),
+        "_company": company,
+        "_name": _map_unique(company, normalize_comp_name),
+        "_biz": frame["사용기관 사업자등록번호"].astype(str).str.replace(r"[^0-9]", "", regex=True),
+        "_hours": _map_unique(frame["사용시간"], parse_hours).astype(float),
+        "_fee": _map_unique(frame["사용료"], parse_amount).astype(float),
+        "_samples": _map_unique(frame["시료수/시험수"], parse_amount).astype(float),
+    })
+
+class ParsedLogCache:
+    """
+    원본 프레임 → parse_log_numbers 결과. 시트 프레임은 객체가 그대로인 동안(리비전 캐시 적중),
+    보관 파티션은 sha256 이 같은 동안 다시 변환하지 않는다. 항목 수가 max_entries 를 넘으면 오래된 것부터 버린다.
+    """
+    def __init__(self, max_entries):
+        self._max = max_entries
+        self._lock = threading.Lock()
+        self._items = collections.OrderedDict()
+        self.stats = {"hit": 0, "miss": 0}
+
+    def get(self, key, token, load_frame):
+        """token: 시트 프레임이면 그 객체, 보관 파티션이면 sha256 문자열. load_frame() 은 변환이 필요할 때만 부른다"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and (entry[0] is token or (isinstance(token, str) and entry[0] == token)):
+                self._items.move_to_end(key)
+                self.stats["hit"] += 1
+                return entry[1]
+        parsed = parse_log_numbers(load_frame())
+        with self._lock:
+            self.stats["miss"] += 1
+            self._items[key] = (token, parsed)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max:
+                self._items.popitem(last=False)
+        return parsed
+
+@st.cache_resource(show_spinner=False)
+def get_parsed_log_cache():
+    return ParsedLogCache(get_setting("parsed_log_cache_entries", 2048))
+
+def parsed_log_parts(doc, equip_name, start=None, end=None):
+    """장비 하나의 집계용 표 목록: 기간에 걸리는 보관 파티션 + 시트 현재 행"""
+    cache = get_parsed_log_cache()
+    parts = []
+    manifest = load_archive_manifest(equip_name)
+    lo = (start.year, start.month) if start else None
+    hi = (end.year, end.month) if end else None
+    for rel, part in sorted(manifest["partitions"].items()):
+        ym = (part["year"], part["month"])
+        if (lo and ym < lo) or (hi and ym > hi):
+            continue
+        path = os.path.join(_archive_dir(equip_name), rel)
+        parts.append(cache.get(("archive", equip_name, rel), part["sha256"],
+                               lambda path=path, sha=part["sha256"]: read_archive_partition(path, sha)))
+    try:
+        live = read_sheet_cached(doc, equip_name, log_column_loader(COMPANY_USAGE_COLUMNS))
+    except gspread.exceptions.WorksheetNotFound:
+        return parts
+    parts.append(cache.get(("live", doc.id, equip_name), live, lambda: live))
+    return parts
+
+def company_usage(doc, equip_names, start, end, by="name", usage_types=None, comp_norm_db=None):
+    """
+    기업별 이용건수 / 이용시간 / 사용료 / 시료수 / 이용 장비 수·목록 / 최근 이용일 (사용시작일이 기간 안인 행).
+    by="name": normalize_comp_name 으로 묶음, by="biz": 사업자등록번호(숫자만)로 묶고 번호가 없으면 이름으로.
+    usage_types: 포함할 활용유형 목록 (None 이면 전부). 기업명이 빈 행은 빼고 건수만 돌려준다.
+    반환: (기업별 DataFrame - 사용료 많은 순, 제외된 행 수)
+    """
+    parts, codes = [], []
+    for i, equip in enumerate(equip_names):
+        for part in parsed_log_parts(doc, equip, start, end):
+            if len(part):
+                parts.append(part)
+                codes.append(np.full(len(part), i, dtype=np.int32))
+    columns = ["기업", "사업자등록번호", "이용건수", "이용시간", "사용료", "시료수", "장비수", "이용 장비", "최근 이용일"]
+    if not parts:
+        return pd.DataFrame(columns=columns), 0
+    f = pd.concat(parts, ignore_index=True)
+    f["_equip"] = np.concatenate(codes)
+    keep = (f["_day"] >= pd.Timestamp(start)) & (f["_day"] <= pd.Timestamp(end))
+    if usage_types is not None:
+        keep &= f["_kind"].isin(usage_types)
+    f = f.loc[keep]
+    unnamed = f["_name"] == ""
+    skipped = int(unnamed.sum())
+    f = f.loc[~unnamed]
+    if f.empty:
+        return pd.DataFrame(columns=columns), skipped
+    f = f.assign(_key=f["_name"] if by == "name" else f["_biz"].where(f["_biz"] != "", "이름:" + f["_name"]))
+
+    g = f.groupby("_key", sort=False)
+    out = g.agg(이용건수=("_hours", "size"), 이용시간=("_hours", "sum"), 사용료=("_fee", "sum"), 시료수=("_samples", "sum"),
+                장비수=("_equip", "nunique"), 최근이용일=("_day", "max"))
+
+    def most_common(col, skip_blank=False):
+        pairs = f.loc[f[col] != ""] if skip_blank else f
+        top = pairs.groupby(["_key", col], sort=False).size().sort_values(ascending=False, kind="stable")
+        return top.reset_index().drop_duplicates("_key").set_index("_key")[col]
+
+    names = most_common("_company")
+    if comp_norm_db:
+        registered = most_common("_name").map(lambda n: comp_norm_db.get(n, {}).get("real_name"))
+        names = registered.where(registered.notna(), names.reindex(registered.index))
+    out["기업"] = names.reindex(out.index)
+    out["사업자등록번호"] = most_common("_biz", skip_blank=True).reindex(out.index).fillna("")
+    labels = np.asarray(equip_names, dtype=object)
+    pairs = f[["_key", "_equip"]].drop_duplicates().sort_values("_equip", kind="stable")
+    out["이용 장비"] = pd.Series(labels[pairs["_equip"].to_numpy()], index=pairs["_key"]).groupby(level=0).agg(", ".join)
+    out["최근 이용일"] = out.pop("최근이용일").dt.strftime("%Y-%m-%d")
+    out = out.sort_values(["사용료", "이용시간"], ascending=False, kind="stable").reset_index(drop=True)
+    return out[columns], skipped
+
+
+# ==========================================
+# 3-14. 장비 사용 달력 (장비 × 기간 히트맵 / 타임라인)
+# ==========================================
+# 사용·유지보수 시간을 서버에서 장비 × 구간 행렬로 묶고(bin_fleet_hours), 브라우저에는 묶은 칸과 막대만 보낸다.
+# 기간이 길거나 장비가 많으면 칸 수가 calendar_max_cells 이하가 되도록 일 → 주 → 월로 구간을 넓힌다.
+CALENDAR_UNITS = {"일": "D", "주": "W", "월": "M"}
+
+def calendar_edges(start, end, unit):
+    """start~end(date) 를 unit('D'/'W'/'M') 구간으로 나눈 경계. 주는 월요일, 월은 1일에 끊고 처음/끝 구간은 기간에 맞춘다"""
+    s = np.datetime64(start, "D")
+    e = np.datetime64(end, "D") + 1
+    if unit == "D":
+        inner = np.arange(s + 1, e)
+    elif unit == "W":
+        inner = np.arange(np.busday_offset(s, 0, roll="forward", weekmask="Mon"), e, 7)
+    else:
+        inner = np.arange(s.astype("datetime64[M]") + 1, e.astype("datetime64[M]") + 1).astype("datetime64[D]")
+    inner = inner[(inner > s) & (inner < e)]
+    return np.concatenate([[s], inner, [e]]).astype("datetime64[D]")
+
+def pick_calendar_unit(start, end, n_equips, max_cells):
+    """장비 수 × 구간 수가 max_cells 이하인 가장 촘촘한 단위 (월로도 넘으면 월)"""
+    for unit in ("D", "W"):
+        if n_equips * (len(calendar_edges(start, end, unit)) - 1) <= max_cells:
+            return unit
+    return "M"
+
+def usage_calendar(doc, equip_names, start, end, unit):
+    """
+    장비 × 구간 행렬: usage/maint(시간), capacity(구간별 평일×8), rate(사용 ÷ (capacity − 유지보수), 0~).
+    idle = 평일이 있는데 사용이 없는 구간 수 (장비별)
+    """
+    edges = calendar_edges(start, end, unit)
+    usage, maint = bin_fleet_hours(doc, equip_names, edges)
+    capacity = np.busday_count(edges[:-1], edges[1:]) * 8.0
+    available = capacity[None, :] - maint
+    rate = np.divide(usage, available, out=np.zeros_like(usage), where=available > 0)
+    return {"equips": list(equip_names), "unit": unit, "edges": edges, "usage": usage, "maint": maint,
+            "capacity": capacity, "rate": rate, "idle": ((usage == 0) & (capacity > 0)[None, :]).sum(axis=1)}
+
+def calendar_labels(cal):
+    starts = cal["edges"][:-1]
+    if cal["unit"] == "M":
+        return np.datetime_as_string(starts, unit="M")
+    return np.datetime_as_string(starts, unit="D")
+
+def calendar_cells(cal):
+    """히트맵용 긴 표 (장비 × 구간 한 칸 = 한 행)"""
+    n, b = cal["usage"].shape
+    return pd.DataFrame({
+        "장비명": np.repeat(np.asarray(cal["equips"], dtype=object), b),
+        "구간": np.tile(calendar_labels(cal), n),
+        "사용시간": cal["usage"].ravel().round(1),
+        "유지보수": cal["maint"].ravel().round(1),
+        "가동률(%)": (cal["rate"].ravel() * 100).round(1),
+    })
+
+def calendar_segments(cal):
+    """
+    타임라인 막대: 사용/유지보수가 있는 구간이 이어지면 막대 하나로 합친다.
+    불리언 행렬의 diff 로 모든 장비의 시작/끝 구간을 한 번에 찾고, 누적합 차이로 막대별 시간을 구한다.
+    """
+    equips = np.asarray(cal["equips"], dtype=object)
+    edges = cal["edges"]
+    frames = []
+    for kind, m in (("사용", cal["usage"]), ("유지보수", cal["maint"])):
+        step = np.diff(np.pad((m > 0).astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        si, sj = np.nonzero(step == 1)
+        _, ej = np.nonzero(step == -1)
+        csum = np.pad(np.cumsum(m, axis=1), ((0, 0), (1, 0)))
+        frames.append(pd.DataFrame({"장비명": equips[si], "구분": kind, "시작": edges[sj], "끝": edges[ej],
+                                    "시간": (csum[si, ej] - csum[si, sj]).round(1)}))
+    return pd.concat(frames, ignore_index=True)
+
+def show_usage_calendar(cal, metric):
+    """서버에서 묶은 칸/막대만 차트로 보낸다 (altair 는 처음 그릴 때 로딩)"""
+    alt = _timed_import("altair")
+    equips = cal["equips"]
+    height = max(160, 18 * len(equips))
+    heat = alt.Chart(calendar_cells(cal)).mark_rect().encode(
+        x=alt.X("구간:O", title=None),
+        y=alt.Y("장비명:N", title=None, sort=equips),
+        color=alt.Color(f"{metric}:Q", scale=alt.Scale(scheme="greens")),
+        tooltip=["장비명", "구간", "사용시간", "유지보수", "가동률(%)"],
+    ).properties(height=height)
+    st.altair_chart(heat, use_container_width=True)
+
+    segments = calendar_segments(cal)
+    if segments.empty:
+        st.info("기간 안에 사용/유지보수 기록이 없습니다.")
+        return
+    timeline = alt.Chart(segments).mark_bar().encode(
+        x=alt.X("시작:T", title=None),
+        x2="끝:T",
+        y=alt.Y("장비명:N", title=None, sort=equips),
+        color=alt.Color("구분:N", scale=alt.Scale(domain=["사용", "유지보수"], range=["#2E7D32", "#F9A825"])),
+        tooltip=["장비명", "구분", alt.Tooltip("시작:T", format="%Y-%m-%d"), alt.Tooltip("끝:T", format="%Y-%m-%d"), "시간"],
+    ).properties(height=height)
+    st.altair_chart(timeline, use_container_width=True)
 
 
 # ==========================================
@@ -254,26 +3662,28 @@ def login_page():
         username = st.text_input("아이디")
         password = st.text_input("비밀번호", type="password")
         if st.form_submit_button("로그인"):
+            set_sheets_tag("login")
             client = get_client()
             if not client:
                 return
-            _, _, user_db, _, _ = get_master_data(client)
-
-            if username in user_db:
-                sheet_pw = str(user_db[username]["비밀번호"]).strip()
-                input_pw = str(password).strip()
-
-                if sheet_pw == input_pw:
-                    st.session_state["logged_in"] = True
-                    st.session_state["user_id"] = username
-                    st.session_state["username"] = user_db[username]["이름"]
-                    st.session_state["user_dept"] = user_db[username]["부서"]
-                    st.success("로그인 성공!")
-                    st.rerun()
-                else:
-                    st.error("비밀번호 불일치")
-            else:
+            try:
+                user_index = get_user_index(client)
+            except Exception as e:
+                st.error(f"데이터 로딩 에러: {e}")
+                return
+
+            user, reason = user_index.authenticate(username, password)
+            if user is not None:
+                st.session_state["logged_in"] = True
+                st.session_state["user_id"] = user["아이디"]
+                st.session_state["username"] = user["이름"]
+                st.session_state["user_dept"] = user["부서"]
+                st.success("로그인 성공!")
+                st.rerun()
+            elif reason == "no_user":
                 st.error("없는 아이디입니다.")
+            else:
+                st.error("비밀번호 불일치")
 
 
 # ==========================================
@@ -297,17 +3707,19 @@ def main_app():
     # ✅ 마스터 계정 ID 추가 (lkhang79 포함)
     MASTER_IDS = ["admin", "manager", "lkhang79"]
     
+    set_sheets_tag("master")
     client = get_client()
     if not client:
         return
 
     try:
-        doc = client.open("장비관리시스템")
+        doc = open_spreadsheet(client)
     except Exception as e:
         st.error(f"파일 열기 실패: {e}")
         return
+    start_background_refresher()
 
-    dept_equip_map, equip_info_db, _, comp_db, comp_norm_db = get_master_data(client)
+    dept_equip_map, equip_info_db, comp_db, comp_norm_db = get_master_data(client)
 
     my_id = st.session_state.get("user_id", "")
     my_name = st.session_state.get("username", "")
@@ -319,12 +3731,16 @@ def main_app():
     if is_master:
         st.sidebar.success("👑 전체 관리자")
         dept_list = list(dept_equip_map.keys())
+        show_startup_report()
+        show_sheets_metrics_panel()
+        show_session_memory_panel()
     else:
         st.sidebar.caption(f"소속: {my_dept}")
         dept_list = [my_dept] if my_dept in dept_equip_map else []
 
     if st.sidebar.button("로그아웃"):
         st.session_state["logged_in"] = False
+        release_session_frames()
         st.rerun()
     st.sidebar.markdown("---")
 
@@ -335,6 +3751,8 @@ def main_app():
     sel_equip = st.sidebar.selectbox("장비", equip_list)
 
     curr_info = equip_info_db.get(sel_equip, {"no": "", "type": ""})
+    if sel_equip:
+        prefetch_equipment(doc, sel_equip)
 
     if sel_equip:
         st.title(f"📝 {sel_equip} 가동일지")
@@ -342,7 +3760,7 @@ def main_app():
         st.title("👈 왼쪽에서 장비를 선택해주세요.")
         st.stop()
 
-    tab1, tab2, tab3 = st.tabs(["입력하기", "조회 및 수정/삭제", "활용률 계산"])
+    tab1, tab2, tab3, tab4 = st.tabs(["입력하기", "조회 및 수정/삭제", "활용률 계산", "통합 검색"])
 
     def update_biz_num():
         selected = st.session_state.sel_comp_key
@@ -355,20 +3773,25 @@ def main_app():
     # [탭1] 입력
     # ===================================
     with tab1:
+        set_sheets_tag("tab1")
         st.markdown("##### 1. 기본 정보")
         c1, c2, c3, c4 = st.columns(4)
 
         with c1:
             f01_purpose = st.selectbox("사용목적", ["시험", "분석", "계측", "생산", "교육", "기타"])
         with c2:
-            f02_type = st.selectbox("활용유형", ["내부", "내부타부서", "외부", "간접지원"])
+            f02_type = st.selectbox("활용유형", USAGE_TYPES)
 
         with c3:
-            comp_list = sorted(list(comp_db.keys()))
-            comp_options = ["직접입력"] + comp_list
-            sel_comp = st.selectbox("기업명", comp_options, key="sel_comp_key", on_change=update_biz_num)
+            comp_query = st.text_input("기업명 검색", key="comp_query", placeholder="기업명 또는 초성 (예: ㄷㅎㅈㅁ)")
+            matches = company_index_for(doc, comp_db).search(comp_query, limit=20)
+            comp_options = ["직접입력"] + [name for name, _ in matches]
+            if st.session_state.get("sel_comp_key") not in comp_options:
+                st.session_state["sel_comp_key"] = "직접입력"
+            sel_comp = st.selectbox("기업명", comp_options, key="sel_comp_key", on_change=update_biz_num,
+                                    format_func=lambda n: n if n == "직접입력" else f"{n} ({comp_db.get(n, '')})")
             if sel_comp == "직접입력":
-                f03_biz_name = st.text_input("기업명 직접 작성")
+                f03_biz_name = st.text_input("기업명 직접 작성", value=comp_query)
             else:
                 f03_biz_name = sel_comp
 
@@ -438,6 +3861,7 @@ def main_app():
         f21_etc = st.text_input("비고")
 
         st.markdown("---")
+        allow_dup = st.checkbox("중복이어도 저장", value=False, key="allow_dup")
         if st.button("💾 저장하기", use_container_width=True):
             val_holiday = "Y" if f18_holiday else "N"
             row_data = [
@@ -447,9 +3871,18 @@ def main_app():
                 str(f16_start), str(f17_end), val_holiday, f19_hours, f20_fee, f21_etc
             ]
             try:
-                target_sheet = doc.worksheet(sel_equip)
-                target_sheet.append_row(row_data)
-                st.success("✅ 저장 완료!")
+                dup_kind, dup_row = check_duplicate_entry(doc, sel_equip, f03_biz_name, f16_start, f17_end,
+                                                          f19_hours, f09_prod_name)
+                if dup_kind == "exact" and not allow_dup:
+                    st.error(f"❌ 이미 같은 기록이 있습니다 (일지 {duplicate_location(dup_row)}). 그래도 저장하려면 '중복이어도 저장'을 체크하세요.")
+                else:
+                    if dup_kind == "near":
+                        st.warning(f"⚠️ 같은 업체·기간의 기록이 이미 있습니다 (일지 {duplicate_location(dup_row)}). 시간/제품명이 달라 저장합니다.")
+                    target_sheet = get_worksheet(doc, sel_equip)
+                    target_sheet.append_row(row_data)
+                    note_log_append(doc, sel_equip, 1)
+                    invalidate_sheet(doc, sel_equip)
+                    st.success("✅ 저장 완료!")
             except Exception as e:
                 st.error(f"저장 실패: {e}")
 
@@ -459,16 +3892,9 @@ def main_app():
         st.markdown("---")
         st.subheader("📂 엑셀 일괄 업로드")
 
-        template_cols = ["사용목적", "활용유형", "사용기관 기업명", "사용기관 사업자등록번호", "내부부서명",
-                         "업종", "품목", "세부품목", "제품명", "시료수/시험수",
-                         "세부지원공개여부", "세부지원내용", "장비명", "장비번호", "장비구분",
-                         "사용시작일", "사용종료일", "휴무일자포함", "사용시간", "사용료", "사용목적기타"]
+        template_cols = LOG_COLUMNS
 
-        df_template = pd.DataFrame(columns=template_cols)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_template.to_excel(writer, index=False, sheet_name='Sheet1')
-        excel_data = output.getvalue()
+        excel_data = build_template_excel(tuple(template_cols))
 
         col_down, col_up = st.columns([1, 2.5])
         with col_down:
@@ -484,106 +3910,82 @@ def main_app():
             **※ 장비일지 엑셀 업로드 시 유의사항**
             - 다운로드 받은 양식의 컬럼 순서를 변경하지 마세요.
             - 날짜 형식: YYYY-MM-DD
-            - 1000건 이하로 작성 권장
+            - 엑셀(.xlsx, 여러 시트면 시트마다 같은 양식) 또는 CSV(UTF-8/CP949)로 올릴 수 있습니다.
             
             **✨ 자동 보정 기능**
             - 업체명이 등록된 업체와 유사하면 자동으로 정확한 이름과 사업자번호로 매칭됩니다.
             - 예: "주식회사ABC" → "(주)ABC"로 자동 보정
             - 장비명이 등록된 장비명과 일치하지 않으면 오류로 표시됩니다.
+
+            **🔍 추가 검토 항목**
+            - 사용시작일/사용종료일 날짜 형식, 종료일 ≥ 시작일
+            - 사용시간 > 0 이고 기간(일수×24시간) 이내
+            - 활용유형: 내부 / 내부타부서 / 외부 / 간접지원
+            - 업종 → 품목 → 세부품목 조합 (업종이 빈칸이면 생략)
+            - 사업자등록번호 체크섬
+            - 중복: 업체·사용기간·사용시간·제품명이 기존 일지나 같은 파일의 행과 같으면 오류 (업체·기간만 같으면 경고)
             """)
 
         with col_up:
-            uploaded_file = st.file_uploader("작성된 엑셀 파일 업로드", type=["xlsx"])
+            uploaded_file = st.file_uploader("작성된 엑셀/CSV 파일 업로드", type=["xlsx", "csv"])
 
         if uploaded_file:
             try:
-                df_upload = pd.read_excel(uploaded_file)
-                required_cols = ["사용기관 기업명", "사용기관 사업자등록번호", "장비명"]
-                missing = [c for c in required_cols if c not in df_upload.columns]
-
-                if missing:
-                    st.error(f"❌ 필수 컬럼이 누락되었습니다: {missing} (양식을 확인해주세요)")
+                # 같은 파일이면 재실행(버튼 클릭 등)마다 다시 읽지 않도록 검토 결과를 세션 캐시에 둔다
+                upload_key = f"upload:{getattr(uploaded_file, 'file_id', uploaded_file.name)}"
+                checked = session_frames().get(upload_key)
+                if checked is None:
+                    read_bar = st.progress(0.0, text="파일 읽는 중...")
+                    checked = ingest_upload(
+                        uploaded_file, uploaded_file.name, equip_info_db, comp_norm_db,
+                        duplicate_lookup=lambda eq: get_duplicate_index(doc, eq),
+                        chunk_rows=get_setting("upload_chunk_rows", 2000),
+                        on_progress=lambda fraction, text: read_bar.progress(min(fraction, 1.0), text=text))
+                    read_bar.empty()
+                    session_frames().put(upload_key, checked)
+
+                for sheet, missing in checked["skipped"]:
+                    st.warning(f"⚠️ '{sheet}' 시트는 필수 컬럼이 없어 건너뜀: {missing}")
+
+                if not checked["sheets"]:
+                    st.error("❌ 필수 컬럼이 누락되었습니다: "
+                             f"{UPLOAD_REQUIRED_COLUMNS} (양식을 확인해주세요)")
                 else:
-                    st.info(f"🔎 총 {len(df_upload)}개의 데이터 검토 중...")
-
-                    valid_rows = []
-                    error_logs = []
-                    auto_corrected = []  # ✅ 자동 보정된 항목 추적
-
-                    for idx, row in df_upload.iterrows():
-                        def get_val(col_name):
-                            val = row.get(col_name, "")
-                            return str(val).strip() if pd.notna(val) else ""
-
-                        u_company = get_val("사용기관 기업명")
-                        u_biz_num = get_val("사용기관 사업자등록번호")
-                        u_equip_name = get_val("장비명")
-
-                        row_data_for_save = []
-                        for col in template_cols:
-                            row_data_for_save.append(get_val(col))
-
-                        reasons = []
-                        corrected_info = {}
-
-                        # ✅ 장비명 검증 (자동 보정 불가 - 반드시 정확해야 함)
-                        if u_equip_name not in equip_info_db:
-                            reasons.append(f"등록되지 않은 장비명: {u_equip_name}")
-
-                        # ✅ 업체명 자동 보정
-                        norm_u_comp = normalize_comp_name(u_company)
-                        corrected_company = u_company
-                        corrected_biz_num = u_biz_num
-
-                        if norm_u_comp in comp_norm_db:
-                            # 정규화된 이름으로 매칭됨 - 정확한 업체명과 사업자번호로 대체
-                            master_info = comp_norm_db[norm_u_comp]
-                            corrected_company = master_info["real_name"]
-                            corrected_biz_num = master_info["biz_num"]
-                            
-                            # 원본과 다르면 자동 보정 로그 기록
-                            if u_company != corrected_company or u_biz_num != corrected_biz_num:
-                                corrected_info = {
-                                    "행 번호": idx + 2,
-                                    "원본 기업명": u_company,
-                                    "보정 기업명": corrected_company,
-                                    "원본 사업자번호": u_biz_num,
-                                    "보정 사업자번호": corrected_biz_num
-                                }
-                                auto_corrected.append(corrected_info)
-                        else:
-                            # 매칭되지 않음
-                            if u_company:
-                                reasons.append(f"미등록 업체 (정확한 이름 확인 필요): {u_company}")
-
-                        if not reasons:
-                            # ✅ 보정된 값으로 저장
-                            formatted_row = []
-                            for i, col in enumerate(template_cols):
-                                if col == "사용기관 기업명":
-                                    formatted_row.append(corrected_company)
-                                elif col == "사용기관 사업자등록번호":
-                                    formatted_row.append(corrected_biz_num)
-                                else:
-                                    formatted_row.append(row_data_for_save[i])
-                            valid_rows.append(formatted_row)
-                        else:
-                            error_logs.append({
-                                "행 번호": idx + 2,
-                                "기업명": u_company,
-                                "장비명": u_equip_name,
-                                "오류 내용": ", ".join(reasons)
-                            })
-
-                    # ✅ 자동 보정 내역 표시
+                    sheets_note = f" ({', '.join(checked['sheets'])})" if len(checked["sheets"]) > 1 else ""
+                    st.info(f"🔎 총 {checked['total']}개의 데이터 검토{sheets_note}")
+
+                    valid_rows = checked["valid_rows"]
+                    error_logs = checked["error_logs"]
+                    auto_corrected = checked["auto_corrected"]
+                    near_dups = checked["near_dups"]
+
+                    # ✅ 자동 보정 내역 표시 (사유별 요약 + 한 페이지씩, 전체는 보고서 엑셀로)
                     if auto_corrected:
                         st.success(f"✨ 자동 보정: {len(auto_corrected)}건의 업체 정보가 자동으로 수정되었습니다.")
                         with st.expander("📋 자동 보정 내역 보기", expanded=False):
-                            st.table(pd.DataFrame(auto_corrected))
+                            pairs = summarize_reasons(correction_pairs(auto_corrected), "보정")
+                            show_paged_records(pairs.to_dict("records"), f"{upload_key}:fix_sum", page_size=10)
+                            show_paged_records(auto_corrected, f"{upload_key}:fix")
 
                     if error_logs:
                         st.error(f"❌ 검토 실패: 총 {len(error_logs)}건의 오류가 발견되었습니다.")
-                        st.table(pd.DataFrame(error_logs))
+                        kinds = summarize_reasons(error_logs, "오류 유형")
+                        st.dataframe(kinds, hide_index=True, use_container_width=True)
+                        show_paged_records(error_logs, f"{upload_key}:err", filter_field="오류 유형",
+                                           options=kinds["오류 유형"].tolist())
+
+                    if near_dups:
+                        st.warning(f"⚠️ 유사 중복: {len(near_dups)}건이 같은 업체·기간의 기존 기록과 겹칩니다. (시간/제품명은 다름, 저장은 가능)")
+                        with st.expander("📋 유사 중복 내역 보기", expanded=False):
+                            show_paged_records(near_dups, f"{upload_key}:near")
+
+                    if error_logs or auto_corrected or near_dups:
+                        # 보고서는 버튼을 누를 때 만든다 (검토 결과가 커도 화면 갱신은 느려지지 않게)
+                        st.download_button(
+                            "📥 검토 보고서(엑셀) 다운로드", lambda: build_upload_report(checked),
+                            f"검토보고서_{os.path.splitext(uploaded_file.name)[0]}.xlsx",
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            key=f"{upload_key}:report")
 
                     if valid_rows:
                         st.success(f"✅ PASS: 검토 통과! (총 {len(valid_rows)}건)")
@@ -603,8 +4005,11 @@ def main_app():
 
                             for eq_name, rows in grouped_data.items():
                                 try:
-                                    target_sheet = doc.worksheet(eq_name)
-                                    target_sheet.append_rows(rows)
+                                    with sheets_priority("bulk"):
+                                        target_sheet = get_worksheet(doc, eq_name)
+                                        target_sheet.append_rows(rows)
+                                    note_log_append(doc, eq_name, len(rows))
+                                    invalidate_sheet(doc, eq_name)
                                     success_count += len(rows)
                                 except Exception as e:
                                     st.error(f"[{eq_name}] 저장 중 에러: {e}")
@@ -612,6 +4017,7 @@ def main_app():
                                 curr_idx += 1
                                 progress_bar.progress(curr_idx / total_groups)
 
+                            session_frames().pop(upload_key)
                             st.balloons()
                             st.success(f"🎉 총 {success_count}건 저장이 완료되었습니다!")
                     else:
@@ -625,15 +4031,23 @@ def main_app():
     # [탭2] 조회 및 수정/삭제
     # ===================================
     with tab2:
+        set_sheets_tag("tab2")
         if st.button("🔄 새로고침"):
+            base_state = session_frames().get("edit_base")
+            if base_state:
+                reset_edit_form(base_state["equip"], base_state["row"])
             st.rerun()
 
         try:
-            target_sheet = doc.worksheet(sel_equip)
-            df = load_log_data(target_sheet)
+            target_sheet = get_worksheet(doc, sel_equip)
+            df, log_fresh = log_frame_prefetched(doc, sel_equip)
+            if not log_fresh:
+                prefetch_watcher(doc, sel_equip)
 
             if not df.empty:
-                st.dataframe(df.sort_values(by="행번호", ascending=False), use_container_width=True)
+                # 화면용 정렬본은 세션 메모리 예산 안에 둔다 (예산을 넘으면 다음 실행에서 다시 만든다)
+                listing = session_frames().put("tab2_list", df.sort_values(by="행번호", ascending=False))
+                st.dataframe(listing, use_container_width=True)
 
                 st.markdown("---")
 
@@ -641,81 +4055,123 @@ def main_app():
                     st.write("위 표에서 **'행번호'**를 확인 후 입력해주세요.")
 
                     row_options = df["행번호"].tolist()
-                    selected_row_num = st.selectbox("수정/삭제할 행번호(No.) 선택", row_options)
+                    selected_row_num = st.selectbox("수정/삭제할 행번호(No.) 선택", row_options, key="edit_row_num")
 
                     selected_data = df[df["행번호"] == selected_row_num].iloc[0]
 
-                    st.info(f"선택된 데이터: **{selected_data['사용기관 기업명']}** / {selected_data['사용시작일']} ({selected_data['사용시간']}시간)")
-
-                    with st.form("edit_form"):
-                        st.write("#### 📝 내용 수정")
-                        ec1, ec2, ec3 = st.columns(3)
-                        with ec1:
-                            e_comp = st.text_input("기업명", value=selected_data["사용기관 기업명"])
-                        with ec2:
-                            e_date = st.text_input("사용시작일(YYYY-MM-DD)", value=selected_data["사용시작일"])
-                        with ec3:
-                            try:
-                                curr_hours = float(selected_data["사용시간"])
-                            except:
-                                curr_hours = 0.0
-                            e_hours = st.number_input("사용시간", value=curr_hours, step=0.5)
-
-                        e_content = st.text_area("세부지원내용", value=selected_data["세부지원내용"], height=100)
-
-                        col_btn1, col_btn2 = st.columns([1, 1])
-
-                        with col_btn1:
-                            if st.form_submit_button("✏️ 수정사항 저장"):
+                    # 비교 기준은 "수정 폼을 처음 그렸을 때의 값" - 저장/취소/새로고침 전까지 유지
+                    # (제출 실행에서 새로 읽은 값과 비교하면 그 사이 다른 사용자의 수정을 놓친다)
+                    base_state = session_frames().get("edit_base")
+                    # 목록에는 세부지원내용이 없으므로 고른 행만 시트에서 한 줄 읽어 기준값으로 삼는다.
+                    # 목록이 이전 프레임이면 그 번호에 다른 기록이 와 있을 수 있어 행 해시로 지금 위치를 다시 찾는다
+                    if not base_state or base_state["equip"] != sel_equip or base_state["row"] != selected_row_num:
+                        edit_row, row_now = resolve_listed_row(target_sheet, selected_row_num,
+                                                               [selected_data.get(c, "") for c in LOG_COLUMNS])
+                        base_state = {"equip": sel_equip, "row": selected_row_num, "at": edit_row, "values": row_now}
+                        session_frames().put("edit_base", base_state, pinned=True)
+                    edit_row, edit_base = base_state["at"], base_state["values"]
+
+                    if edit_row is None:
+                        st.warning(f"⚠️ {selected_row_num}번 행은 목록을 불러온 뒤 다른 사용자에 의해 바뀌었거나 삭제되었습니다. "
+                                   "새로고침 후 다시 선택해주세요.")
+                    else:
+                        base_data = dict(zip(LOG_COLUMNS, edit_base))
+                        if edit_row != selected_row_num:
+                            st.caption(f"목록을 불러온 뒤 행이 옮겨져 이 기록은 지금 {edit_row}번 행에 있습니다.")
+                        st.info(f"선택된 데이터: **{base_data['사용기관 기업명']}** / {base_data['사용시작일']} ({base_data['사용시간']}시간)")
+
+                        with st.form("edit_form"):
+                            st.write("#### 📝 내용 수정")
+                            # 키를 장비/행 단위로 고정: 다른 사용자가 그 행을 바꿔 기본값이 달라져도 입력 중인 값이 초기화되지 않게
+                            ek = f"{sel_equip}_{selected_row_num}"
+                            ec1, ec2, ec3 = st.columns(3)
+                            with ec1:
+                                e_comp = st.text_input("기업명", value=base_data["사용기관 기업명"], key=f"e_comp_{ek}")
+                            with ec2:
+                                e_date = st.text_input("사용시작일(YYYY-MM-DD)", value=base_data["사용시작일"], key=f"e_date_{ek}")
+                            with ec3:
+                                curr_hours = parse_hours(base_data["사용시간"])
+                                e_hours = st.number_input("사용시간", value=curr_hours, step=0.5, key=f"e_hours_{ek}")
+
+                            e_content = st.text_area("세부지원내용", value=base_data["세부지원내용"], height=100, key=f"e_content_{ek}")
+
+                            col_btn1, col_btn2 = st.columns([1, 1])
+
+                            with col_btn1:
+                                if st.form_submit_button("✏️ 수정사항 저장", disabled=not log_fresh):
+                                    try:
+                                        cols_order = ["사용목적", "활용유형", "사용기관 기업명", "사용기관 사업자등록번호", "내부부서명",
+                                                     "업종", "품목", "세부품목", "제품명", "시료수/시험수",
+                                                     "세부지원공개여부", "세부지원내용", "장비명", "장비번호", "장비구분",
+                                                     "사용시작일", "사용종료일", "휴무일자포함", "사용시간", "사용료", "사용목적기타"]
+
+                                        new_values = []
+                                        for col in cols_order:
+                                            if col == "사용기관 기업명":
+                                                new_values.append(e_comp)
+                                            elif col == "사용시작일":
+                                                new_values.append(e_date)
+                                            elif col == "사용시간":
+                                                new_values.append(e_hours)
+                                            elif col == "세부지원내용":
+                                                new_values.append(e_content)
+                                            else:
+                                                new_values.append(base_data[col])
+
+                                        conditional_update_row(target_sheet, edit_row, edit_base, new_values)
+                                        reset_edit_form(sel_equip, selected_row_num)
+                                        invalidate_sheet(doc, sel_equip)
+                                        forget_duplicate_index(doc, sel_equip)
+                                        forget_search_sheet(doc, sel_equip)
+
+                                        st.success(f"{edit_row}번 행이 수정되었습니다!")
+                                        st.rerun()
+                                    except RowConflict as c:
+                                        session_frames().put("edit_conflict", {
+                                            "equip": sel_equip, "row": c.row_num, "form_row": selected_row_num,
+                                            "base": c.base, "theirs": c.current, "moved_to": c.moved_to,
+                                            "mine": log_row_values(new_values)}, pinned=True)
+                                    except Exception as e:
+                                        st.error(f"수정 실패: {e}")
+
+                            with col_btn2:
+                                pass
+
+                        conflict = session_frames().get("edit_conflict")
+                        if conflict and conflict["equip"] == sel_equip:
+                            show_edit_conflict(target_sheet, doc, conflict)
+
+                        st.write("#### 🗑 데이터 삭제")
+                        if st.checkbox("정말 삭제하시겠습니까?", key="del_confirm"):
+                            if st.button("❌ 선택된 행 삭제", type="primary", disabled=not log_fresh):
                                 try:
-                                    cols_order = ["사용목적", "활용유형", "사용기관 기업명", "사용기관 사업자등록번호", "내부부서명",
-                                                 "업종", "품목", "세부품목", "제품명", "시료수/시험수",
-                                                 "세부지원공개여부", "세부지원내용", "장비명", "장비번호", "장비구분",
-                                                 "사용시작일", "사용종료일", "휴무일자포함", "사용시간", "사용료", "사용목적기타"]
-
-                                    new_values = []
-                                    for col in cols_order:
-                                        if col == "사용기관 기업명":
-                                            new_values.append(e_comp)
-                                        elif col == "사용시작일":
-                                            new_values.append(e_date)
-                                        elif col == "사용시간":
-                                            new_values.append(e_hours)
-                                        elif col == "세부지원내용":
-                                            new_values.append(e_content)
-                                        else:
-                                            new_values.append(selected_data[col])
-
-                                    cell_range = f"A{selected_row_num}:U{selected_row_num}"
-                                    target_sheet.update(range_name=cell_range, values=[new_values])
-
-                                    st.success(f"{selected_row_num}번 행이 수정되었습니다!")
+                                    conditional_delete_row(target_sheet, edit_row, edit_base)
+                                    reset_edit_form(sel_equip, selected_row_num)
+                                    invalidate_sheet(doc, sel_equip)
+                                    forget_duplicate_index(doc, sel_equip)
+                                    forget_search_sheet(doc, sel_equip)
+                                    st.success(f"{edit_row}번 행이 삭제되었습니다.")
                                     st.rerun()
+                                except RowConflict as c:
+                                    invalidate_sheet(doc, sel_equip)
+                                    moved = f" (이 기록은 지금 {c.moved_to}번 행에 있습니다)" if c.moved_to else ""
+                                    st.error(f"❌ {edit_row}번 행이 불러온 뒤 다른 사용자에 의해 바뀌었거나 삭제되었습니다{moved}. "
+                                             "새로고침 후 다시 확인해주세요. (삭제하지 않았습니다)")
                                 except Exception as e:
-                                    st.error(f"수정 실패: {e}")
-
-                        with col_btn2:
-                            pass
-
-                    st.write("#### 🗑 데이터 삭제")
-                    if st.checkbox("정말 삭제하시겠습니까?", key="del_confirm"):
-                        if st.button("❌ 선택된 행 삭제", type="primary"):
-                            try:
-                                target_sheet.delete_rows(int(selected_row_num))
-                                st.success(f"{selected_row_num}번 행이 삭제되었습니다.")
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"삭제 실패: {e}")
+                                    st.error(f"삭제 실패: {e}")
 
                 st.markdown("---")
                 st.subheader("📥 다운로드")
 
                 col_d1, col_d2 = st.columns([1, 1.5])
 
+                # 다운로드 파일은 세부지원내용까지 모든 열이 필요하므로 버튼을 누를 때 전체를 받는다 (보관된 행 포함)
                 with col_d1:
                     st.markdown("**전체 데이터**")
-                    csv_all = df.drop(columns=["행번호"]).to_csv(index=False).encode('utf-8-sig')
-                    st.download_button("📦 전체 다운로드", csv_all, f"{sel_equip}_전체.csv", "text/csv")
+                    st.download_button(
+                        "📦 전체 다운로드",
+                        lambda: load_log_history(doc, sel_equip).drop(columns=["행번호"]).to_csv(index=False).encode('utf-8-sig'),
+                        f"{sel_equip}_전체.csv", "text/csv")
 
                 with col_d2:
                     st.markdown("**기간 설정**")
@@ -725,26 +4181,58 @@ def main_app():
                     with dc2:
                         d_end = st.date_input("까지", value=date.today())
 
-                    df['temp_date'] = pd.to_datetime(df['사용시작일'], errors='coerce').dt.date
-                    mask = (df['temp_date'] >= d_start) & (df['temp_date'] <= d_end)
-                    filtered_df = df[mask].drop(columns=['temp_date'])
+                    # 기간별 다운로드는 보관된 행도 포함 (기간에 걸리는 월 파티션만 읽음). 건수는 사용시작일 열만 받아 센다
+                    def period_rows(columns=None):
+                        hist_df = load_log_history(doc, sel_equip, d_start, d_end, columns)
+                        hist_dates = parse_dates(hist_df['사용시작일']).dt.date
+                        return hist_df[(hist_dates >= d_start) & (hist_dates <= d_end)]
 
-                    st.write(f"🔍 검색: **{len(filtered_df)}건**")
+                    period_count = len(period_rows(["사용시작일"]))
+                    st.write(f"🔍 검색: **{period_count}건**")
 
-                    if not filtered_df.empty:
-                        csv_filter = filtered_df.drop(columns=["행번호"]).to_csv(index=False).encode('utf-8-sig')
-                        st.download_button("📅 기간별 다운로드", csv_filter,
-                                           f"{sel_equip}_{d_start}~{d_end}.csv", "text/csv", key="period_dl")
+                    if period_count:
+                        st.download_button(
+                            "📅 기간별 다운로드",
+                            lambda: period_rows().drop(columns=["행번호"]).to_csv(index=False).encode('utf-8-sig'),
+                            f"{sel_equip}_{d_start}~{d_end}.csv", "text/csv", key="period_dl")
             else:
                 st.info("데이터가 없습니다.")
         except:
             st.warning("데이터 시트가 없습니다.")
 
+        if is_master:
+            with st.expander("🗄️ 오래된 일지 보관 (관리자)", expanded=False):
+                st.caption(f"사용시작일이 기준일 이전인 행을 시트에서 빼서 '{archive_root()}' 폴더에 월별 Parquet 파일로 보관합니다. "
+                           "활용률 계산과 기간별 다운로드는 보관분을 함께 읽습니다.")
+                manifest = load_archive_manifest(sel_equip)
+                if manifest["partitions"]:
+                    parts = pd.DataFrame([{"파티션": rel, **p} for rel, p in sorted(manifest["partitions"].items())])
+                    st.write(f"보관 중: **{int(parts['rows'].sum()):,}행** / 파일 {len(parts)}개")
+                    st.dataframe(parts[["파티션", "rows", "min", "max", "sha256"]], hide_index=True, use_container_width=True)
+                cutoff = st.date_input("기준일 (이 날짜 이전 행 보관)",
+                                       value=date(date.today().year - 1, 1, 1), key="archive_cutoff")
+                if st.button(f"🗄️ {sel_equip} 보관 실행", key="archive_run"):
+                    try:
+                        with sheets_priority("bulk"):
+                            result = archive_log_rows(doc, sel_equip, cutoff, user=my_id)
+                        if result["rows"]:
+                            st.success(f"✅ {result['rows']}건을 {len(result['files'])}개 파일로 보관했습니다.")
+                        else:
+                            st.info("기준일 이전 행이 없습니다.")
+                    except Exception as e:
+                        st.error(f"보관 실패: {e}")
+                audit = read_archive_audit()
+                if audit:
+                    st.markdown("**최근 보관 이력**")
+                    st.dataframe(pd.DataFrame([{k: v for k, v in a.items() if k != "files"} for a in audit]),
+                                 hide_index=True, use_container_width=True)
+
 
     # ===================================
     # [탭3] 활용률 계산 (세션 상태 유지)
     # ===================================
     with tab3:
+        set_sheets_tag("tab3")
         st.header(f"📊 {sel_equip} 장비 활용률")
 
         # 1. 유지보수 입력
@@ -761,18 +4249,26 @@ def main_app():
 
             if st.form_submit_button("💾 유지보수 기록 저장"):
                 try:
-                    sheet_name = f"{sel_equip}_유지보수"
-                    try:
-                        m_sheet = doc.worksheet(sheet_name)
-                    except:
-                        m_sheet = doc.add_worksheet(title=sheet_name, rows=100, cols=4)
-                        m_sheet.append_row(["시작일", "종료일", "시간", "내용"])
-                    m_sheet.append_row([str(m_start), str(m_end), m_hours, m_content])
+                    append_maintenance(doc, sel_equip, [str(m_start), str(m_end), m_hours, m_content])
                     st.success("✅ 저장 완료!")
                     st.rerun()
                 except Exception as e:
                     st.error(f"저장 실패: {e}")
 
+        if is_master:
+            with st.expander("🗂️ 장비별 유지보수 시트 이관 (관리자)"):
+                st.caption(f"구 '장비명_유지보수' 시트를 통합 시트 '{MAINTENANCE_SHEET}' 로 옮기고, 원본은 '(이관됨)' 으로 이름을 바꿉니다.")
+                if st.button("이관 실행", key="migrate_maint"):
+                    try:
+                        with sheets_priority("bulk"):
+                            moved = migrate_legacy_maintenance(doc, list(equip_info_db.keys()))
+                        if moved:
+                            st.success(f"✅ {len(moved)}개 장비, {sum(moved.values())}건 이관 완료")
+                        else:
+                            st.info("이관할 시트가 없습니다.")
+                    except Exception as e:
+                        st.error(f"이관 실패: {e}")
+
         st.markdown("---")
 
         # 2. 활용률 계산 및 표 출력
@@ -786,70 +4282,23 @@ def main_app():
 
         if st.button("🔍 결과 산출하기", use_container_width=True):
             try:
-                # [A] 가동가능시간 계산
-                date_range = pd.date_range(start=calc_start, end=calc_end)
-                workdays = date_range[date_range.dayofweek < 5]
-                annual_available_hours = len(workdays) * 8.0
-
-                # [D, E] 사용 데이터
-                target_sheet = doc.worksheet(sel_equip)
-                df = load_log_data(target_sheet)
-
-                internal_hours = 0.0
-                external_hours = 0.0
-
-                if not df.empty:
-                    # ✅ [핵심] 날짜/시간 전처리로 0 문제 해결
-                    df['사용시작일_raw'] = df['사용시작일']
-                    df['사용시작일'] = df['사용시작일'].apply(clean_date_str)
-                    df['사용시작일'] = pd.to_datetime(df['사용시작일'], errors='coerce')
-
-                    df['사용시간_raw'] = df['사용시간']
-                    df['사용시간'] = df['사용시간'].apply(parse_hours)
-
-                    df['활용유형'] = df['활용유형'].astype(str).str.strip()
-
-                    mask = (df['사용시작일'].dt.date >= calc_start) & (df['사용시작일'].dt.date <= calc_end)
-                    period_df = df.loc[mask].copy()
-
-                    if period_df.empty:
-                        st.warning("⚠️ 선택 기간에 해당하는 데이터가 없습니다. (날짜 형식/기간 확인)")
-                        st.write("최근 데이터(원본 날짜/파싱 날짜/원본 시간/파싱 시간) 샘플:")
-                        st.dataframe(
-                            df[['사용시작일_raw', '사용시작일', '사용시간_raw', '사용시간', '활용유형']].tail(20),
-                            use_container_width=True
-                        )
-
-                    internal_hours = period_df[period_df['활용유형'].str.contains('내부', na=False)]['사용시간'].sum()
-                    external_hours = period_df[period_df['활용유형'].str.contains('외부', na=False)]['사용시간'].sum()
-
-                # [C] 유지보수 시간
-                maintenance_df = load_maintenance_data(client, sel_equip)
-                maintenance_hours = 0.0
-
-                if not maintenance_df.empty:
-                    maintenance_df['시작일_raw'] = maintenance_df['시작일']
-                    maintenance_df['시작일'] = maintenance_df['시작일'].apply(clean_date_str)
-                    maintenance_df['시작일'] = pd.to_datetime(maintenance_df['시작일'], errors='coerce')
-
-                    maintenance_df['시간_raw'] = maintenance_df['시간']
-                    maintenance_df['시간'] = maintenance_df['시간'].apply(parse_hours)
-
-                    m_mask = (maintenance_df['시작일'].dt.date >= calc_start) & (maintenance_df['시작일'].dt.date <= calc_end)
-                    period_m_df = maintenance_df.loc[m_mask].copy()
-
-                    maintenance_hours = period_m_df['시간'].sum()
-
-                # [계산 로직]
-                actual_available_hours = annual_available_hours - maintenance_hours
-                actual_usage_hours = external_hours + internal_hours
-
-                if actual_available_hours > 0:
-                    utilization_rate = (actual_usage_hours / actual_available_hours)
-                    external_rate = (external_hours / actual_available_hours)
-                else:
-                    utilization_rate = 0.0
-                    external_rate = 0.0
+                calc, from_cache = cached_utilization(doc, client, sel_equip, calc_start, calc_end)
+                if from_cache:
+                    st.caption(f"⚡ 같은 조건의 계산 결과를 재사용했습니다 (계산 시각 {calc['computed_at']}, 이후 데이터 변경 없음)")
+
+                if calc["empty_sample"] is not None:
+                    st.warning("⚠️ 선택 기간에 해당하는 데이터가 없습니다. (날짜 형식/기간 확인)")
+                    st.write("최근 데이터(원본 날짜/파싱 날짜/원본 시간/파싱 시간) 샘플:")
+                    st.dataframe(calc["empty_sample"], use_container_width=True)
+
+                annual_available_hours = calc["annual_available"]
+                maintenance_hours = calc["maintenance"]
+                external_hours = calc["external"]
+                internal_hours = calc["internal"]
+                actual_available_hours = calc["actual_available"]
+                actual_usage_hours = calc["actual_usage"]
+                utilization_rate = calc["utilization_rate"]
+                external_rate = calc["external_rate"]
 
                 data = {
                     "가동가능시간\n(A)=고정값": [f"{annual_available_hours:,.1f}"],
@@ -863,19 +4312,29 @@ def main_app():
                 }
                 result_df = pd.DataFrame(data)
 
-                st.session_state["calc_results"] = {
+                session_frames().put("calc_results", {
                     "df": result_df,
                     "actual_available": actual_available_hours,
                     "actual_usage": actual_usage_hours,
-                    "workdays_count": len(workdays),
+                    "workdays_count": calc["workdays_count"],
                     "range_str": f"{calc_start} ~ {calc_end}"
-                }
+                })
 
             except Exception as e:
                 st.error(f"계산 중 오류 발생: {e}")
 
-        if st.session_state["calc_results"] is not None:
-            res = st.session_state["calc_results"]
+        with st.expander(f"🔧 {sel_dept} 장비별 유지보수 시간 ({calc_start} ~ {calc_end})"):
+            try:
+                totals = maintenance_totals(doc, calc_start, calc_end, equip_list)
+                if totals.empty:
+                    st.caption("기간 내 기록된 유지보수가 없습니다.")
+                else:
+                    st.dataframe(totals, use_container_width=True)
+            except Exception as e:
+                st.error(f"유지보수 집계 실패: {e}")
+
+        res = session_frames().get("calc_results")
+        if res is not None:
 
             st.write("")
             st.markdown(f"#### 📅 기간: {res['range_str']}")
@@ -909,14 +4368,306 @@ def main_app():
                 else:
                     st.success(f"🎉 축하합니다! 이미 목표를 **{abs(needed_hours):,.1f}시간** 초과 달성했습니다.")
 
+        st.markdown("---")
+        st.subheader("🚀 전 장비 연말 가동률 예측")
+        fleet_equips = [e for d in dept_list for e in dept_equip_map.get(d, [])]
+        fc_col1, fc_col2 = st.columns([2, 1])
+        with fc_col1:
+            fc_targets = st.multiselect("목표 가동률(%)", [40.0, 50.0, 60.0, 70.0, 80.0, 90.0],
+                                        default=[50.0, 60.0, 70.0], key="fc_targets")
+        with fc_col2:
+            fc_year = st.number_input("연도", min_value=2000, max_value=2100, value=date.today().year, key="fc_year")
+        st.caption(f"대상: {len(fleet_equips)}대 / 올해 평일당 이용 속도가 남은 평일에도 유지된다고 보고 계산합니다.")
+
+        if st.button("📊 전 장비 예측하기", use_container_width=True, disabled=not fc_targets):
+            try:
+                year = int(fc_year)
+                today = min(date.today(), date(year, 12, 31))
+                total_wd, elapsed_wd, remaining_wd = workday_calendar(year, today)
+                with st.spinner(f"{len(fleet_equips)}대 장비 일지 집계 중..."):
+                    usage_ytd, maint_ytd = collect_fleet_usage(doc, fleet_equips, year, today)
+                targets = sorted(fc_targets)
+                session_frames().put("fleet_forecast", {
+                    "equips": fleet_equips, "targets": targets, "year": year,
+                    "calendar": (total_wd, elapsed_wd, remaining_wd),
+                    "fc": forecast_year_end(usage_ytd, maint_ytd, targets, total_wd, elapsed_wd, remaining_wd),
+                })
+            except Exception as e:
+                st.error(f"예측 중 오류 발생: {e}")
+
+        fleet = session_frames().get("fleet_forecast")
+        if fleet:
+            total_wd, elapsed_wd, remaining_wd = fleet["calendar"]
+            st.markdown(f"#### 📅 {fleet['year']}년 - 평일 {total_wd}일 중 {elapsed_wd}일 경과, {remaining_wd}일 남음")
+            rank_target = st.selectbox("부족분 순위 기준 목표", fleet["targets"], index=len(fleet["targets"]) - 1,
+                                       format_func=lambda t: f"{t:g}%", key="fc_rank")
+            table = fleet_forecast_table(fleet["equips"], fleet["fc"], fleet["targets"], rank_target)
+            behind = int((fleet["fc"]["shortfall"][:, fleet["targets"].index(rank_target)] > 0).sum())
+            st.write(f"목표 {rank_target:g}% 미달 예상: **{behind}대** / {len(table)}대")
+            st.dataframe(table, hide_index=True, use_container_width=True)
+            st.download_button("⬇️ 예측 결과 CSV", table.to_csv(index=False).encode("utf-8-sig"),
+                               f"연말가동률예측_{fleet['year']}.csv", "text/csv", key="fc_dl")
+
+        st.markdown("---")
+        st.subheader("🏢 기업별 이용 현황")
+        st.caption(f"볼 수 있는 장비 {len(fleet_equips)}대의 일지(보관분 포함)를 기업별로 합산합니다. "
+                   "업체명은 (주)·공백을 무시하고 같은 기업으로 묶습니다.")
+        cu1, cu2, cu3 = st.columns(3)
+        with cu1:
+            cu_start = st.date_input("시작일", value=date(date.today().year, 1, 1), key="cu_start")
+        with cu2:
+            cu_end = st.date_input("종료일", value=date.today(), key="cu_end")
+        with cu3:
+            cu_by = st.radio("묶음 기준", ["기업명", "사업자등록번호"], horizontal=True, key="cu_by")
+        cu_types = st.multiselect("활용유형", USAGE_TYPES, default=USAGE_TYPES, key="cu_types")
+
+        if st.button("🏢 기업별 집계하기", use_container_width=True, disabled=not fleet_equips):
+            try:
+                with st.spinner(f"{len(fleet_equips)}대 장비 일지 집계 중..."):
+                    table, skipped = company_usage(doc, fleet_equips, cu_start, cu_end,
+                                                   by="name" if cu_by == "기업명" else "biz",
+                                                   usage_types=cu_types, comp_norm_db=comp_norm_db)
+                session_frames().put("company_usage", {"table": table, "skipped": skipped,
+                                                       "period": (cu_start, cu_end), "by": cu_by})
+            except Exception as e:
+                st.error(f"집계 중 오류 발생: {e}")
+
+        usage = session_frames().get("company_usage")
+        if usage:
+            table = usage["table"]
+            u_start, u_end = usage["period"]
+            st.markdown(f"#### {u_start} ~ {u_end} · {usage['by']} 기준 {len(table):,}개 기업")
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("이용건수", f"{int(table['이용건수'].sum()):,}")
+            m2.metric("이용시간", f"{table['이용시간'].sum():,.1f}")
+            m3.metric("사용료", f"{table['사용료'].sum():,.0f}")
+            m4.metric("시료수", f"{table['시료수'].sum():,.0f}")
+            if usage["skipped"]:
+                st.caption(f"기업명이 비어 있는 {usage['skipped']:,}건은 제외했습니다.")
+            show_paged_records(table.to_dict("records"), "cu_rows")
+            st.download_button("⬇️ 기업별 이용 현황 CSV", table.to_csv(index=False).encode("utf-8-sig"),
+                               f"기업별이용현황_{u_start}~{u_end}.csv", "text/csv", key="cu_dl")
+
+        st.markdown("---")
+        st.subheader("🗓️ 장비 사용 달력 (히트맵 / 타임라인)")
+        st.caption("부서 장비의 사용·유지보수 시간을 기간별 칸으로 묶어 보여줍니다. 빈 칸(흰색)이 쉬고 있던 구간입니다.")
+        ca1, ca2, ca3, ca4 = st.columns([1.2, 1, 1, 1])
+        with ca1:
+            cal_dept = st.selectbox("부서", dept_list, key="cal_dept")
+        with ca2:
+            cal_start = st.date_input("시작일", value=date.today() - timedelta(days=364), key="cal_start")
+        with ca3:
+            cal_end = st.date_input("종료일", value=date.today(), key="cal_end")
+        with ca4:
+            cal_unit = st.selectbox("구간", ["자동"] + list(CALENDAR_UNITS), key="cal_unit")
+        cal_equips = dept_equip_map.get(cal_dept, [])
+
+        if st.button("🗓️ 달력 그리기", use_container_width=True, disabled=not cal_equips or cal_end < cal_start):
+            try:
+                unit = CALENDAR_UNITS.get(cal_unit) or pick_calendar_unit(
+                    cal_start, cal_end, len(cal_equips), get_setting("calendar_max_cells", 6000))
+                with st.spinner(f"{len(cal_equips)}대 장비 일지를 구간별로 묶는 중..."):
+                    cal = usage_calendar(doc, cal_equips, cal_start, cal_end, unit)
+                session_frames().put("usage_calendar", {**cal, "dept": cal_dept})
+            except Exception as e:
+                st.error(f"달력 계산 중 오류 발생: {e}")
+
+        cal = session_frames().get("usage_calendar")
+        if cal:
+            unit_name = {v: k for k, v in CALENDAR_UNITS.items()}[cal["unit"]]
+            st.markdown(f"#### {cal['dept']} · {len(cal['equips'])}대 · "
+                        f"{cal['edges'][0]} ~ {cal['edges'][-1] - 1} ({unit_name} 단위 {len(cal['capacity'])}칸)")
+            metric = st.radio("색으로 볼 값", ["가동률(%)", "사용시간", "유지보수"], horizontal=True, key="cal_metric")
+            show_usage_calendar(cal, metric)
+            idle = pd.DataFrame({"장비명": cal["equips"], "유휴 구간": cal["idle"],
+                                 "평일 있는 구간": int((cal["capacity"] > 0).sum()),
+                                 "사용시간": cal["usage"].sum(axis=1).round(1)}).sort_values("유휴 구간", ascending=False)
+            with st.expander("💤 장비별 유휴 구간", expanded=False):
+                show_paged_records(idle.to_dict("records"), "cal_idle", page_size=20)
+
+    # ===================================
+    # [탭4] 전체 장비 일지 통합 검색
+    # ===================================
+    with tab4:
+        set_sheets_tag("tab4")
+        st.header("🔎 전체 장비 일지 검색")
+        st.caption("기업명 · 제품명 · 세부지원내용 · 사용목적기타에서 찾습니다. (띄어쓰기·대소문자 무시)")
+
+        # 검색은 버튼을 눌렀을 때만 돈다 - 다른 탭 위젯으로 다시 실행될 때마다 색인 확인/검색을 반복하지 않게
+        with st.form("gs_form", border=False):
+            gs1, gs2, gs3, gs4 = st.columns([2, 1, 1.4, 0.6], vertical_alignment="bottom")
+            with gs1:
+                gs_query = st.text_input("검색어", key="gs_query", placeholder="예: 에이비씨, 시제품, 인장시험")
+            with gs2:
+                gs_dept = st.selectbox("부서", ["전체"] + dept_list, key="gs_dept")
+            with gs3:
+                gs_period = st.date_input("사용시작일 기간 (비우면 전체)", value=(), key="gs_period")
+            with gs4:
+                gs_submit = st.form_submit_button("🔍 검색", use_container_width=True)
+
+        if gs_submit and gs_query.strip():
+            scope_depts = dept_list if gs_dept == "전체" else [gs_dept]
+            scope = [e for d in scope_depts for e in dept_equip_map.get(d, [])]
+            try:
+                with st.spinner(f"{len(scope)}대 장비 일지 색인 확인 중..."):
+                    search_index = get_log_search_index(doc, scope)
+                gs_start, gs_end = (gs_period[0], gs_period[1]) if len(gs_period) == 2 else (None, None)
+                t0 = time.perf_counter()
+                found = search_index.search(gs_query, gs_start, gs_end, equips=scope,
+                                            limit=get_setting("search_limit", 1000))
+                session_frames().put("log_search", {
+                    "query": gs_query, "found": found, "elapsed_ms": (time.perf_counter() - t0) * 1000,
+                    "docs": search_index.summary()["docs"]})
+            except Exception as e:
+                st.error(f"검색 중 오류 발생: {e}")
+        elif gs_submit:
+            session_frames().pop("log_search")
+
+        searched = session_frames().get("log_search")
+        if searched:
+            found = searched["found"]
+            st.caption(f"'{searched['query']}' {found['total']:,}건 · {len(found['by_equip'])}대 장비 · "
+                       f"검색 {searched['elapsed_ms']:.1f}ms (색인 {searched['docs']:,}행)")
+            if found["total"]:
+                by_equip = pd.DataFrame(list(found["by_equip"].items()), columns=["장비명", "건수"])
+                col_eq, col_rows = st.columns([1, 3])
+                with col_eq:
+                    show_paged_records(by_equip.to_dict("records"), "gs_equip", page_size=15)
+                with col_rows:
+                    if found["total"] > len(found["rows"]):
+                        st.caption(f"최근 {len(found['rows']):,}건만 표시합니다.")
+                    show_paged_records(found["rows"].to_dict("records"), f"gs_rows:{searched['query']}")
+            else:
+                st.info("검색 결과가 없습니다.")
+
+
+def reset_edit_form(equip, row):
+    """수정 폼을 시트의 최신 값으로 다시 그리도록 기준값/입력값/충돌 상태를 지운다"""
+    session_frames().pop("edit_base")
+    session_frames().pop("edit_conflict")
+    for name in ("e_comp", "e_date", "e_hours", "e_content"):
+        st.session_state.pop(f"{name}_{equip}_{row}", None)
+
+def show_edit_conflict(target_sheet, doc, conflict):
+    """탭2 수정 충돌: 불러온 값 / 지금 시트 값 / 내 수정 을 비교해 병합·덮어쓰기·취소 중 고르게 한다"""
+    row, base, theirs, mine = conflict["row"], conflict["base"], conflict["theirs"], conflict["mine"]
+    moved_to = conflict.get("moved_to")
+    if moved_to or not same_record(base, theirs):
+        # 위쪽 행이 삭제/보관되어 행 번호가 밀렸다 - 지금 그 번호의 행은 다른 기록이므로 병합/덮어쓰기를 막는다
+        if moved_to:
+            where = f"불러온 기록은 지금 {moved_to}번 행에 있습니다."
+        elif theirs is None:
+            where = "이 행은 이미 삭제되었거나 비어 있습니다."
+        else:
+            where = f"지금 {row}번 행은 다른 기록입니다 ({' / '.join(record_key(theirs))})."
+        st.error(f"⚠️ {row}번 행을 불러온 뒤 시트의 행 위치가 바뀌었습니다. {where} "
+                 "새로고침 후 기록을 다시 선택해 입력해주세요. (저장하지 않았습니다)")
+        if st.button("↩️ 닫기", key="conflict_close"):
+            reset_edit_form(conflict["equip"], conflict.get("form_row", row))
+            invalidate_sheet(doc, conflict["equip"])
+            st.rerun()
+        return
+
+    st.warning(f"⚠️ {row}번 행을 불러온 뒤 다른 사용자가 수정했습니다. 아래에서 어떻게 저장할지 골라주세요.")
+    merged, conflicts = merge_row(base, mine, theirs)
+    diff = [{"항목": col, "불러온 값": b, "현재 시트 값": t, "내 수정": m, "병합 결과": g,
+             "충돌": "⚠️" if col in conflicts else ""}
+            for col, b, t, m, g in zip(LOG_COLUMNS, base, theirs, mine, merged)
+            if not (_same_cell(col, b, t) and _same_cell(col, b, m))]
+    st.dataframe(pd.DataFrame(diff), hide_index=True, use_container_width=True)
+    if conflicts:
+        st.caption(f"양쪽이 모두 바꾼 칸({', '.join(conflicts)})은 병합 시 내 수정값이 들어갑니다.")
+
+    def write(values):
+        try:
+            # 지금 본 시트 값(theirs) 기준으로 다시 조건부 쓰기 - 그 사이 또 바뀌면 새 충돌로 다시 묻는다
+            conditional_update_row(target_sheet, row, theirs, values)
+            reset_edit_form(conflict["equip"], conflict.get("form_row", row))
+            invalidate_sheet(doc, conflict["equip"])
+            forget_duplicate_index(doc, conflict["equip"])
+            forget_search_sheet(doc, conflict["equip"])
+            st.success(f"{row}번 행이 수정되었습니다!")
+            st.rerun()
+        except RowConflict as c:
+            session_frames().put("edit_conflict", dict(conflict, theirs=c.current, moved_to=c.moved_to), pinned=True)
+            st.rerun()
+
+    b1, b2, b3 = st.columns(3)
+    with b1:
+        if st.button("🔀 병합해서 저장", key="conflict_merge", type="primary"):
+            write(merged)
+    with b2:
+        if st.button("✍️ 내 수정으로 덮어쓰기", key="conflict_mine"):
+            write(mine)
+    with b3:
+        if st.button("↩️ 취소 (시트 값 유지)", key="conflict_cancel"):
+            reset_edit_form(conflict["equip"], conflict.get("form_row", row))
+            invalidate_sheet(doc, conflict["equip"])
+            st.rerun()
+
 
 # ==========================================
-# 6. 진입점
+# 6. 시작 성능 리포트 (콜드 스타트 측정)
 # ==========================================
-if "logged_in" not in st.session_state:
-    st.session_state["logged_in"] = False
+@st.cache_resource
+def _startup_profile():
+    """프로세스 단위 기록: 최초 스크립트 실행 시각, 모듈 로딩 시간, 페이지별 첫 렌더 시간"""
+    return {
+        "process_first_run": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "script_imports_sec": None,
+        "module_imports_sec": {},
+        "first_render_sec": {},
+        "last_render_sec": {},
+    }
+
+def record_render(page, script_import_sec, render_sec):
+    prof = _startup_profile()
+    if prof["script_imports_sec"] is None:
+        prof["script_imports_sec"] = script_import_sec
+    for name, sec in _IMPORT_TIMES.items():
+        prof["module_imports_sec"].setdefault(name, sec)
+    first = page not in prof["first_render_sec"]
+    if first:
+        prof["first_render_sec"][page] = render_sec
+    prof["last_render_sec"][page] = render_sec
+
+    if first and get_setting("startup_report", False):
+        _LOG.info("[startup] %s 첫 렌더 %.3fs / 스크립트 import %.3fs / 모듈 %s", page, render_sec,
+                  prof["script_imports_sec"],
+                  ", ".join(f"{k} {v:.3f}s" for k, v in prof["module_imports_sec"].items()) or "-")
+
+def show_startup_report():
+    """관리자용 사이드바 리포트"""
+    prof = _startup_profile()
+    with st.sidebar.expander("⏱ 시작 성능 리포트", expanded=False):
+        st.caption(f"프로세스 첫 실행: {prof['process_first_run']}")
+        if prof["script_imports_sec"] is not None:
+            st.write(f"스크립트 import: **{prof['script_imports_sec']*1000:,.0f} ms**")
+        rows = [{"구분": "모듈 로딩", "항목": k, "ms": round(v * 1000, 1)}
+                for k, v in prof["module_imports_sec"].items()]
+        rows += [{"구분": "첫 렌더", "항목": k, "ms": round(v * 1000, 1)}
+                 for k, v in prof["first_render_sec"].items()]
+        rows += [{"구분": "최근 렌더", "항목": k, "ms": round(v * 1000, 1)}
+                 for k, v in prof["last_render_sec"].items()]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
 
-if st.session_state["logged_in"]:
-    main_app()
-else:
-    login_page()
+# ==========================================
+# 7. 진입점
+# ==========================================
+# streamlit run 으로 실행될 때만 화면을 그림 (벤치마크 등에서 import 가능하도록)
+if __name__ == "__main__":
+    _script_import_sec = time.perf_counter() - _SCRIPT_T0
+    init_session_state()
+    begin_rerun_metrics()
+
+    _page = "main_app" if st.session_state["logged_in"] else "login_page"
+    _render_t0 = time.perf_counter()
+    try:
+        if st.session_state["logged_in"]:
+            main_app()
+        else:
+            login_page()
+    finally:
+        record_render(_page, _script_import_sec, time.perf_counter() - _render_t0)
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import streamlit as st
+
+import equipment_cpri_v8 as app
+
+LOG_HEADER = list(app.LOG_COLUMNS)
+MASTER_SHEETS = {
+    "장비목록": [["부서명", "장비명", "장비번호", "장비구분"],
+                 ["소재팀", "SEM-1", "E001", "분석"], ["소재팀", "XRD-2", "E002", "분석"]],
+    "사용자관리": [["아이디", "비밀번호", "이름", "부서"], ["admin", "pw", "관리자", "ALL"]],
+    "기업목록": [["기업명", "사업자번호"], ["(주)에이비씨", "1234567891"], ["대한정밀", "2208162517"]],
+}
+
+
+def log_row(company, start, hours="2", product="볼트", kind="외부", equip="SEM-1", end=None):
+    """일지 한 행 (LOG_COLUMNS 순서)"""
+    row = dict.fromkeys(LOG_HEADER, "")
+    row.update({"사용목적": "시험", "활용유형": kind, "사용기관 기업명": company, "내부부서명": "소재팀",
+                "제품명": product, "장비명": equip, "사용시작일": start, "사용종료일": end or start,
+                "휴무일자포함": "N", "사용시간": hours})
+    return [row[c] for c in LOG_HEADER]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(tmp_path, monkeypatch):
+    """테스트마다 보관 폴더를 새로 쓰고, 프로세스 공용 캐시(리비전 캐시/중복 인덱스 등)를 비운다"""
+    monkeypatch.setenv("CPRI_ARCHIVE_DIR", str(tmp_path / "archive"))
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    yield
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+@pytest.fixture
+def make_doc():
+    """make_doc({시트명: 행 목록}) → 기준 시트가 들어 있는 가짜 스프레드시트"""
+    def make(sheets=None):
+        client = app.FakeClient({**MASTER_SHEETS, **(sheets or {})})
+        return app.open_spreadsheet(client)
+    return make
@@ -0,0 +1,94 @@
+from datetime import date
+
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+# 사용시간 칸에 행마다 다른 값을 넣어 어느 행이 어디로 갔는지 구분한다
+DATES = ["2023-01-10", "2023-05-10", "2026-03-10", "2024-02-10", "2024-02-11", "2026-03-11"]
+OLD = {"1", "2", "4", "5"}
+
+
+@pytest.fixture
+def doc(make_doc):
+    return make_doc({"SEM-1": [LOG_HEADER] + [log_row("대한정밀", d, hours=str(i + 1)) for i, d in enumerate(DATES)]})
+
+
+def sheet_marks(doc):
+    return [r[LOG_HEADER.index("사용시간")] for r in doc.worksheet("SEM-1").get_all_values()[1:]]
+
+
+def archived_marks():
+    return sorted(app.load_archived_logs("SEM-1")["사용시간"].tolist())
+
+
+def test_archive_moves_old_rows(doc):
+    entry = app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1), user="admin")
+    assert entry["rows"] == 4 and "error" not in entry
+    assert sheet_marks(doc) == ["3", "6"]
+    assert archived_marks() == sorted(OLD)
+    months = {(p["year"], p["month"]) for p in app.load_archive_manifest("SEM-1")["partitions"].values()}
+    assert months == {(2023, 1), (2023, 5), (2024, 2)}
+    assert app.read_archive_audit()[0]["rows"] == 4
+    assert len(app.load_archived_logs("SEM-1", date(2024, 1, 1), date(2024, 12, 31))) == 2
+
+
+def test_archive_is_idempotent(doc):
+    app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1))
+    assert app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1)) == {"rows": 0, "files": []}
+    assert archived_marks() == sorted(OLD)
+
+
+def test_sheet_change_during_delete_keeps_rows_in_one_place(doc, monkeypatch):
+    ws = doc.worksheet("SEM-1")
+    delete_rows = ws.delete_rows
+
+    def delete_then_insert(start, end=None):
+        delete_rows(start, end)
+        ws._rows.insert(1, log_row("(주)에이비씨", "2026-04-01", hours="9"))  # 다른 사용자가 위쪽에 행 추가
+
+    with monkeypatch.context() as m, pytest.raises(RuntimeError):
+        m.setattr(ws, "delete_rows", delete_then_insert)
+        app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1))
+
+    on_sheet = set(sheet_marks(doc)) & OLD
+    archived = set(archived_marks())
+    assert archived and on_sheet
+    assert archived | on_sheet == OLD and not archived & on_sheet
+    audit = app.read_archive_audit()[0]
+    assert "error" in audit and audit["rows"] == len(archived)
+
+
+def test_archive_refuses_without_revision(doc, monkeypatch):
+    monkeypatch.setattr(type(doc), "get_lastUpdateTime", lambda self: (_ for _ in ()).throw(OSError("offline")))
+    with pytest.raises(RuntimeError):
+        app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1))
+    assert len(sheet_marks(doc)) == len(DATES)
+    assert app.load_archive_manifest("SEM-1") == {"partitions": {}}
+
+
+def test_archived_rows_stay_visible(doc):
+    app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1))
+    history = app.load_log_history(doc, "SEM-1")  # 전체 다운로드
+    assert sorted(history["사용시간"].tolist()) == sorted(OLD | {"3", "6"})
+    assert (history["행번호"] == 0).sum() == 4
+
+
+def test_archived_rows_are_still_duplicates(doc):
+    app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1))
+    day = "2023-05-10"
+    assert app.check_duplicate_entry(doc, "SEM-1", "대한정밀", day, day, 2.0, "볼트") == ("exact", "보관분 2023-05")
+    assert app.check_duplicate_entry(doc, "SEM-1", "대한정밀", day, day, 7.0, "볼트") == ("near", "보관분 2023-05")
+    assert app.check_duplicate_entry(doc, "SEM-1", "대한정밀", "2026-03-10", "2026-03-10", 3.0, "볼트") == ("exact", 2)
+
+
+def test_archived_rows_are_searchable(doc, monkeypatch):
+    monkeypatch.setenv("CPRI_STALE_MAX_SEC", "0")
+    index = app.get_log_search_index(doc, ["SEM-1"])
+    assert index.search("대한정밀")["total"] == len(DATES)
+    app.archive_log_rows(doc, "SEM-1", date(2025, 1, 1))
+    result = app.get_log_search_index(doc, ["SEM-1"]).search("대한정밀")
+    assert result["total"] == len(DATES)
+    assert sorted(result["rows"]["행번호"].tolist()) == [0, 0, 0, 0, 2, 3]
+    assert app.get_log_search_index(doc, ["SEM-1"]).search("대한정밀", end=date(2023, 12, 31))["total"] == 2
@@ -0,0 +1,45 @@
+import threading
+import time
+
+import equipment_cpri_v8 as app
+from conftest import MASTER_SHEETS
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_client_is_created_lazily_in_the_refresher_thread():
+    made = []
+
+    def make_client():
+        made.append(threading.current_thread().name)
+        return app.FakeClient(MASTER_SHEETS)
+
+    refresher = app.BackgroundRefresher(interval_sec=3600, warm_sheets=["장비목록", "기업목록"],
+                                        warm_equipment=[], top_n=0, state_path="")
+    refresher.start(make_client)
+    assert wait_for(lambda: refresher.stats["cycles"] >= 1)
+    assert made == ["cpri-refresher"]
+    assert refresher.stats["refreshed"] == 2 and refresher.stats["errors"] == 0
+
+
+def test_failed_client_creation_is_logged_and_retried():
+    calls = []
+
+    def make_client():
+        calls.append(1)
+        if len(calls) < 3:
+            raise FileNotFoundError("secrets.json")
+        refresher.interval_sec = 3600  # 성공한 뒤에는 남은 테스트 동안 돌지 않게
+        return app.FakeClient(MASTER_SHEETS)
+
+    refresher = app.BackgroundRefresher(interval_sec=0.01, warm_sheets=["장비목록"], warm_equipment=[], top_n=0,
+                                        state_path="")
+    refresher.start(make_client)
+    assert wait_for(lambda: refresher.stats["refreshed"] >= 1)
+    assert len(calls) == 3 and refresher.stats["errors"] == 2
+    assert "secrets.json" in refresher.stats["last_error"]
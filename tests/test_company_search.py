@@ -0,0 +1,61 @@
+import pytest
+
+import equipment_cpri_v8 as app
+
+COMPANIES = {"대한정밀": "2208162517", "(주)대한소재": "1111111119", "도현산업": "2222222227",
+             "에이비씨": "1234567891", "한국대한기계": "3333333335"}
+
+
+def names(results):
+    return [name for name, _ in results]
+
+
+@pytest.fixture
+def index():
+    return app.CompanySearchIndex(COMPANIES)
+
+
+def test_choseong():
+    assert app.to_choseong("대한정밀") == "ㄷㅎㅈㅁ"
+    assert app.to_choseong("ABC산업") == "ABCㅅㅇ"
+
+
+def test_prefix_then_substring(index):
+    assert names(index.search("대한")) == ["(주)대한소재", "대한정밀", "한국대한기계"]
+    assert index.search("대한정")[0] == ("대한정밀", "2208162517")
+    assert names(index.search("기계")) == ["한국대한기계"]
+    assert index.search("  ") == [] and index.search(None) == []
+
+
+def test_choseong_only_query(index):
+    assert sorted(names(index.search("ㄷㅎ"))) == ["(주)대한소재", "대한정밀", "도현산업"]
+    assert names(index.search("ㄷㅎㅈ")) == ["대한정밀"]
+
+
+def test_mixed_query_keeps_typed_syllables(index):
+    assert names(index.search("대ㅎ")) == ["(주)대한소재", "대한정밀"]  # 도현산업은 '대'가 아니므로 제외
+    assert names(index.search("대한ㅈ")) == ["대한정밀"]
+    assert names(index.search("도ㅎ")) == ["도현산업"]
+
+
+def test_limit(index):
+    assert len(index.search("ㄷ", limit=2)) == 2
+
+
+def test_index_is_rebuilt_when_company_list_is_reloaded(make_doc, monkeypatch):
+    monkeypatch.setenv("CPRI_REVISION_PROBE_SEC", "0")
+    monkeypatch.setenv("CPRI_STALE_MAX_SEC", "0")
+    doc = make_doc()
+    client = app.FakeClient()
+    client._docs[doc.title] = doc
+
+    comp_db = app.get_master_data(client)[2]
+    first = app.company_index_for(doc, comp_db)
+    assert app.company_index_for(doc, app.get_master_data(client)[2]) is first  # 그대로면 재사용
+
+    doc.worksheet("기업목록").append_rows([["대한신소재", "4444444443"]])
+    comp_db = app.get_master_data(client)[2]
+    second = app.company_index_for(doc, comp_db)
+    assert second is not first
+    assert names(second.search("ㄷㅎㅅ")) == ["대한신소재"]
+    assert names(first.search("ㄷㅎㅅ")) == []
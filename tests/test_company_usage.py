@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, MASTER_SHEETS, log_row
+
+
+def row(company, start, hours, fee, samples="1", biz="", kind="외부", equip="SEM-1"):
+    values = dict(zip(LOG_HEADER, log_row(company, start, hours=hours, kind=kind, equip=equip)))
+    values.update({"사용료": fee, "시료수/시험수": samples, "사용기관 사업자등록번호": biz})
+    return [values[c] for c in LOG_HEADER]
+
+
+SHEETS = {
+    "SEM-1": [LOG_HEADER,
+              row("대한정밀", "2026-03-02", "2", "10,000", "3", biz="220-81-62517"),
+              row("(주)대한정밀", "2026-03-05", "1.5", "5000", biz="2208162517"),
+              row("에이비씨", "2026-03-03", "4", "1000", kind="내부"),
+              row("", "2026-03-04", "1", "500"),
+              row("대한정밀", "2026-04-10", "9", "90000")],  # 기간 밖
+    "XRD-2": [LOG_HEADER,
+              row("대한 정밀", "2026-03-20", "3", "20000", "2", equip="XRD-2"),
+              row("한빛", "2026-03-21", "1", "1000", biz="", equip="XRD-2")],
+}
+MARCH = (date(2026, 3, 1), date(2026, 3, 31))
+
+
+@pytest.fixture
+def client():
+    return app.FakeClient({**MASTER_SHEETS, **SHEETS})
+
+
+@pytest.fixture
+def doc(client):
+    return app.open_spreadsheet(client)
+
+
+def usage(doc, **kwargs):
+    out, skipped = app.company_usage(doc, ["SEM-1", "XRD-2"], *MARCH, **kwargs)
+    return out.set_index("기업"), skipped
+
+
+def test_groups_by_normalized_name_across_equipment(doc):
+    out, skipped = usage(doc)
+    assert skipped == 1  # 기업명이 빈 행
+    daehan = out.loc[out.index.str.contains("대한")].iloc[0]
+    assert daehan["이용건수"] == 3
+    assert daehan["이용시간"] == pytest.approx(6.5)
+    assert daehan["사용료"] == 35000
+    assert daehan["시료수"] == 6
+    assert daehan["장비수"] == 2 and daehan["이용 장비"] == "SEM-1, XRD-2"
+    assert daehan["최근 이용일"] == "2026-03-20"
+    assert daehan["사업자등록번호"] == "2208162517"
+    assert out["사용료"].tolist() == sorted(out["사용료"], reverse=True)
+
+
+def test_usage_type_filter(doc):
+    out, _ = usage(doc, usage_types=["내부"])
+    assert out.index.tolist() == ["에이비씨"] and out["이용시간"].tolist() == [4]
+
+
+def test_group_by_biz_number_falls_back_to_name(doc):
+    out, _ = usage(doc, by="biz")
+    assert out["이용건수"].sum() == 5
+    # 사업자번호가 있는 두 행만 묶이고, 번호 없는 '대한 정밀' 행은 이름으로 따로 남는다
+    assert sorted(out.loc[out.index.str.contains("대한"), "이용건수"].tolist()) == [1, 2]
+
+
+def test_registered_name_is_shown(doc, client):
+    comp_norm_db = app.get_master_data(client)[3]
+    out, _ = usage(doc, comp_norm_db=comp_norm_db)
+    assert "대한정밀" in out.index
+
+
+def test_empty_period(doc):
+    out, skipped = app.company_usage(doc, ["SEM-1"], date(2025, 1, 1), date(2025, 1, 31))
+    assert out.empty and skipped == 0
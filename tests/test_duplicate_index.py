@@ -0,0 +1,66 @@
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+
+@pytest.fixture
+def doc(make_doc):
+    return make_doc({"SEM-1": [LOG_HEADER,
+                               log_row("(주)에이비씨", "2026-03-02"),
+                               log_row("대한정밀", "2026-03-03", product="너트"),
+                               log_row("(주)에이비씨", "2026-03-04", hours="3")]})
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    """duplicate_keys 에 넘어간 행 수 (색인한 행 수) 기록"""
+    sizes = []
+    duplicate_keys = app.duplicate_keys
+
+    def spy(company, *args):
+        sizes.append(len(company))
+        return duplicate_keys(company, *args)
+    monkeypatch.setattr(app, "duplicate_keys", spy)
+    return sizes
+
+
+def lookup(doc, company, day, hours=2.0, product="볼트"):
+    return app.check_duplicate_entry(doc, "SEM-1", company, day, day, hours, product)
+
+
+def test_finds_exact_and_near_duplicates(doc):
+    assert lookup(doc, "(주)에이비씨", "2026-03-02") == ("exact", 2)
+    assert lookup(doc, "대한정밀", "2026-03-03", hours=5.0) == ("near", 3)
+    assert lookup(doc, "대한정밀", "2026-03-05") == ("", None)
+
+
+def test_app_append_extends_index(doc, indexed):
+    app.get_duplicate_index(doc, "SEM-1")
+    doc.worksheet("SEM-1").append_rows([log_row("대한정밀", "2026-03-05"), log_row("대한정밀", "2026-03-06")])
+    app.note_log_append(doc, "SEM-1", 2)
+    app.invalidate_sheet(doc, "SEM-1")
+    assert lookup(doc, "대한정밀", "2026-03-06") == ("exact", 6)
+    assert lookup(doc, "(주)에이비씨", "2026-03-02") == ("exact", 2)
+    assert indexed == [3, 1, 2, 1]  # 처음 3행 색인 → (조회 키 1행) → 새 2행만 색인 → (조회 키 1행)
+
+
+def test_edit_elsewhere_rebuilds_index(doc, indexed):
+    app.get_duplicate_index(doc, "SEM-1")
+    ws = doc.worksheet("SEM-1")
+    ws.update(range_name="A2:U2", values=[log_row("(주)에이비씨", "2026-02-27")])
+    app.invalidate_sheet(doc, "SEM-1")
+    assert lookup(doc, "(주)에이비씨", "2026-03-02") == ("", None)
+    assert lookup(doc, "(주)에이비씨", "2026-02-27") == ("exact", 2)
+    assert indexed == [3, 1, 3, 1]  # 리비전이 바뀌고 추가 기록이 없으므로 3행 전부 다시 색인
+
+
+def test_unnoted_delete_and_append_rebuilds_index(doc, indexed):
+    app.get_duplicate_index(doc, "SEM-1")
+    ws = doc.worksheet("SEM-1")
+    ws.delete_rows(2)  # 다른 사용자가 중간 행 삭제 + 추가 → 행 수는 그대로
+    ws.append_rows([log_row("대한정밀", "2026-03-09")])
+    app.invalidate_sheet(doc, "SEM-1")
+    assert lookup(doc, "대한정밀", "2026-03-03", product="너트") == ("exact", 2)
+    assert lookup(doc, "대한정밀", "2026-03-09") == ("exact", 4)
+    assert lookup(doc, "(주)에이비씨", "2026-03-02") == ("", None)
@@ -0,0 +1,52 @@
+from datetime import date
+
+import numpy as np
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+MAINT_HEADER = ["장비명"] + app.MAINTENANCE_COLUMNS
+
+
+def fleet_doc(make_doc):
+    return make_doc({
+        "SEM-1": [LOG_HEADER,
+                  log_row("대한정밀", "2025-01-06", hours="2"),
+                  log_row("대한정밀", "2025-01-20", hours="1:30", kind="내부"),
+                  log_row("대한정밀", "2025-02-03", hours="4"),
+                  log_row("대한정밀", "2025-02-04", hours="5", kind="간접지원"),  # 내부/외부만 센다
+                  log_row("대한정밀", "2024-12-30", hours="7")],  # 기간 밖
+        "XRD-2": [LOG_HEADER, log_row("(주)에이비씨", "2025-03-03", hours="3")],
+        "유지보수기록": [MAINT_HEADER,
+                         ["SEM-1", "2025-01-07", "2025-01-07", "2", "점검"],
+                         ["XRD-2", "2025-03-10", "2025-03-10", "1", "교체"]],
+        "XRD-2_유지보수": [app.MAINTENANCE_COLUMNS, ["2025-02-10", "2025-02-10", "6", "구 시트"]],
+    })
+
+
+def test_bin_fleet_hours(make_doc):
+    doc = fleet_doc(make_doc)
+    edges = np.array(["2025-01-01", "2025-02-01", "2025-03-01", "2025-04-01"], dtype="datetime64[D]")
+    usage, maint = app.bin_fleet_hours(doc, ["SEM-1", "XRD-2"], edges)
+    np.testing.assert_allclose(usage, [[3.5, 4, 0], [0, 0, 3]])
+    np.testing.assert_allclose(maint, [[2, 0, 0], [0, 6, 1]])
+
+
+def test_usage_calendar_matches_fleet_totals(make_doc):
+    doc = fleet_doc(make_doc)
+    cal = app.usage_calendar(doc, ["SEM-1", "XRD-2"], date(2025, 1, 1), date(2025, 3, 31), "W")
+    assert cal["usage"].sum(axis=1).tolist() == [7.5, 3.0]
+    assert cal["maint"].sum(axis=1).tolist() == [2.0, 7.0]
+    assert (cal["rate"] >= 0).all()
+
+
+def test_calendar_segments_merge_adjacent_bins():
+    edges = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-01-06"))
+    cal = {"equips": ["SEM-1", "XRD-2"], "edges": edges,
+           "usage": np.array([[1.0, 2.0, 0.0, 3.0], [0.0, 0.0, 0.0, 0.0]]),
+           "maint": np.array([[0.0, 0.0, 0.0, 0.0], [0.0, 4.0, 4.0, 4.0]])}
+    seg = app.calendar_segments(cal)
+    assert seg[["장비명", "구분", "시간"]].values.tolist() == [
+        ["SEM-1", "사용", 3.0], ["SEM-1", "사용", 3.0], ["XRD-2", "유지보수", 12.0]]
+    assert seg["시작"].tolist() == [edges[0], edges[3], edges[1]]
+    assert seg["끝"].tolist() == [edges[2], edges[4], edges[4]]
@@ -0,0 +1,54 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+MAINT_HEADER = ["장비명"] + app.MAINTENANCE_COLUMNS
+
+
+def test_parse_dates_reads_every_sheet_format():
+    values = ["2026-03-02", "2026.03.02", "2026/3/2", "2026-3-2 09:00", "2026-03-02 00:00:00", "", "3월", "2026-13-40"]
+    out = app.parse_dates(pd.Series(values, index=range(10, 18)))
+    assert out.index.tolist() == list(range(10, 18))
+    assert out[:5].tolist() == [pd.Timestamp("2026-03-02")] * 5
+    assert out[5:].isna().all()
+
+
+@pytest.fixture
+def doc(make_doc):
+    return make_doc({
+        "SEM-1": [LOG_HEADER, log_row("대한정밀", "2026-1-5", hours="2"), log_row("대한정밀", "2026.02.02", hours="3")],
+        "XRD-2": [LOG_HEADER, log_row("(주)에이비씨", "2026-03-03", hours="4")],
+        app.MAINTENANCE_SHEET: [MAINT_HEADER, ["SEM-1", "2026-1-6", "2026-1-6", "2", "점검"]],
+        "XRD-2_유지보수": [app.MAINTENANCE_COLUMNS, ["2026/2/9", "2026/2/9", "6", "구 시트"],
+                           ["2025-12-01", "2025-12-01", "9", "기간 밖"]],
+    })
+
+
+def test_maintenance_totals_include_unmigrated_sheets(doc):
+    totals = app.maintenance_totals(doc, date(2026, 1, 1), date(2026, 12, 31), ["SEM-1", "XRD-2"])
+    assert totals.to_dict("index") == {"SEM-1": {"유지보수시간": 2.0, "건수": 1}, "XRD-2": {"유지보수시간": 6.0, "건수": 1}}
+    assert app.maintenance_totals(doc, date(2026, 1, 1), date(2026, 12, 31), ["SEM-1"]).index.tolist() == ["SEM-1"]
+
+
+def test_totals_unchanged_by_migration(doc):
+    before = app.maintenance_totals(doc, date(2026, 1, 1), date(2026, 12, 31))
+    app.migrate_legacy_maintenance(doc, ["SEM-1", "XRD-2"])
+    assert app.maintenance_totals(doc, date(2026, 1, 1), date(2026, 12, 31)).equals(before)
+
+
+def test_fleet_usage_matches_per_equipment_utilization(doc):
+    client = app.FakeClient()
+    client._docs[doc.title] = doc
+    names = ["SEM-1", "XRD-2"]
+    usage, maint = app.collect_fleet_usage(doc, names, 2026, date(2026, 6, 30))
+    assert usage.tolist() == [5.0, 4.0] and maint.tolist() == [2.0, 6.0]
+    for i, equip in enumerate(names):
+        log = app.load_log_history(doc, equip, date(2026, 1, 1), date(2026, 6, 30), app.UTILIZATION_COLUMNS)
+        calc = app.compute_utilization(log, app.load_maintenance_data(client, equip), date(2026, 1, 1), date(2026, 6, 30))
+        assert calc["actual_usage"] == usage[i] and calc["maintenance"] == maint[i]
+    assert np.all(app.maintenance_totals(doc, date(2026, 1, 1), date(2026, 6, 30))["유지보수시간"].to_numpy() == maint)
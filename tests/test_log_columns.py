@@ -0,0 +1,32 @@
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, MASTER_SHEETS, log_row
+
+
+def test_column_ranges_merge_near_columns():
+    assert app.column_ranges(app.UTILIZATION_COLUMNS) == ["B2:B", "P2:S"]
+    assert app.column_ranges(["사용시간", "사용시작일"]) == ["P2:P", "S2:S"]  # 두 열 떨어지면 따로
+    assert app.column_ranges(["사용기관 기업명", "제품명"], max_gap=5) == ["C2:I"]
+
+
+def test_column_ranges_skip_long_text_gap():
+    # 세부지원공개여부(K)와 장비명(M) 사이의 세부지원내용(L)은 끼워 받지 않는다
+    assert app.column_ranges(["세부지원공개여부", "장비명"]) == ["K2:K", "M2:M"]
+    assert app.column_ranges(app.LOG_LIST_COLUMNS) == ["A2:K", "M2:U"]
+
+
+def test_loader_matches_full_read_for_ragged_rows():
+    short = log_row("대한정밀", "2026-03-03")[:16]  # 뒤쪽 빈 칸이 잘린 행
+    sheet = app.FakeClient({**MASTER_SHEETS, "SEM-1": [LOG_HEADER, log_row("에이비씨", "2026-03-02"), short]}) \
+        .open("장비관리시스템").worksheet("SEM-1")
+    full = app.load_log_data(sheet)
+    part = app.log_column_loader(app.UTILIZATION_COLUMNS)(sheet)
+    assert part.columns.tolist() == ["행번호"] + app.UTILIZATION_COLUMNS
+    assert part.values.tolist() == full[part.columns].values.tolist()
+    assert part["사용종료일"].tolist() == ["2026-03-02", ""]
+
+
+def test_loader_is_shared_per_column_set():
+    loader = app.log_column_loader(["사용시간", "활용유형", "사용시작일", "사용종료일"])
+    assert loader is app.log_column_loader(app.UTILIZATION_COLUMNS)
+    assert loader.__name__ == "load_log_columns[B2:B,P2:S]"
+    assert app.log_column_loader(["사용시간"]).__name__ != loader.__name__
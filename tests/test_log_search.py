@@ -0,0 +1,67 @@
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+
+@pytest.fixture
+def doc(make_doc, monkeypatch):
+    monkeypatch.setenv("CPRI_REVISION_PROBE_SEC", "0")  # 다른 사용자의 수정이 바로 보이게
+    monkeypatch.setenv("CPRI_STALE_MAX_SEC", "0")  # 옛 값을 먼저 보여주지 않고 바로 새로 받는다
+    return make_doc({
+        "SEM-1": [LOG_HEADER,
+                  log_row("(주)에이비씨", "2026-03-02", product="볼트"),
+                  log_row("대한정밀", "2026-03-03", product="티타늄 너트"),
+                  log_row("(주)에이비씨", "2026-03-04", product="와셔")],
+        "XRD-2": [LOG_HEADER, log_row("대한정밀", "2026-03-05", product="분말", equip="XRD-2")],
+    })
+
+
+def search(doc, query, **kwargs):
+    return app.get_log_search_index(doc, ["SEM-1", "XRD-2"]).search(query, **kwargs)
+
+
+def test_search_across_equipment(doc):
+    result = search(doc, "대한 정밀")
+    assert result["total"] == 2
+    assert result["by_equip"] == {"SEM-1": 1, "XRD-2": 1}
+    assert result["rows"]["장비명"].tolist() == ["XRD-2", "SEM-1"]  # 사용시작일 최근 순
+    assert search(doc, "티타늄")["rows"]["행번호"].tolist() == [3]
+    assert search(doc, "너")["total"] == 1
+
+
+def test_edit_of_middle_row_is_reindexed(doc):
+    search(doc, "너트")
+    doc.worksheet("SEM-1").update(range_name="A3:U3", values=[log_row("대한정밀", "2026-03-03", product="스프링")])
+    assert search(doc, "스프링")["rows"]["행번호"].tolist() == [3]
+    assert search(doc, "티타늄 너트")["total"] == 0
+    assert search(doc, "너")["total"] == 0  # 1~2 글자 검색은 포스팅만 보므로 옛 글자가 남아 있으면 걸린다
+    assert search(doc, "티")["total"] == 0
+
+
+def test_delete_of_middle_row_is_reindexed(doc):
+    search(doc, "와셔")
+    doc.worksheet("SEM-1").delete_rows(3)
+    assert search(doc, "와셔")["rows"]["행번호"].tolist() == [3]
+    assert search(doc, "너트")["total"] == 0
+
+
+def test_app_append_extends_without_reindexing(doc):
+    index = app.get_log_search_index(doc, ["SEM-1", "XRD-2"])
+    doc.worksheet("SEM-1").append_rows([log_row("대한정밀", "2026-03-09", product="베어링")])
+    app.note_log_append(doc, "SEM-1", 1)
+    assert search(doc, "베어링")["rows"]["행번호"].tolist() == [5]
+    assert index.dead == 0 and index.summary()["docs"] == 5
+
+
+def test_unrelated_write_keeps_index(doc):
+    index = app.get_log_search_index(doc, ["SEM-1", "XRD-2"])
+    doc.worksheet("XRD-2").append_rows([log_row("대한정밀", "2026-03-10", product="필터", equip="XRD-2")])
+    assert search(doc, "필터")["total"] == 1
+    assert index.dead == 1  # XRD-2 만 다시 색인, SEM-1 은 내용이 같아 그대로
+
+
+def test_date_and_equipment_filters(doc):
+    from datetime import date
+    assert search(doc, "대한정밀", start=date(2026, 3, 4))["by_equip"] == {"XRD-2": 1}
+    assert search(doc, "대한정밀", equips=["SEM-1"])["by_equip"] == {"SEM-1": 1}
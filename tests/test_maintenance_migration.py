@@ -0,0 +1,46 @@
+import equipment_cpri_v8 as app
+
+LEGACY = [app.MAINTENANCE_COLUMNS,
+          ["2026-01-05", "2026-01-05", "4", "정기점검"],
+          ["2026-02-10", "2026-02-11", "8", "부품교체"],
+          ["2026-02-10", "2026-02-11", "8", "부품교체"],  # 같은 날 같은 작업 두 건도 그대로 옮긴다
+          ["", "", "", ""]]
+
+
+def unified(doc):
+    return doc.worksheet(app.MAINTENANCE_SHEET).get_all_values()[1:]
+
+
+def test_maintenance_key_ignores_hours_and_padding():
+    assert app._maintenance_key(" SEM-1", ["2026-01-05 ", "2026-01-05", "4", "정기점검"]) == \
+        app._maintenance_key("SEM-1", ["2026-01-05", "2026-01-05", "3"] + ["정기점검"])
+    assert app._maintenance_key("SEM-1", ["2026-01-05"]) == ("SEM-1", "2026-01-05", "", "")
+
+
+def test_running_twice_moves_rows_once(make_doc):
+    doc = make_doc({"SEM-1_유지보수": LEGACY})
+    assert app.migrate_legacy_maintenance(doc, ["SEM-1", "XRD-2"]) == {"SEM-1": 3}
+    assert app.migrate_legacy_maintenance(doc, ["SEM-1", "XRD-2"]) == {}
+    assert len(unified(doc)) == 3
+    titles = [ws.title for ws in doc.worksheets()]
+    assert "SEM-1_유지보수(이관됨)" in titles and "SEM-1_유지보수" not in titles
+
+
+def test_rerun_after_interrupted_rename_adds_no_duplicates(make_doc):
+    doc = make_doc({"SEM-1_유지보수": LEGACY})
+    app.migrate_legacy_maintenance(doc, ["SEM-1"])
+    doc.worksheet("SEM-1_유지보수(이관됨)").update_title("SEM-1_유지보수")  # 이름 바꾸기 전에 멈춘 상황
+    app.get_worksheet_registry().forget(doc)
+
+    assert app.migrate_legacy_maintenance(doc, ["SEM-1"]) == {"SEM-1": 0}
+    rows = unified(doc)
+    assert len(rows) == 3
+    assert rows.count(["SEM-1", "2026-02-10", "2026-02-11", "8", "부품교체"]) == 2
+
+
+def test_only_missing_rows_are_added(make_doc):
+    doc = make_doc({"SEM-1_유지보수": LEGACY,
+                    app.MAINTENANCE_SHEET: [app.MAINTENANCE_SHEET_COLUMNS,
+                                            ["SEM-1", "2026-02-10", "2026-02-11", "8", "부품교체"]]})
+    assert app.migrate_legacy_maintenance(doc, ["SEM-1"]) == {"SEM-1": 2}
+    assert len(unified(doc)) == 3
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+import equipment_cpri_v8 as app
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, sec):
+        self.now += sec
+
+
+LIMITS = {"read": (2, 1.0), "write": (1, 0.5)}  # 읽기 2개 + 초당 1개, 쓰기 1개 + 2초에 1개
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(clock):
+        if request.param == "memory":
+            return app.MemoryBucketStore(LIMITS, clock=clock)
+        return app.SqliteBucketStore(LIMITS, str(tmp_path / "buckets.sqlite"), clock=clock)
+    return make
+
+
+def test_tokens_refill_at_the_configured_rate(make_store):
+    clock = FakeClock()
+    store = make_store(clock)
+    assert store.try_take("read", 1) == 0 and store.try_take("read", 1) == 0
+    assert store.try_take("read", 1) == pytest.approx(1.0)
+    clock.advance(0.5)
+    assert store.try_take("read", 1) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert store.try_take("read", 1) == 0
+    clock.advance(3600)
+    assert store.tokens("read") == pytest.approx(2)  # 최대치까지만 찬다
+    assert store.try_take("read", 2) == 0  # 시트 열기(open)처럼 비용 2
+
+
+def test_read_and_write_buckets_are_separate(make_store):
+    clock = FakeClock()
+    store = make_store(clock)
+    assert store.try_take("write", 1) == 0
+    assert store.try_take("write", 1) == pytest.approx(2.0)
+    assert store.try_take("read", 1) == 0
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "buckets.sqlite")
+    a = app.SqliteBucketStore(LIMITS, path, clock=clock)
+    assert a.try_take("read", 2) == 0
+    b = app.SqliteBucketStore(LIMITS, path, clock=clock)  # 나중에 뜬 프로세스가 버킷을 다시 채우지 않는다
+    assert b.tokens("read") == 0
+    assert b.try_take("read", 1) == pytest.approx(1.0)
+    clock.advance(1.0)
+    assert b.try_take("read", 1) == 0
+    assert a.try_take("read", 1) == pytest.approx(1.0)
+
+
+def test_interactive_calls_go_before_queued_background_calls():
+    clock = FakeClock()
+    store = app.MemoryBucketStore(LIMITS, clock=clock)
+    limiter = app.SheetsRateLimiter(store, timeout_sec=30)
+    limiter.acquire("read")
+    limiter.acquire("read")  # 버킷이 비었고, 시계를 돌리기 전에는 차지 않는다
+    order = []
+
+    def call(priority):
+        limiter.acquire("read", priority)
+        order.append(priority)
+
+    def wait_queued(n):
+        deadline = time.monotonic() + 5
+        while limiter.status()["read"]["queued"] < n and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert limiter.status()["read"]["queued"] == n
+
+    threads = [threading.Thread(target=call, args=("background",)), threading.Thread(target=call, args=("bulk",)),
+               threading.Thread(target=call, args=("interactive",))]
+    for n, t in enumerate(threads, start=1):
+        t.start()
+        wait_queued(n)  # 도착 순서: background → bulk → interactive
+    for n in (2, 1, 0):
+        clock.advance(1.0)  # 토큰 하나씩
+        deadline = time.monotonic() + 5
+        while limiter.status()["read"]["queued"] > n and time.monotonic() < deadline:
+            time.sleep(0.01)
+    for t in threads:
+        t.join(5)
+    assert order == ["interactive", "bulk", "background"]
+    assert limiter.waited["read"] == 3
+
+
+def test_waiting_past_the_timeout_raises_and_leaves_the_queue():
+    clock = FakeClock()
+    limiter = app.SheetsRateLimiter(app.MemoryBucketStore(LIMITS, clock=clock), timeout_sec=0.1)
+    limiter.acquire("write")
+    with pytest.raises(app.SheetsRateLimitTimeout):
+        limiter.acquire("write")
+    assert limiter.status()["write"]["queued"] == 0
@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, MASTER_SHEETS, log_row
+from test_rate_limiter import FakeClock
+
+VALUE = {"utilization": 0.5}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_memory_entry_expires_after_max_age(clock):
+    cache = app.ResultsCache(8, max_age_sec=60, clock=clock)
+    cache.put("k", VALUE)
+    clock.advance(59)
+    assert cache.get("k") == VALUE
+    clock.advance(2)
+    assert cache.get("k") is None
+    assert cache.stats == {"memory": 1, "disk": 0, "miss": 1}
+
+
+def test_disk_entry_is_shared_and_expires(tmp_path, clock):
+    path = str(tmp_path / "results.sqlite")
+    app.ResultsCache(8, path, max_age_sec=60, clock=clock).put("k", VALUE)
+    other = app.ResultsCache(8, path, max_age_sec=60, clock=clock)  # 다른 프로세스
+    assert other.get("k") == VALUE and other.stats["disk"] == 1
+    clock.advance(61)
+    assert app.ResultsCache(8, path, max_age_sec=60, clock=clock).get("k") is None
+
+
+def test_volatile_entry_stays_in_memory_briefly(tmp_path, clock):
+    path = str(tmp_path / "results.sqlite")
+    cache = app.ResultsCache(8, path, max_age_sec=600, volatile_sec=30, clock=clock)
+    cache.put("k", VALUE, persist=False)
+    assert cache.get("k") == VALUE
+    assert app.ResultsCache(8, path, clock=clock).get("k") is None  # 디스크에는 없다
+    clock.advance(31)
+    assert cache.get("k") is None
+
+
+def test_lru_eviction(clock):
+    cache = app.ResultsCache(2, clock=clock)
+    cache.put("a", VALUE)
+    cache.put("b", VALUE)
+    cache.get("a")
+    cache.put("c", VALUE)
+    assert cache.get("b") is None and cache.get("a") == VALUE
+
+
+@pytest.fixture
+def doc_and_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("CPRI_RESULTS_CACHE_DB", str(tmp_path / "results.sqlite"))
+    monkeypatch.setenv("CPRI_REVISION_PROBE_SEC", "0")
+    monkeypatch.setenv("CPRI_STALE_MAX_SEC", "0")
+    client = app.FakeClient({**MASTER_SHEETS, "SEM-1": [LOG_HEADER, log_row("대한정밀", "2026-03-02", hours="4")]})
+    return app.open_spreadsheet(client), client
+
+
+def test_cached_utilization_hits_until_revision_changes(doc_and_client):
+    doc, client = doc_and_client
+    start, end = date(2026, 3, 1), date(2026, 3, 31)
+    first, hit = app.cached_utilization(doc, client, "SEM-1", start, end)
+    assert not hit and first["external"] == 4
+    assert app.cached_utilization(doc, client, "SEM-1", start, end)[1]
+
+    key, durable = app.utilization_cache_key(doc, "SEM-1", start, end)
+    assert durable
+    doc.worksheet("SEM-1").append_rows([log_row("대한정밀", "2026-03-03", hours="2")])
+    assert app.utilization_cache_key(doc, "SEM-1", start, end)[0] != key
+    second, hit = app.cached_utilization(doc, client, "SEM-1", start, end)
+    assert not hit and second["external"] == 6
+
+
+def test_key_depends_on_period(doc_and_client):
+    doc, _ = doc_and_client
+    march = app.utilization_cache_key(doc, "SEM-1", date(2026, 3, 1), date(2026, 3, 31))[0]
+    april = app.utilization_cache_key(doc, "SEM-1", date(2026, 4, 1), date(2026, 4, 30))[0]
+    assert march != april
@@ -0,0 +1,83 @@
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+
+@pytest.fixture
+def doc(make_doc, monkeypatch):
+    monkeypatch.setenv("CPRI_REVISION_PROBE_SEC", "0")  # 매번 리비전 확인 (bump_revision 이 바로 보이게)
+    return make_doc({"SEM-1": [LOG_HEADER, log_row("대한정밀", "2026-03-02")]})
+
+
+def counting_loader(name):
+    """호출 횟수를 세는 로더. 캐시 키가 로더 이름이므로 이름을 따로 붙인다"""
+    def loader(sheet):
+        loader.calls += 1
+        return app.load_log_data(sheet)
+    loader.calls = 0
+    loader.__name__ = name
+    return loader
+
+
+def test_same_revision_is_a_hit(doc):
+    loader = counting_loader("count_a")
+    first = app.read_sheet_cached(doc, "SEM-1", loader)
+    assert app.read_sheet_cached(doc, "SEM-1", loader) is first
+    assert loader.calls == 1
+    assert app.get_revision_cache().stats["hit"] == 1
+
+
+def test_bumped_revision_is_a_miss(doc):
+    loader = counting_loader("count_b")
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    doc.bump_revision()
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    assert loader.calls == 2
+
+
+def test_write_through_fake_sheet_is_seen(doc):
+    loader = counting_loader("count_c")
+    assert len(app.read_sheet_cached(doc, "SEM-1", loader)) == 1
+    doc.worksheet("SEM-1").append_rows([log_row("대한정밀", "2026-03-03")])
+    assert len(app.read_sheet_cached(doc, "SEM-1", loader)) == 2
+
+
+@pytest.fixture
+def no_max_age(monkeypatch):
+    monkeypatch.setenv("CPRI_REVISION_MAX_AGE_SEC", "0")  # doc 보다 먼저 - 리비전 캐시가 만들어질 때 읽는다
+
+
+def test_entry_expires_after_max_age(no_max_age, doc):
+    loader = counting_loader("count_d")
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    assert loader.calls == 2
+
+
+def test_loaders_are_cached_separately(doc):
+    full, narrow = counting_loader("count_full"), counting_loader("count_narrow")
+    app.read_sheet_cached(doc, "SEM-1", full)
+    app.read_sheet_cached(doc, "SEM-1", narrow)
+    app.read_sheet_cached(doc, "SEM-1", full)
+    app.read_sheet_cached(doc, "SEM-1", narrow)
+    assert (full.calls, narrow.calls) == (1, 1)
+    assert app.read_sheet_cached(doc, "SEM-1", app.load_log_list).columns.tolist() == ["행번호"] + app.LOG_LIST_COLUMNS
+
+
+def test_fallback_revision_without_drive(doc, monkeypatch):
+    monkeypatch.setattr(type(doc), "get_lastUpdateTime", lambda self: (_ for _ in ()).throw(OSError("offline")))
+    loader = counting_loader("count_e")
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    assert loader.calls == 1
+    doc.worksheet("SEM-1").append_rows([log_row("대한정밀", "2026-03-03")])
+    assert len(app.read_sheet_cached(doc, "SEM-1", loader)) == 2
+
+
+def test_invalidate_forces_refetch(doc):
+    loader = counting_loader("count_f")
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    app.invalidate_sheet(doc, "SEM-1")
+    app.read_sheet_cached(doc, "SEM-1", loader)
+    assert loader.calls == 2
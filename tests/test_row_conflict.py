@@ -0,0 +1,66 @@
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+
+@pytest.fixture
+def sheet(make_doc):
+    doc = make_doc({"SEM-1": [LOG_HEADER,
+                              log_row("(주)에이비씨", "2026-03-02"),
+                              log_row("대한정밀", "2026-03-03", product="너트"),
+                              log_row("(주)에이비씨", "2026-03-04", hours="3")]})
+    return doc.worksheet("SEM-1")
+
+
+def edited(values, **changes):
+    row = dict(zip(LOG_HEADER, values))
+    row.update(changes)
+    return [row[c] for c in LOG_HEADER]
+
+
+def test_update_when_row_unchanged(sheet):
+    base = app.read_log_row(sheet, 3)
+    app.conditional_update_row(sheet, 3, base, edited(base, 제품명="와셔"))
+    assert app.read_log_row(sheet, 3) == edited(base, 제품명="와셔")
+
+
+def test_concurrent_edit_of_same_record_is_merged(sheet):
+    base = app.read_log_row(sheet, 3)
+    sheet.update(range_name="A3:U3", values=[edited(base, 사용시간="4")])
+    mine = edited(base, 제품명="와셔")
+    with pytest.raises(app.RowConflict) as err:
+        app.conditional_update_row(sheet, 3, base, mine)
+    assert err.value.moved_to is None
+    assert app.same_record(base, err.value.current)
+    merged, conflicts = app.merge_row(base, mine, err.value.current)
+    assert merged == edited(base, 제품명="와셔", 사용시간="4")
+    assert conflicts == []
+
+
+def test_both_sides_changing_a_cell_is_reported(sheet):
+    base = app.read_log_row(sheet, 3)
+    theirs = edited(base, 제품명="볼트2")
+    merged, conflicts = app.merge_row(base, edited(base, 제품명="와셔"), theirs)
+    assert merged[LOG_HEADER.index("제품명")] == "와셔"
+    assert conflicts == ["제품명"]
+
+
+def test_row_shift_is_not_merged_into_another_record(sheet):
+    base = app.read_log_row(sheet, 3)
+    sheet.delete_rows(2)  # 위쪽 행이 지워져 불러온 기록이 2행으로 올라감
+    with pytest.raises(app.RowConflict) as err:
+        app.conditional_update_row(sheet, 3, base, edited(base, 제품명="와셔"))
+    assert err.value.moved_to == 2
+    assert not app.same_record(base, err.value.current)
+    with pytest.raises(ValueError):
+        app.merge_row(base, edited(base, 제품명="와셔"), err.value.current)
+    assert app.read_log_row(sheet, 3)[LOG_HEADER.index("제품명")] == "볼트"
+
+
+def test_delete_of_missing_row_conflicts(sheet):
+    base = app.read_log_row(sheet, 4)
+    sheet.delete_rows(4)
+    with pytest.raises(app.RowConflict) as err:
+        app.conditional_delete_row(sheet, 4, base)
+    assert err.value.current is None and err.value.moved_to is None
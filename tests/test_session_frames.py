@@ -0,0 +1,50 @@
+import numpy as np
+
+import equipment_cpri_v8 as app
+
+
+def block(n):
+    return np.zeros(n, dtype=np.uint8)
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = app.SessionFrameCache(250)
+    cache.put("a", block(100))
+    cache.put("b", block(100))
+    cache.get("a")
+    cache.put("c", block(100))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.bytes == 200 and cache.evictions == 1
+
+
+def test_newest_entry_is_kept_even_when_over_budget():
+    cache = app.SessionFrameCache(50)
+    cache.put("a", block(10))
+    cache.put("big", block(100))
+    assert cache.get("a") is None and cache.get("big") is not None
+    assert cache.bytes == 100
+
+
+def test_pinned_entries_are_counted_but_never_evicted():
+    cache = app.SessionFrameCache(150)
+    cache.put("edit_base", block(100), pinned=True)
+    cache.put("a", block(40))
+    cache.put("b", block(40))
+    assert cache.get("edit_base") is not None
+    assert cache.get("a") is None and cache.get("b") is not None
+    assert cache.bytes == 140
+
+
+def test_replace_and_pop_keep_byte_count():
+    cache = app.SessionFrameCache(1000)
+    cache.put("a", block(100))
+    cache.put("a", block(30))
+    assert cache.bytes == 30
+    assert cache.pop("a") is not None and cache.pop("a") is None
+    assert cache.bytes == 0 and cache.summary()["entries"] == 0
+
+
+def test_approx_bytes():
+    assert app.approx_bytes(block(64)) == 64
+    assert app.approx_bytes({"x": block(64)}) > 64
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+import equipment_cpri_v8 as app
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return cond()
+
+
+def run_all(flight, n, fn, key="k"):
+    """같은 키로 n 개 스레드에서 do(key, fn) 시작. 반환: (스레드 목록, 결과 목록, 오류 목록)"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_load():
+    flight = app.SingleFlight(wait_sec=5)
+    release, calls = threading.Event(), []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return {"rows": [1, 2, 3]}
+
+    threads, results, errors = run_all(flight, 8, load)
+    assert wait_for(lambda: flight.stats["shared"] == 7)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and not errors
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert flight.stats["leader"] == 1
+
+
+def test_concurrent_callers_share_the_error():
+    flight = app.SingleFlight(wait_sec=5)
+    release, calls = threading.Event(), []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        raise ConnectionError("quota")
+
+    threads, results, errors = run_all(flight, 5, load)
+    assert wait_for(lambda: flight.stats["shared"] == 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and not results
+    assert len(errors) == 5 and all(e is errors[0] for e in errors)
+
+
+def test_next_call_after_completion_loads_again():
+    flight = app.SingleFlight(wait_sec=5)
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["x"])
+    assert flight.do("k", lambda: 3) == 3
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = app.SingleFlight(wait_sec=5)
+    release = threading.Event()
+    threads, _, _ = run_all(flight, 1, lambda: release.wait(5), key="slow")
+    assert wait_for(lambda: flight.stats["leader"] == 1)
+    assert flight.do("fast", lambda: "done") == "done"
+    release.set()
+    threads[0].join(5)
+
+
+def test_follower_gives_up_after_wait_sec():
+    flight = app.SingleFlight(wait_sec=0.05)
+    release = threading.Event()
+    threads, _, _ = run_all(flight, 1, lambda: release.wait(5), key="k")
+    assert wait_for(lambda: flight.stats["leader"] == 1)
+    assert flight.do("k", lambda: "own") == "own"
+    assert flight.stats["timeout"] == 1
+    release.set()
+    threads[0].join(5)
+
+
+def test_interactive_caller_bypasses_background_leader():
+    flight = app.SingleFlight(wait_sec=5)
+    release = threading.Event()
+    # 스크립트 스레드가 아닌 스레드는 background 우선순위
+    threads, results, _ = run_all(flight, 1, lambda: release.wait(5) and "background", key="k")
+    assert wait_for(lambda: flight.stats["leader"] == 1)
+    with app.sheets_priority("interactive"):
+        assert flight.do("k", lambda: "interactive") == "interactive"
+    assert flight.stats["bypass"] == 1
+    release.set()
+    threads[0].join(5)
+    assert results == ["background"]
+
+
+def test_background_caller_joins_interactive_leader():
+    flight = app.SingleFlight(wait_sec=5)
+    release, calls = threading.Event(), []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    result = []
+
+    def interactive():
+        with app.sheets_priority("interactive"):
+            result.append(flight.do("k", load))
+    leader = threading.Thread(target=interactive)
+    leader.start()
+    assert wait_for(lambda: flight.stats["leader"] == 1)
+    threads, results, _ = run_all(flight, 2, load, key="k")
+    assert wait_for(lambda: flight.stats["shared"] == 2)
+    release.set()
+    for t in threads + [leader]:
+        t.join(5)
+    assert len(calls) == 1 and results == ["value", "value"] and result == ["value"]
+
+
+def test_current_priority_defaults_by_thread():
+    assert app.current_sheets_priority() == "background"  # ScriptRunContext 가 없는 스레드
+    with app.sheets_priority("bulk"):
+        assert app.current_sheets_priority() == "bulk"
+    assert app.current_sheets_priority() == "background"
@@ -0,0 +1,32 @@
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, log_row
+
+ROWS = [log_row("(주)에이비씨", "2026-03-02"), log_row("대한정밀", "2026-03-03"), log_row("에이비씨", "2026-03-04")]
+
+
+def listed(sheet, row_num):
+    """목록 프레임에서 고른 행 (세부지원내용 없음) - 시트를 바꾸기 전에 받아 둔 값"""
+    frame = app.load_log_list(sheet)
+    return [frame.loc[frame["행번호"] == row_num].iloc[0].get(c, "") for c in app.LOG_COLUMNS]
+
+
+def test_unchanged_row_resolves_in_place(make_doc):
+    sheet = make_doc({"SEM-1": [LOG_HEADER] + ROWS}).worksheet("SEM-1")
+    sheet.update(range_name="L3", values=[["긴 세부지원내용"]])  # 목록에 없는 열만 바뀐 경우는 같은 기록
+    at, values = app.resolve_listed_row(sheet, 3, listed(sheet, 3))
+    assert at == 3 and values[app.LOG_COLUMNS.index("세부지원내용")] == "긴 세부지원내용"
+
+
+def test_stale_frame_row_is_found_after_rows_shift(make_doc):
+    sheet = make_doc({"SEM-1": [LOG_HEADER] + ROWS}).worksheet("SEM-1")
+    chosen = listed(sheet, 3)
+    sheet.delete_rows(2)  # 목록을 받은 뒤 위쪽 행이 삭제됨 → 3번 자리에는 다른 기록
+    at, values = app.resolve_listed_row(sheet, 3, chosen)
+    assert at == 2 and values[2] == "대한정밀"
+
+
+def test_changed_or_deleted_row_is_not_resolved(make_doc):
+    sheet = make_doc({"SEM-1": [LOG_HEADER] + ROWS}).worksheet("SEM-1")
+    chosen = listed(sheet, 3)
+    sheet.update(range_name="S3", values=[["5"]])
+    assert app.resolve_listed_row(sheet, 3, chosen) == (None, None)
@@ -0,0 +1,20 @@
+import logging
+
+import equipment_cpri_v8 as app
+
+
+def test_first_render_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setenv("CPRI_STARTUP_REPORT", "1")
+    with caplog.at_level(logging.INFO, logger="cpri"):
+        app.record_render("login_page", 0.25, 0.5)
+        app.record_render("login_page", 0.25, 0.1)
+    messages = [r.getMessage() for r in caplog.records if r.name == "cpri"]
+    assert len(messages) == 1 and messages[0].startswith("[startup] login_page 첫 렌더 0.500s / 스크립트 import 0.250s")
+    prof = app._startup_profile()
+    assert prof["first_render_sec"]["login_page"] == 0.5 and prof["last_render_sec"]["login_page"] == 0.1
+
+
+def test_report_is_off_by_default(caplog):
+    with caplog.at_level(logging.INFO, logger="cpri"):
+        app.record_render("main_app", 0.25, 0.5)
+    assert not [r for r in caplog.records if r.name == "cpri"]
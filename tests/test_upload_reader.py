@@ -0,0 +1,76 @@
+import io
+
+import pandas as pd
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, MASTER_SHEETS
+
+ROW = ["시험", "외부", "(주)에이비씨", "1234567891", "소재팀", "소재", "금속", "철강소재", "볼트", "3", "Y", "내용",
+       "SEM-1", "E001", "분석", "2026-03-02", "2026-03-02", "N", "2", "10000", ""]
+
+
+def upload_rows(n):
+    """날짜를 하루씩 바꾼 서로 다른 정상 행 n 개"""
+    rows = []
+    for i in range(n):
+        day = (pd.Timestamp("2026-03-02") + pd.Timedelta(days=i)).strftime("%Y-%m-%d")
+        rows.append(ROW[:15] + [day, day] + ROW[17:])
+    return pd.DataFrame(rows, columns=LOG_HEADER)
+
+
+@pytest.fixture
+def master():
+    _, info, _, norm = app.get_master_data(app.FakeClient(MASTER_SHEETS))
+    return info, norm
+
+
+def ingest(data, name, master, chunk_rows=3):
+    info, norm = master
+    return app.ingest_upload(io.BytesIO(data), name, info, norm, chunk_rows=chunk_rows)
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "cp949"])
+def test_csv_is_read_in_chunks(encoding):
+    data = upload_rows(7).to_csv(index=False).encode(encoding)
+    reader = app.UploadReader(io.BytesIO(data), "log.csv", chunk_rows=3)
+    chunks = list(reader.chunks())
+    assert [len(c) for _, c in chunks] == [3, 3, 1]
+    assert chunks[0][1].index.tolist() == [0, 1, 2]  # 인덱스 + 2 = 원본 행 번호
+    assert chunks[2][1]["사용기관 기업명"].tolist() == ["(주)에이비씨"]
+    assert reader.rows == 7 and reader.sheets == ["CSV"]
+
+
+def test_csv_utf8_with_late_non_ascii_is_not_misread_as_cp949():
+    frame = upload_rows(2)
+    frame.loc[1, "세부지원내용"] = "한글 " * 2000  # 첫 블록 뒤에 한글이 나와도 utf-8 로 읽는다
+    data = frame.to_csv(index=False).encode("utf-8")
+    reader = app.UploadReader(io.BytesIO(data), "log.csv", chunk_rows=10)
+    assert reader._csv_encoding(block=64) == "utf-8-sig"
+    (_, chunk), = reader.chunks()
+    assert chunk["세부지원내용"].iloc[1] == "한글 " * 2000
+
+
+def test_csv_upload_is_validated(master):
+    frame = upload_rows(5)
+    frame.loc[3, "사용기관 기업명"] = "없는회사"
+    checked = ingest(frame.to_csv(index=False).encode("cp949"), "log.csv", master, chunk_rows=2)
+    assert checked["total"] == 5 and len(checked["valid_rows"]) == 4
+    assert [e["행 번호"] for e in checked["error_logs"]] == [5]
+    assert checked["error_rows"]["시트"].tolist() == ["CSV"]
+
+
+def test_xlsx_sheets_skip_missing_columns_and_find_cross_sheet_duplicates(master):
+    first = upload_rows(4)
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf) as writer:
+        first.to_excel(writer, sheet_name="1월", index=False)
+        first.drop(columns=["장비명"]).to_excel(writer, sheet_name="메모", index=False)
+        pd.concat([upload_rows(6).iloc[4:], first.iloc[[1]]]).to_excel(writer, sheet_name="2월", index=False)
+    checked = ingest(buf.getvalue(), "log.xlsx", master)
+    assert checked["sheets"] == ["1월", "2월"]
+    assert checked["skipped"] == [("메모", ["장비명"])]
+    assert checked["total"] == 7 and len(checked["valid_rows"]) == 6
+    (err,) = checked["error_logs"]
+    assert (err["시트"], err["행 번호"], err["오류 유형"]) == ("2월", 4, ["중복"])
+    assert "업로드 파일 1월 3행" in err["오류 내용"]
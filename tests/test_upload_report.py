@@ -0,0 +1,60 @@
+import io
+
+import pandas as pd
+
+import equipment_cpri_v8 as app
+
+ERRORS = [
+    {"시트": "", "행 번호": 2, "오류 유형": ["활용유형", "사용시간"], "오류 내용": "활용유형 값 오류: , 사용시간 오류: 0"},
+    {"시트": "", "행 번호": 3, "오류 유형": ["사용시간"], "오류 내용": "사용시간 오류: -1"},
+    {"시트": "", "행 번호": 5, "오류 유형": ["사용시간"], "오류 내용": "사용시간 오류: 0"},
+]
+
+
+def test_list_fields_count_each_value():
+    table = app.summarize_reasons(ERRORS, "오류 유형")
+    assert table.values.tolist() == [["사용시간", 3, "2, 3, 5"], ["활용유형", 1, "2"]]
+
+
+def test_scalar_values_with_commas_are_not_split():
+    records = [{"행 번호": 2, "보정": "A, B → AB"}, {"행 번호": 7, "보정": "A, B → AB"}]
+    assert app.summarize_reasons(records, "보정").values.tolist() == [["A, B → AB", 2, "2, 7"]]
+
+
+def test_sample_limit_and_sheet_prefix():
+    records = [{"시트": "3월", "행 번호": i, "장비명": "SEM-1"} for i in range(2, 12)]
+    table = app.summarize_reasons(records, "장비명", sample=3)
+    assert table.values.tolist() == [["SEM-1", 10, "3월!2, 3월!3, 3월!4"]]
+
+
+def test_ties_keep_first_seen_order():
+    records = [{"행 번호": 2, "장비명": "XRD-2"}, {"행 번호": 3, "장비명": "SEM-1"}]
+    assert app.summarize_reasons(records, "장비명")["장비명"].tolist() == ["XRD-2", "SEM-1"]
+
+
+def test_empty_records():
+    table = app.summarize_reasons([], "오류 유형")
+    assert table.empty and table.columns.tolist() == ["오류 유형", "건수", "예시 행 번호"]
+
+
+def test_correction_pairs():
+    pairs = app.correction_pairs([{"원본 기업명": "대한 정밀", "보정 기업명": "대한정밀"}])
+    assert pairs[0]["보정"] == "대한 정밀 → 대한정밀"
+
+
+def test_report_workbook():
+    checked = {
+        "error_logs": ERRORS,
+        "error_rows": pd.DataFrame({"시트": ["", "", ""], "행 번호": [2, 3, 5], "사용시간": ["0", "-1", "0"],
+                                    "오류 유형": ["활용유형, 사용시간", "사용시간", "사용시간"],
+                                    "오류 내용": [e["오류 내용"] for e in ERRORS]}),
+        "auto_corrected": [{"행 번호": 4, "원본 기업명": "대한 정밀", "보정 기업명": "대한정밀"}],
+        "near_dups": [],
+    }
+    book = pd.read_excel(io.BytesIO(app.build_upload_report(checked)), sheet_name=None, header=None)
+    assert list(book) == ["요약", "오류", "자동보정"]
+    assert book["오류"].iloc[0].tolist()[:2] == ["행 번호", "사용시간"]  # 시트 이름이 모두 빈 값이면 열을 뺀다
+    assert book["오류"].iloc[1:, 0].tolist() == [2, 3, 5]
+    labels = book["요약"].iloc[:, 0].dropna().tolist()
+    assert labels[:4] == ["오류 유형별 (3건)", "오류 유형", "사용시간", "활용유형"]
+    assert "자동 보정별 (1건)" in labels and "대한 정밀 → 대한정밀" in labels
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import equipment_cpri_v8 as app
+from conftest import LOG_HEADER, MASTER_SHEETS
+
+ROW = dict(zip(LOG_HEADER, ["시험", "외부", "(주)에이비씨", "1234567891", "소재팀", "소재", "금속", "철강소재", "볼트", "3",
+                            "Y", "내용", "SEM-1", "E001", "분석", "2026-03-02", "2026-03-02", "N", "2", "10000", ""]))
+
+
+@pytest.fixture
+def validate():
+    _, info, _, norm = app.get_master_data(app.FakeClient(MASTER_SHEETS))
+
+    def run(**changes):
+        frame = pd.DataFrame([{**ROW, **changes}], columns=LOG_HEADER)
+        valid, errors, _, _ = app.validate_upload_rows(frame, info, norm)
+        return valid, (errors[0]["오류 유형"] if errors else [])
+    return run
+
+
+def test_valid_row_passes(validate):
+    valid, kinds = validate()
+    assert len(valid) == 1 and kinds == []
+
+
+def test_biz_num_checksum():
+    nums = pd.Series(["1234567891", "123-45-67891", "1234567890", "12345", ""])
+    assert app.biz_num_invalid(nums).tolist() == [False, False, True, True, False]
+
+
+@pytest.mark.parametrize("biz_num, bad", [("2208162517", False), ("2208162518", True)])
+def test_biz_num_rule(validate, biz_num, bad):
+    # 목록에 없는 업체명이면 보정 없이 입력한 번호가 그대로 검사된다
+    _, kinds = validate(**{"사용기관 기업명": "신규업체", "사용기관 사업자등록번호": biz_num})
+    assert ("사업자등록번호" in kinds) is bad
+
+
+@pytest.mark.parametrize("usage, bad", [("내부", False), ("", True), ("기타", True)])
+def test_usage_type(validate, usage, bad):
+    _, kinds = validate(활용유형=usage)
+    assert ("활용유형" in kinds) is bad
+
+
+@pytest.mark.parametrize("hours, bad", [("0.5", False), ("0", True), ("-1", True)])
+def test_hours_must_be_positive(validate, hours, bad):
+    _, kinds = validate(사용시간=hours)
+    assert ("사용시간" in kinds) is bad
+
+
+@pytest.mark.parametrize("industry, item, bad", [("소재", "금속", False), ("소재", "", True), ("", "", False)])
+def test_item_required_when_industry_set(validate, industry, item, bad):
+    _, kinds = validate(업종=industry, 품목=item, 세부품목="철강소재" if item else "")
+    assert ("품목" in kinds) is bad
+
+
+def test_reasons_are_joined_per_row(validate):
+    valid, kinds = validate(활용유형="", 사용시간="0")
+    assert valid == [] and kinds == ["사용시간", "활용유형"]
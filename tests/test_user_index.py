@@ -0,0 +1,80 @@
+import pytest
+
+import equipment_cpri_v8 as app
+
+USERS = [["아이디", "비밀번호", "이름", "부서"], ["admin", "pw", "관리자", "ALL"], ["kim", "1234", "김", "소재팀"]]
+
+
+@pytest.fixture
+def doc(make_doc, monkeypatch):
+    monkeypatch.setenv("CPRI_REVISION_PROBE_SEC", "0")
+    return make_doc({"사용자관리": USERS})
+
+
+@pytest.fixture
+def sheet_reads(doc, monkeypatch):
+    """사용자관리 시트를 실제로 읽은 횟수"""
+    ws = doc.worksheet("사용자관리")
+    calls = []
+    get_all_records = ws.get_all_records
+
+    def counting():
+        calls.append(1)
+        return get_all_records()
+    monkeypatch.setattr(ws, "get_all_records", counting)
+    return calls
+
+
+def make_index(doc):
+    index = app.UserIndex(doc, refresh_sec=3600, iterations=1000, miss_refresh_sec=30)
+    index.refresh()
+    return index
+
+
+def test_authenticate(doc):
+    index = make_index(doc)
+    assert index.authenticate(" kim ", "1234") == ({"아이디": "kim", "이름": "김", "부서": "소재팀"}, "ok")
+    assert index.authenticate("kim", "12345") == (None, "bad_password")
+    assert index.authenticate("lee", "1234") == (None, "no_user")
+    assert index.stats["hashed"] == 2
+
+
+def test_known_user_lookups_do_not_read_the_sheet(doc, sheet_reads):
+    index = make_index(doc)
+    assert len(sheet_reads) == 1
+    for _ in range(20):
+        assert index.authenticate("admin", "pw")[1] == "ok"
+        assert index.authenticate("admin", "wrong")[1] == "bad_password"
+    assert len(sheet_reads) == 1
+
+
+def test_unknown_ids_refresh_at_most_once_per_window(doc, sheet_reads):
+    index = make_index(doc)
+    index.loaded_at = 0.0  # 마지막 갱신이 오래전인 것처럼
+    doc.worksheet("사용자관리").append_rows([["lee", "pw2", "이", "소재팀"]])
+    assert index.authenticate("lee", "pw2")[1] == "ok"  # 방금 추가된 계정은 바로 갱신해서 찾는다
+    for i in range(10):
+        assert index.authenticate(f"ghost{i}", "x") == (None, "no_user")
+    assert len(sheet_reads) == 2 and index.stats["miss_refresh"] == 1
+
+
+def test_password_change_rehashes_only_that_user(doc):
+    index = make_index(doc)
+    doc.worksheet("사용자관리").update(range_name="B3", values=[["new-pass"]])
+    index.refresh()
+    assert index.stats == {"hashed": 3, "reused": 1, "miss_refresh": 0}
+    assert index.authenticate("kim", "1234")[1] == "bad_password"
+    assert index.authenticate("kim", "new-pass")[1] == "ok"
+
+
+def test_unchanged_sheet_is_not_rebuilt(doc, sheet_reads):
+    index = make_index(doc)
+    index.refresh()
+    index.refresh()
+    assert len(sheet_reads) == 1
+    assert index.stats["hashed"] == 2 and index.stats["reused"] == 0
+
+
+def test_plain_passwords_are_not_kept(doc):
+    index = make_index(doc)
+    assert all(set(user) == {"아이디", "이름", "부서", "salt", "hash", "fingerprint"} for user in index._users.values())